@@ -0,0 +1,34 @@
+"""
+Benchmarks for emdp. They are not part of the test suite (see pytest.ini) and need pytest-benchmark:
+
+    pip install -e .[benchmark]
+    python -m pytest benchmarks --benchmark-json=benchmark_results.json
+    # save a run and compare later runs against it:
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+# sizes of the grid worlds to benchmark, to see how the tools scale.
+GRID_SIZES = [5, 10, 20, 30]
+
+
+def four_rooms_char_matrix(size):
+    """
+    A four rooms maze of size x size in the format of emdp.gridworld.txt_utilities.get_char_matrix
+    with the start in the top left room and the goal in the bottom right room.
+    """
+    middle = size // 2
+    char_matrix = [[' '] * size for _ in range(size)]
+    for i in range(size):
+        for wall in [(0, i), (size - 1, i), (i, 0), (i, size - 1), (middle, i), (i, middle)]:
+            char_matrix[wall[0]][wall[1]] = '#'
+    # doorways between the rooms.
+    for door in [(middle, middle // 2), (middle, (middle + size) // 2),
+                 (middle // 2, middle), ((middle + size) // 2, middle)]:
+        char_matrix[door[0]][door[1]] = ' '
+    char_matrix[1][1] = 's'
+    char_matrix[size - 2][size - 2] = 'g'
+    return char_matrix
@@ -0,0 +1,38 @@
+"""Benchmarks for building grid worlds."""
+import pytest
+from emdp.gridworld import builder_tools
+from emdp.gridworld.helper_utilities import build_simple_grid
+from emdp.gridworld.txt_utilities import build_gridworld_from_char_matrix
+from conftest import GRID_SIZES, four_rooms_char_matrix
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_build_simple_grid(benchmark, size):
+    benchmark.extra_info['n_states'] = size * size + 1
+    benchmark(build_simple_grid, size=size, terminal_states=[(size - 1, size - 1)], p_success=0.9)
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_add_wall_at(benchmark, size):
+    # a wall across the middle of the grid, added to a fresh builder every round.
+    wall_locs = [(size // 2, c) for c in range(size)]
+
+    def setup():
+        tmb = builder_tools.TransitionMatrixBuilder(size, has_terminal_state=False)
+        tmb.add_grid(p_success=0.9)
+        return (tmb, ), {}
+
+    def add_walls(tmb):
+        for wall_loc in wall_locs:
+            tmb.add_wall_at(wall_loc)
+
+    benchmark.extra_info['n_states'] = size * size
+    benchmark.extra_info['n_walls'] = len(wall_locs)
+    benchmark.pedantic(add_walls, setup=setup, rounds=5)
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_build_gridworld_from_char_matrix(benchmark, size):
+    char_matrix = four_rooms_char_matrix(size)
+    benchmark.extra_info['n_states'] = size * size + 1
+    benchmark(build_gridworld_from_char_matrix, char_matrix, p_success=0.9)
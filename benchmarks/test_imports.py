@@ -0,0 +1,17 @@
+"""Benchmarks for importing emdp."""
+import subprocess
+import sys
+
+IMPORT_SCRIPT = '''
+import numpy
+import emdp
+import emdp.analytic
+import emdp.gridworld
+import emdp.examples
+import emdp.torch_analytic
+'''
+
+
+def test_import(benchmark):
+    # each round starts a new interpreter, so the time includes starting python and importing numpy.
+    benchmark.pedantic(subprocess.check_call, args=([sys.executable, '-c', IMPORT_SCRIPT], ), rounds=5)
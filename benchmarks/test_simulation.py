@@ -0,0 +1,73 @@
+"""Benchmarks for simulating MDPs."""
+import inspect
+import numpy as np
+import pytest
+from emdp import instrumentation
+from emdp.gridworld.txt_utilities import build_gridworld_from_char_matrix
+from conftest import GRID_SIZES, four_rooms_char_matrix
+
+N_STEPS = 1000
+
+
+def _build_mdp(size):
+    mdp, _ = build_gridworld_from_char_matrix(four_rooms_char_matrix(size), p_success=0.9)
+    return mdp
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_step(benchmark, size):
+    mdp = _build_mdp(size)
+    actions = np.random.RandomState(0).randint(mdp.action_space, size=N_STEPS).tolist()
+
+    def run():
+        mdp.reset()
+        for action in actions:
+            if mdp.done:
+                mdp.reset()
+            mdp.step(action)
+
+    benchmark.extra_info['n_states'] = mdp.state_space
+    benchmark.extra_info['n_steps'] = N_STEPS
+    benchmark(run)
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_reset(benchmark, size):
+    mdp = _build_mdp(size)
+
+    def run():
+        for _ in range(N_STEPS):
+            mdp.reset()
+
+    benchmark.extra_info['n_states'] = mdp.state_space
+    benchmark.extra_info['n_resets'] = N_STEPS
+    benchmark(run)
+
+
+@pytest.mark.benchmark(group='instrumentation')
+@pytest.mark.parametrize('mode', ['undecorated', 'disabled', 'enabled'])
+def test_step_instrumentation_overhead(benchmark, mode):
+    mdp = _build_mdp(20)
+    actions = np.random.RandomState(0).randint(mdp.action_space, size=N_STEPS).tolist()
+    if mode == 'enabled':
+        instrumentation.enable()
+    reset_index, step_index = type(mdp).reset_index, type(mdp).step_index
+    if mode == 'undecorated':
+        # the undecorated functions, independently of how instrumentation installs them.
+        reset_index, step_index = inspect.unwrap(reset_index), inspect.unwrap(step_index)
+    elif mode == 'disabled':
+        assert step_index is inspect.unwrap(step_index), 'Disabled instrumentation should not wrap functions.'
+
+    def run():
+        reset_index(mdp)
+        for action in actions:
+            if mdp.done:
+                reset_index(mdp)
+            step_index(mdp, action)
+
+    benchmark.extra_info['n_steps'] = N_STEPS
+    try:
+        benchmark(run)
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
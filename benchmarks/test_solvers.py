@@ -0,0 +1,40 @@
+"""Benchmarks for the analytic solutions."""
+import numpy as np
+import pytest
+from emdp import analytic
+from emdp.gridworld.txt_utilities import build_gridworld_from_char_matrix
+from conftest import GRID_SIZES, four_rooms_char_matrix
+
+
+def _build_problem(size):
+    mdp, _ = build_gridworld_from_char_matrix(four_rooms_char_matrix(size), p_success=0.9, gamma=0.99)
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    return mdp, pi
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_calculate_V_pi(benchmark, size):
+    mdp, pi = _build_problem(size)
+    benchmark.extra_info['n_states'] = mdp.state_space
+    benchmark(analytic.calculate_V_pi, mdp.P, mdp.R, pi, mdp.gamma)
+
+
+@pytest.mark.parametrize('size', GRID_SIZES)
+def test_torch_calculate_V_pi(benchmark, size):
+    pytest.importorskip('torch')
+    from emdp import torch_analytic
+    mdp, pi = _build_problem(size)
+    benchmark.extra_info['n_states'] = mdp.state_space
+    benchmark(torch_analytic.calculate_V_pi, mdp.P, mdp.R, pi, mdp.gamma)
+
+
+@pytest.mark.parametrize('n_states', [1000, 10000, 100000])
+def test_sparse_stationary_distribution(benchmark, n_states):
+    scipy_sparse = pytest.importorskip('scipy.sparse')
+    # a random walk that drifts to the right, reflected at both ends.
+    stay = np.zeros(n_states)
+    stay[0], stay[-1] = 0.4, 0.6
+    P_pi = scipy_sparse.diags([np.full(n_states - 1, 0.4), stay, np.full(n_states - 1, 0.6)], [-1, 0, 1],
+                              format='csr')
+    benchmark.extra_info['n_states'] = n_states
+    benchmark(analytic.calculate_stationary_distribution, P_pi)
@@ -1,4 +1,19 @@
+import importlib
 from .common import MDP
+from .batched import BatchedMDP
 from .chainworld import build_chain_MDP
 
 __version__ = '0.0.5'
+
+# submodules are imported on first access (e.g. emdp.examples) so that `import emdp` stays fast.
+# (!) emdp_gym imports gym, representations needs scipy and torch_analytic imports torch.
+_LAZY_SUBMODULES = ('actions', 'analytic', 'batched', 'chainworld', 'common', 'datasets', 'emdp_gym', 'empirical',
+                    'examples', 'exceptions', 'function_approximation', 'graph', 'gridworld', 'instrumentation',
+                    'learners', 'memory', 'monte_carlo', 'off_policy_evaluation', 'representations', 'storage',
+                    'torch_analytic', 'utils')
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -1,9 +1,20 @@
 """
 Tools to get analytic solutions from MDPs
 """
+import warnings
 import numpy as np
+from . import graph
+from . import instrumentation
+from . import memory
+from .exceptions import ConvergenceWarning
 
 
+def _warn_not_converged(name, max_iterations, residual, tol):
+    warnings.warn('{} did not converge in {} iterations: the last change was {:.3g} (tol={:.3g}).'.format(
+        name, max_iterations, residual, tol), ConvergenceWarning, stacklevel=4)
+
+
+@instrumentation.timed('analytic.calculate_P_pi')
 def calculate_P_pi(P, pi):
     r"""
     calculates P_pi
@@ -14,6 +25,7 @@ def calculate_P_pi(P, pi):
     """
     return np.einsum('sat,sa->st', P, pi)
 
+@instrumentation.timed('analytic.calculate_R_pi')
 def calculate_R_pi(R, pi):
     r"""
     calculates R_pi
@@ -24,6 +36,7 @@ def calculate_R_pi(R, pi):
     """
     return np.einsum('sa,sa->s', R, pi)
 
+@instrumentation.timed('analytic.calculate_successor_representation')
 def calculate_successor_representation(P_pi, gamma):
     """
     Calculates the successor representation
@@ -32,12 +45,17 @@ def calculate_successor_representation(P_pi, gamma):
     :param gamma:
     :return:
     """
+    memory.check_memory(memory.estimate_analytic_bytes(
+        'calculate_successor_representation', P_pi.shape[0], 0)['intermediates'],
+        'calculate_successor_representation with {} states'.format(P_pi.shape[0]))
     return np.linalg.inv(np.eye(P_pi.shape[0]) - gamma * P_pi)
 
 
+@instrumentation.timed('analytic.calculate_V_pi_from_successor_representation')
 def calculate_V_pi_from_successor_representation(Phi, R_pi):
     return np.einsum('st,t->s', Phi, R_pi)
 
+@instrumentation.timed('analytic.calculate_V_pi')
 def calculate_V_pi(P, R, pi, gamma):
     r"""
     Calculates V_pi from the successor representation using the analytic form:
@@ -50,7 +68,426 @@ def calculate_V_pi(P, R, pi, gamma):
     :param gamma: discount factor
     :return:
     """
+    memory.check_memory(memory.estimate_analytic_bytes('calculate_V_pi', *pi.shape)['intermediates'],
+                        'calculate_V_pi with {} states'.format(pi.shape[0]))
     P_pi = calculate_P_pi(P, pi)
     R_pi = calculate_R_pi(R, pi)
     Phi = calculate_successor_representation(P_pi, gamma)
     return calculate_V_pi_from_successor_representation(Phi, R_pi)
+
+@instrumentation.timed('analytic.calculate_Q_from_V')
+def calculate_Q_from_V(P, R, V, gamma):
+    r"""
+    Calculates the action values of a value function:
+    Q(s,a) = r(s,a) + gamma * \sum_t p(s, a, t) V(t)
+    (e.g. Q_pi from V_pi or Q_star from the result of value_iteration)
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param V: a vector of size |S|
+    :param gamma: discount factor
+    :return: a matrix of size |S| x |A|
+    """
+    return R + gamma * np.einsum('sat,t->sa', P, V)
+
+@instrumentation.timed('analytic.calculate_V_pi_matrix_free')
+def calculate_V_pi_matrix_free(apply_P, R, pi, gamma, V_init=None, tol=1e-8, max_iterations=10000):
+    r"""
+    Calculates V_pi without a transition matrix by iterating the Bellman expectation operator:
+    V <- R_pi + gamma * P_pi V
+    where P_pi V is computed from the matrix-free operator `apply_P`.
+    :param apply_P: a function mapping a vector V of size |S| to the matrix
+                    (PV)(s,a) = \sum_t p(s, a, t) V(t) of size |S| x |A|
+                    (e.g. ImplicitGridWorldMDP.apply_P)
+    :param R: Reward matrix
+    :param pi: policy matrix
+    :param gamma: discount factor
+    :param V_init: the initial guess of V_pi (defaults to zeros).
+    :param tol: stop when the largest change in V is below this value.
+    :param max_iterations: the maximum number of applications of the operator.
+                           A ConvergenceWarning is emitted if tol is not reached.
+    :return:
+    """
+    R_pi = calculate_R_pi(R, pi)
+    V = np.zeros_like(R_pi) if V_init is None else np.array(V_init, dtype=R_pi.dtype)
+    for _ in range(max_iterations):
+        V_new = R_pi + gamma * np.einsum('sa,sa->s', pi, apply_P(V))
+        residual = np.max(np.abs(V_new - V))
+        V = V_new
+        if residual < tol:
+            break
+    else:
+        _warn_not_converged('calculate_V_pi_matrix_free', max_iterations, residual, tol)
+    return V
+
+
+@instrumentation.timed('analytic.calculate_V_pi_by_components')
+def calculate_V_pi_by_components(P, R, pi, gamma):
+    r"""
+    Calculates V_pi by solving (I- gamma*P_pi) V = R_pi one strongly connected component
+    of the support of P_pi at a time, in reverse topological order.
+    Each component only needs the values of the components it leads to, which are already solved.
+    Single state components (e.g. absorbing states) are solved in closed form.
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param pi: policy matrix
+    :param gamma: discount factor
+    :return:
+    """
+    P_pi = calculate_P_pi(P, pi)
+    R_pi = calculate_R_pi(R, pi)
+    V = np.zeros_like(R_pi)
+    for component in graph.strongly_connected_components(graph.support_graph(P_pi)):
+        # values of this component are still zero so only already solved states contribute.
+        b = R_pi[component] + gamma * np.dot(P_pi[component], V)
+        if len(component) == 1:
+            V[component] = b / (1 - gamma * P_pi[component[0], component[0]])
+        else:
+            P_pi_component = P_pi[np.ix_(component, component)]
+            V[component] = np.linalg.solve(np.eye(len(component)) - gamma * P_pi_component, b)
+    return V
+
+
+@instrumentation.timed('analytic.value_iteration')
+def value_iteration(P, R, gamma, V_init=None, tol=1e-8, max_iterations=10000):
+    r"""
+    Calculates V_star by iterating the Bellman optimality operator:
+    V(s) <- max_a r(s,a) + gamma * \sum_t p(s, a, t) V(t)
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param gamma: discount factor
+    :param V_init: the initial guess of V_star (defaults to zeros).
+    :param tol: stop when the largest change in V is below this value.
+    :param max_iterations: the maximum number of sweeps. A ConvergenceWarning is emitted if tol is not reached.
+    :return:
+    """
+    V = np.zeros(P.shape[0]) if V_init is None else np.array(V_init, dtype=np.float64)
+    for _ in range(max_iterations):
+        V_new = np.max(R + gamma * np.einsum('sat,t->sa', P, V), axis=1)
+        residual = np.max(np.abs(V_new - V))
+        V = V_new
+        if residual < tol:
+            break
+    else:
+        _warn_not_converged('value_iteration', max_iterations, residual, tol)
+    return V
+
+
+@instrumentation.timed('analytic.value_iteration_by_components')
+def value_iteration_by_components(P, R, gamma, tol=1e-8, max_iterations=10000):
+    r"""
+    Value iteration run separately on each strongly connected component of the support of P,
+    in reverse topological order. Components that consist of a single state are solved
+    in closed form and all others are iterated until they converge with the values of the
+    components they lead to held fixed.
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param gamma: discount factor
+    :param tol: stop iterating a component when the largest change in V is below this value.
+    :param max_iterations: the maximum number of sweeps per component.
+                           A ConvergenceWarning is emitted if tol is not reached.
+    :return:
+    """
+    V = np.zeros(P.shape[0])
+    for component in graph.strongly_connected_components(graph.support_graph(P)):
+        # values of this component are still zero so only already solved states contribute.
+        Q_outside = R[component] + gamma * np.einsum('sat,t->sa', P[component], V)
+        if len(component) == 1:
+            state = component[0]
+            V[state] = np.max(Q_outside[0] / (1 - gamma * P[state, :, state]))
+            continue
+        P_component = P[np.ix_(component, np.arange(P.shape[1]), component)]
+        V_component = np.zeros(len(component))
+        for _ in range(max_iterations):
+            V_new = np.max(Q_outside + gamma * np.einsum('sat,t->sa', P_component, V_component), axis=1)
+            residual = np.max(np.abs(V_new - V_component))
+            V_component = V_new
+            if residual < tol:
+                break
+        else:
+            _warn_not_converged('value_iteration_by_components', max_iterations, residual, tol)
+        V[component] = V_component
+    return V
+
+
+@instrumentation.timed('analytic.calculate_P_pi_banded')
+def calculate_P_pi_banded(P_bands, pi):
+    r"""
+    calculates P_pi for a banded transition matrix (e.g. ChainMDP.P_bands)
+    P_pi_bands(k, s) = \sum_a pi(s,a) p_bands(k, s, a)
+    :param P_bands: banded transition matrix of size |K|x|S|x|A|
+    :param pi: matrix of size |S| x |A| indicating the policy
+    :return: a matrix of size |K| x |S|
+    """
+    return np.einsum('ksa,sa->ks', P_bands, pi)
+
+
+def _solve_tridiagonal(lower, diagonal, upper, b):
+    """
+    Solves a tridiagonal system in O(|S|) with scipy.linalg.solve_banded,
+    or with the Thomas algorithm if scipy is not installed.
+    :param lower: lower[i] is the coefficient of x[i-1] in row i (lower[0] is ignored)
+    :param diagonal: diagonal[i] is the coefficient of x[i] in row i
+    :param upper: upper[i] is the coefficient of x[i+1] in row i (upper[-1] is ignored)
+    :param b: the right hand side.
+    :return:
+    """
+    try:
+        import scipy.linalg
+    except ImportError:
+        return _solve_tridiagonal_thomas(lower, diagonal, upper, b)
+    # the diagonal ordered form of solve_banded: row 0 is the upper band and row 2 the lower band.
+    bands = np.zeros((3, len(diagonal)))
+    bands[0, 1:] = upper[:-1]
+    bands[1] = diagonal
+    bands[2, :-1] = lower[1:]
+    return scipy.linalg.solve_banded((1, 1), bands, b, check_finite=False)
+
+
+def _solve_tridiagonal_thomas(lower, diagonal, upper, b):
+    """
+    Solves a tridiagonal system in O(|S|) using the Thomas algorithm (a Python loop).
+    (!) No pivoting is done, which is stable for diagonally dominant systems like (I - gamma*P_pi).
+    See _solve_tridiagonal for the parameters.
+    """
+    n = len(diagonal)
+    lower, diagonal, upper, b = lower.tolist(), diagonal.tolist(), upper.tolist(), b.tolist()
+    c = [0.0] * n
+    d = [0.0] * n
+    c[0] = upper[0] / diagonal[0]
+    d[0] = b[0] / diagonal[0]
+    for i in range(1, n):
+        denominator = diagonal[i] - lower[i] * c[i - 1]
+        c[i] = upper[i] / denominator
+        d[i] = (b[i] - lower[i] * d[i - 1]) / denominator
+    x = d
+    for i in range(n - 2, -1, -1):
+        x[i] = d[i] - c[i] * x[i + 1]
+    return np.array(x)
+
+
+@instrumentation.timed('analytic.calculate_V_pi_banded')
+def calculate_V_pi_banded(P_bands, R, pi, gamma):
+    r"""
+    Calculates V_pi for a tridiagonal transition matrix (e.g. ChainMDP.P_bands) by solving
+    (I- gamma*P_pi) V = R_pi in O(|S|) time and memory.
+    :param P_bands: banded transition matrix of size 3x|S|x|A| where the bands
+                    are transitions to s-1, s and s+1 respectively.
+    :param R: Reward matrix
+    :param pi: policy matrix
+    :param gamma: discount factor
+    :return:
+    """
+    left, stay, right = calculate_P_pi_banded(P_bands, pi)
+    R_pi = calculate_R_pi(R, pi)
+    lower = -gamma * left
+    upper = -gamma * right
+    lower[0] = 0
+    upper[-1] = 0
+    return _solve_tridiagonal(lower, 1 - gamma * stay, upper, R_pi)
+
+
+def _is_sparse(matrix):
+    return hasattr(matrix, 'tocsc')
+
+
+def _solve_transposed(M, b):
+    """
+    Solves M^T x = b for a dense or scipy.sparse M with one factorization of M.
+    :param M: a matrix of size |S| x |S|
+    :param b: a vector of size |S| or a batch of them of size n x |S|
+    :return: x of the same size as b.
+    """
+    b = np.asarray(b, dtype=np.float64)
+    if _is_sparse(M):
+        import scipy.sparse.linalg
+        solve = scipy.sparse.linalg.splu(M.T.tocsc()).solve
+    else:
+        memory.check_memory(2 * M.size * memory.FLOAT_BYTES, 'a linear solve with {} states'.format(M.shape[0]))
+        solve = lambda rhs: np.linalg.solve(M.T, rhs)
+    return solve(b.T).T
+
+
+@instrumentation.timed('analytic.calculate_discounted_state_distribution')
+def calculate_discounted_state_distribution(P_pi, gamma, p0):
+    r"""
+    Calculates the discounted state visitation distribution
+    d_pi = (1 - gamma) p0^T (I - gamma*P_pi)^{-1}
+    with one transposed linear solve instead of the successor representation.
+    :param P_pi: a matrix of size |S| x |S|, dense or scipy.sparse (e.g. representations.sparse_P_pi)
+    :param gamma: discount factor
+    :param p0: the distribution over starting states of size |S| or a batch of them of size n x |S|
+    :return: d_pi of the same size as p0.
+    """
+    n_states = P_pi.shape[0]
+    if _is_sparse(P_pi):
+        import scipy.sparse
+        M = scipy.sparse.identity(n_states, format='csr') - gamma * P_pi
+    else:
+        M = np.eye(n_states) - gamma * np.asarray(P_pi)
+    return _solve_transposed(M, (1 - gamma) * np.asarray(p0, dtype=np.float64))
+
+
+@instrumentation.timed('analytic.calculate_discounted_state_action_distribution')
+def calculate_discounted_state_action_distribution(P_pi, pi, gamma, p0):
+    """
+    Calculates the discounted state-action visitation distribution d_pi(s, a) = d_pi(s) pi(s, a).
+    See calculate_discounted_state_distribution for the parameters.
+    :param pi: policy matrix
+    :return: a matrix of size |S| x |A|, or n x |S| x |A| for a batch of starting distributions.
+    """
+    d_pi = calculate_discounted_state_distribution(P_pi, gamma, p0)
+    return d_pi[..., None] * pi
+
+
+def _pinned_stationary_system(P_pi, pinned):
+    """
+    :return: (M, b) such that M^T d = b is (I - P_pi)^T d = 0 with the equation of the state `pinned`
+             replaced by d(pinned) = 1. M is sparse if P_pi is sparse, with no more entries than I - P_pi.
+    """
+    n_states = P_pi.shape[0]
+    keep = np.ones(n_states)
+    keep[pinned] = 0
+    # column s of M is the equation of state s in M^T d = b: the column of the pinned state becomes e_s.
+    if _is_sparse(P_pi):
+        import scipy.sparse
+        M = scipy.sparse.identity(n_states, format='csr') - P_pi @ scipy.sparse.diags(keep)
+    else:
+        M = np.eye(n_states) - np.asarray(P_pi) * keep
+    b = np.zeros(n_states)
+    b[pinned] = 1
+    return M, b
+
+
+def _solve_pinned_stationary(P_pi, pinned):
+    return _solve_transposed(*_pinned_stationary_system(P_pi, pinned))
+
+
+@instrumentation.timed('analytic.calculate_stationary_distribution')
+def calculate_stationary_distribution(P_pi, p0=None, method='solve', tol=1e-10, max_iterations=100000):
+    r"""
+    Calculates a stationary distribution d = d P_pi of the Markov chain P_pi.
+    - 'solve' solves (I - P_pi)^T d = 0 with the equation of one recurrent state s replaced by d(s) = 1
+      (solving again with the most likely state if s is not) and then normalizes d.
+      This keeps the sparsity of P_pi, so sparse chains are solved without fill-in.
+      (!) the chain must have a unique stationary distribution (a single closed class), otherwise a ValueError
+          is raised.
+    - 'power' iterates d <- (d + d P_pi) / 2 from p0. The lazy chain has the same stationary distributions
+      and converges for periodic chains. For chains with several stationary distributions
+      (e.g. several absorbing states) it returns the one reached from p0.
+      A ConvergenceWarning is emitted if tol is not reached.
+    :param P_pi: a matrix of size |S| x |S|, dense or scipy.sparse (e.g. representations.sparse_P_pi)
+    :param p0: for 'power', the initial distribution of size |S| or a batch of them of size n x |S|
+               (defaults to uniform). It cannot be given with 'solve'.
+    :param method: 'solve' or 'power'
+    :param tol: for 'power', stop when the largest change in d is below this value.
+    :param max_iterations: for 'power', the maximum number of iterations.
+    :return: d of size |S| (or n x |S| for a batch of p0 with 'power').
+    """
+    n_states = P_pi.shape[0]
+    if method == 'solve':
+        if p0 is not None:
+            raise ValueError('p0 is only used by the power method: the solution of solve does not depend on it.')
+        # the states of the closed classes are the recurrent ones.
+        closed_classes = graph.sink_components(graph.support_graph(P_pi))
+        if len(closed_classes) > 1:
+            raise ValueError('The chain has {} closed classes, so it has several stationary distributions. '
+                             'Use method=\'power\' with p0 to get the one reached from p0.'.format(len(closed_classes)))
+        pinned = closed_classes[0][0]
+        with np.errstate(over='ignore', invalid='ignore'):
+            d = _solve_pinned_stationary(P_pi, pinned)
+        largest = np.argmax(np.nan_to_num(np.abs(d), nan=0.))
+        if largest != pinned:
+            # pinning a state with a small probability is ill-conditioned: pin the most likely state instead.
+            d = _solve_pinned_stationary(P_pi, largest)
+        return d / d.sum()
+    elif method == 'power':
+        d = np.ones(n_states) / n_states if p0 is None else np.array(p0, dtype=np.float64)
+        for _ in range(max_iterations):
+            d_P = (P_pi.T @ d.T).T
+            d_new = (d + d_P) / 2
+            residual = np.max(np.abs(d_new - d))
+            d = d_new
+            if residual < tol:
+                break
+        else:
+            _warn_not_converged('calculate_stationary_distribution', max_iterations, residual, tol)
+        return d
+    raise ValueError('Unknown method {}. Use solve or power.'.format(method))
+
+
+def _solve_discounted(P_pi, discount, b):
+    """
+    Solves (I - discount*P_pi) x = b for a dense or scipy.sparse P_pi.
+    """
+    n_states = P_pi.shape[0]
+    if _is_sparse(P_pi):
+        import scipy.sparse
+        M = scipy.sparse.identity(n_states, format='csr') - discount * P_pi
+    else:
+        M = np.eye(n_states) - discount * np.asarray(P_pi)
+    # the transposed system of M^T is M x = b.
+    return _solve_transposed(M.T, b)
+
+
+@instrumentation.timed('analytic.calculate_return_variance')
+def calculate_return_variance(P, R, pi, gamma, V=None, P_pi=None):
+    r"""
+    Calculates the variance of the discounted return from each state under pi by solving
+    (I - gamma^2 P_pi) Var = xi
+    where xi(s) = \sum_a pi(s,a) \sum_t p(s, a, t) (r(s,a) + gamma V(t) - V(s))^2
+    is the variance of the one step target (Sobel, 1982).
+    This form avoids the cancellation of E[G^2] - V^2 when the variance is small compared to V^2.
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param pi: policy matrix
+    :param gamma: discount factor
+    :param V: V_pi if it was already calculated (it is calculated otherwise).
+    :param P_pi: P_pi if it was already calculated, dense or scipy.sparse (e.g. representations.sparse_P_pi).
+                 The linear solves are sparse for a sparse P_pi.
+    :return: a vector of size |S|
+    """
+    if P_pi is None:
+        memory.check_memory(memory.estimate_analytic_bytes('calculate_return_variance', *pi.shape)['intermediates'],
+                            'calculate_return_variance with {} states'.format(pi.shape[0]))
+        P_pi = calculate_P_pi(P, pi)
+    if V is None:
+        V = _solve_discounted(P_pi, gamma, calculate_R_pi(R, pi))
+    PV = np.einsum('sat,t->sa', P, V)
+    # the variance of V(t) given (s, a) plus the squared error of the expected target.
+    next_value_variance = np.maximum(np.einsum('sat,t->sa', P, V ** 2) - PV ** 2, 0)
+    xi = np.einsum('sa,sa->s', pi, (R + gamma * PV - V[:, None]) ** 2 + gamma ** 2 * next_value_variance)
+    return _solve_discounted(P_pi, gamma ** 2, xi)
+
+
+@instrumentation.timed('analytic.calculate_return_moments')
+def calculate_return_moments(P, R, pi, gamma, n_moments=2, P_pi=None):
+    r"""
+    Calculates the raw moments E[G^k | s] of the discounted return G under pi for k = 1..n_moments.
+    Since G = r(s,a) + gamma G' the moments satisfy
+    (I - gamma^k P_pi) M_k = \sum_a pi(s,a) \sum_{j<k} C(k,j) r(s,a)^{k-j} gamma^j \sum_t p(s, a, t) M_j(t)
+    so each moment needs one linear solve (M_1 is V_pi).
+    (!) use calculate_return_variance for the variance: M_2 - M_1^2 loses precision when the variance is small.
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param pi: policy matrix
+    :param gamma: discount factor
+    :param n_moments: the number of moments.
+    :param P_pi: P_pi if it was already calculated, dense or scipy.sparse (e.g. representations.sparse_P_pi).
+                 The linear solves are sparse for a sparse P_pi.
+    :return: a matrix of size n_moments x |S| where row k-1 is E[G^k | s].
+    """
+    if P_pi is None:
+        memory.check_memory(memory.estimate_analytic_bytes('calculate_return_moments', *pi.shape)['intermediates'],
+                            'calculate_return_moments with {} states'.format(pi.shape[0]))
+        P_pi = calculate_P_pi(P, pi)
+    moments = np.zeros((n_moments + 1, P.shape[0]))
+    moments[0] = 1
+    for k in range(1, n_moments + 1):
+        b = np.zeros(P.shape[0])
+        binomial = 1
+        for j in range(k):
+            b += binomial * gamma ** j * np.einsum('sa,sa,sa->s', pi, R ** (k - j),
+                                                   np.einsum('sat,t->sa', P, moments[j]))
+            binomial = binomial * (k - j) // (j + 1)
+        moments[k] = _solve_discounted(P_pi, gamma ** k, b)
+    return moments[1:]
@@ -0,0 +1,61 @@
+import numpy as np
+from . import utils
+from . import instrumentation
+from .common import Env
+from .exceptions import InvalidActionError
+
+
+class BatchedMDP(Env):
+    def __init__(self, mdp, num_envs, seed=1337):
+        """
+        Simulates `num_envs` independent copies of an MDP in lockstep.
+        States are integers and all copies are stepped with one vectorized sample.
+        (!) Unlike MDP.step, stepping a finished episode does not raise an error:
+            it is up to the caller to reset the copies that are done (see `reset`).
+        :param mdp: the MDP to simulate. Its dynamics are used but its state is not modified.
+        :param num_envs: the number of copies.
+        :param seed: the random seed for simulations.
+        """
+        super().__init__(seed)
+        self.mdp = mdp
+        self.num_envs = num_envs
+        self.state_space = mdp.state_space
+        self.action_space = mdp.action_space
+        self._is_terminal = np.zeros(mdp.state_space, dtype=bool)
+        self._is_terminal[list(mdp.terminal_states)] = True
+        self.states = np.zeros(num_envs, dtype=np.int64)
+        self.done = np.zeros(num_envs, dtype=bool)
+        self.reset()
+
+    @instrumentation.timed('mdp.batched_reset')
+    def reset(self, mask=None):
+        """
+        Samples new starting states from p0.
+        :param mask: a boolean array of size num_envs indicating which copies to reset (defaults to all).
+        :return: the integer states of all copies.
+        """
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        n_resets = np.count_nonzero(mask)
+        if n_resets > 0:
+            # new arrays so that those returned by step are not modified.
+            self.states = self.states.copy()
+            self.states[mask] = utils.sample_categorical(self.mdp.p0, self.rng, size=n_resets)
+            self.done = self.done & ~mask
+        return self.states
+
+    @instrumentation.timed('mdp.batched_step')
+    def step(self, actions):
+        """
+        :param actions: an integer array with the action of each copy.
+        :return: (next_states, rewards, dones) each an array of size num_envs.
+                 As in MDP.step, an episode is done after leaving a terminal state.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if np.any((actions < 0) | (actions >= self.action_space)):
+            raise InvalidActionError('Invalid actions. They must be integers between 0 and {}'.format(
+                self.action_space - 1))
+        rewards = self.mdp.R[self.states, actions]
+        self.done = self._is_terminal[self.states]
+        self.states = self.mdp._sample_next_states(self.states, actions, self.rng)
+        return self.states, rewards, self.done
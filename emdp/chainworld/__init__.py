@@ -1 +1 @@
-from .env import build_chain_MDP
\ No newline at end of file
+from .env import build_chain_MDP, ChainMDP
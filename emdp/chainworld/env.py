@@ -1,8 +1,12 @@
 import numpy as np
-from ..common import MDP
+from ..common import MDP, Env
+from .. import utils
+from .. import instrumentation
 from ..actions import LEFT, RIGHT
 
 N_ACTIONS = 2
+# offsets of the next state for each band of a banded transition matrix.
+BAND_OFFSETS = (-1, 0, 1)
 
 def build_chain_MDP(n_states=3,
                     p_success=1,
@@ -11,7 +15,8 @@ def build_chain_MDP(n_states=3,
                     terminal_states=[0],
                     gamma=0.9,
                     seed=1337,
-                    return_MDP=True):
+                    return_MDP=True,
+                    banded=False):
     """
     A simple chain world with states and 2 actions.
     Actions can fail with probability 1-p_success
@@ -39,44 +44,137 @@ def build_chain_MDP(n_states=3,
     :param starting_distribution: a distribution over starting states.
     :param terminal_states: a list of integers representing the terminal states
     :param return_MDP: returns an MDP object, else will return the components to create one.
+    :param banded: if True, the transition matrix is stored in banded form (see build_chain_bands)
+                   and a ChainMDP is returned. Use this for long chains.
     :return:
 
     """
-    p_fail = 1 - p_success
     assert p_success <= 1 and p_success >= 0
 
     # building the transition matrix.
-    P = np.zeros((n_states, N_ACTIONS, n_states))
-    for s in range(n_states):
-
-        if s in terminal_states:
-            # whatever action we take from this state should end up in this state again
-            P[s, :, s] = 1
-        else:
-            if s == 0:
-                # we are at the left edge of the grid.
-                # if we take the LEFT action it should be a no-op.
-                P[s, LEFT, s-1] = 0
-                P[s, LEFT, s] = 1
-            else:
-                # not at the left edge, fill in LEFT operation as usual
-                P[s, LEFT, s-1] = p_success  # successfully transition to the left
-                P[s, LEFT, s] = p_fail
-
-            if s == n_states-1:
-                # we are at the right edge of the grid.
-                # if we take RIGHT action it should be a no-op
-                P[s, RIGHT, s] = 1
-            else:
-                # not at the right edge, fill in RIGHT operation as usual
-                P[s, RIGHT, s+1] = p_success  # successfully transition to the right
-                P[s, RIGHT, s] = p_fail
+    P_bands = build_chain_bands(n_states, p_success, terminal_states)
+    P = P_bands if banded else banded_to_dense(P_bands)
 
     R = np.zeros((n_states, N_ACTIONS))
     for (reward_loc, action ,reward_mag) in reward_spec:
         R[reward_loc, action] = reward_mag # any action at this position leads to a reward.
 
     if return_MDP:
+        if banded:
+            return ChainMDP(P, R, gamma, starting_distribution, terminal_states, seed=1337)
         return MDP(P, R, gamma, starting_distribution, terminal_states, seed=1337)
     else:
         return P, R, gamma, starting_distribution, terminal_states
+
+
+def build_chain_bands(n_states, p_success, terminal_states):
+    """
+    Builds the transition matrix of a chain world in banded form.
+    P_bands[k, s, a] is the probability of going from s to s + BAND_OFFSETS[k] when taking action a.
+    :param n_states: the number of states in the chain world.
+    :param p_success: the probability of successfully executing an action.
+    :param terminal_states: a list of integers representing the terminal states
+    :return: an array of size 3 x |S| x |A|
+    """
+    p_fail = 1 - p_success
+    left, stay, right = 0, 1, 2
+    P_bands = np.zeros((len(BAND_OFFSETS), n_states, N_ACTIONS))
+
+    # not at the left edge, fill in LEFT operation as usual
+    P_bands[left, 1:, LEFT] = p_success  # successfully transition to the left
+    P_bands[stay, 1:, LEFT] = p_fail
+    # at the left edge of the grid taking the LEFT action is a no-op.
+    P_bands[stay, 0, LEFT] = 1
+
+    # not at the right edge, fill in RIGHT operation as usual
+    P_bands[right, :-1, RIGHT] = p_success  # successfully transition to the right
+    P_bands[stay, :-1, RIGHT] = p_fail
+    # at the right edge of the grid taking the RIGHT action is a no-op.
+    P_bands[stay, -1, RIGHT] = 1
+
+    # whatever action we take from a terminal state should end up in this state again
+    terminal_states = list(terminal_states)
+    P_bands[:, terminal_states] = 0
+    P_bands[stay, terminal_states] = 1
+    return P_bands
+
+
+def banded_to_dense(P_bands):
+    """
+    Converts a banded transition matrix into a dense one.
+    :param P_bands: an array of size 3 x |S| x |A| (see build_chain_bands)
+    :return: an array of size |S| x |A| x |S|
+    """
+    n_states = P_bands.shape[1]
+    P = np.zeros((n_states, P_bands.shape[2], n_states))
+    for offset, band in zip(BAND_OFFSETS, P_bands):
+        states = np.arange(max(0, -offset), n_states - max(0, offset))
+        P[states, :, states + offset] = band[states]
+    return P
+
+
+class ChainMDP(MDP):
+    def __init__(self, P_bands, R, gamma, p0, terminal_states, seed=1337, skip_check=False):
+        """
+        An MDP whose transitions only go to the previous, the same or the next state,
+        stored as a banded matrix so that memory and policy evaluation are O(|S|).
+        (!) Accessing `P` builds the dense transition matrix.
+        :param P_bands: The banded transition matrix of size 3 x |S| x |A| (see build_chain_bands)
+        :param R: The reward criterion |S|x|A|
+        :param gamma: the discount factor.
+        :param p0: the distribution over starting states |S| (must sum to 1.)
+        :param terminal_states: A list of integers which indicate terminal states, used to end episodes.
+        :param seed: the random seed for simulations.
+        """
+        Env.__init__(self, seed)
+        if not skip_check: assert np.allclose(P_bands.sum(axis=0), 1), 'Transition matrix does not seem to be a ' \
+                                                                       'stochastic matrix'
+        if not skip_check: assert np.all(P_bands[0, 0] == 0) and np.all(P_bands[-1, -1] == 0), \
+            'Transitions cannot leave the ends of the chain.'
+        self.P_bands = P_bands
+        self.R = R
+        self.state_space = P_bands.shape[1]
+        self.action_space = R.shape[1]
+        if not skip_check: assert self.action_space == P_bands.shape[2], '3rd Dimension of P_bands is not of size |A|'
+        if not skip_check: assert self.state_space == R.shape[0], '1st Dimesnion of Reward Matrix is not of size |S|'
+        self.gamma = gamma
+        if not skip_check: assert self.state_space == p0.shape[0], 'Distribution over initial states is not over |S|'
+        self.p0 = p0
+        self.terminal_states = terminal_states
+        self.current_state = None
+        self.reset()
+
+    @property
+    def P(self):
+        """
+        Builds the dense transition matrix |S|x|A|x|S|.
+        """
+        return banded_to_dense(self.P_bands)
+
+    @instrumentation.timed('mdp.sample')
+    def _sample_next_state(self, state_idx, action):
+        offset = self.rng.choice(BAND_OFFSETS, p=self.P_bands[:, state_idx, action])
+        return state_idx + offset
+
+    def _sample_next_states(self, state_idxs, actions, rng):
+        bands = utils.sample_categorical(self.P_bands[:, state_idxs, actions].T, rng)
+        return state_idxs + np.asarray(BAND_OFFSETS)[bands]
+
+    def _sample_bytes_per_pair(self):
+        # the probabilities of the bands, their cumulative sums and the comparisons with the uniform samples.
+        return 3 * 8 * len(BAND_OFFSETS)
+
+    def apply_P(self, V):
+        r"""
+        Applies the transition matrix to a vector:
+        (PV)(s, a) = \sum_t p(s, a, t) V(t)
+        :param V: a vector of size |S|
+        :return: a matrix of size |S| x |A|
+        """
+        V = np.asarray(V)
+        # the edge values are never used since the corresponding probabilities are zero.
+        V_padded = np.concatenate([V[:1], V, V[-1:]])
+        PV = np.zeros((self.state_space, self.action_space))
+        for offset, band in zip(BAND_OFFSETS, self.P_bands):
+            PV += band * V_padded[1 + offset:1 + offset + self.state_space, None]
+        return PV
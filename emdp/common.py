@@ -1,5 +1,7 @@
 import numpy as np
 from . import utils
+from . import graph
+from . import instrumentation
 from .exceptions import InvalidActionError, EpisodeDoneError
 
 class Env(object):
@@ -45,19 +47,64 @@ class MDP(Env):
         self.current_state = None
         self.reset()
 
-    def reset(self):
-        integer_representation = np.random.choice(np.arange(self.state_space), p=self.p0)
-        self.current_state = utils.convert_int_rep_to_onehot(integer_representation, self.state_space)
+    @property
+    def current_state(self):
+        """
+        The one hot representation of the current state. It is only built when accessed.
+        """
+        if self._current_state is None and self.current_state_idx is not None:
+            self._current_state = utils.convert_int_rep_to_onehot(self.current_state_idx, self.state_space)
+        return self._current_state
+
+    @current_state.setter
+    def current_state(self, state):
+        self.current_state_idx = None if state is None else utils.convert_onehot_to_int(state)
+        self._current_state = state
+
+    def _set_current_state_idx(self, state_idx):
+        self.current_state_idx = int(state_idx)
+        self._current_state = None
+
+    @instrumentation.timed('mdp.observation')
+    def get_observation(self, representation='onehot', out=None):
+        """
+        Returns the current state in the requested representation.
+        :param representation: 'onehot' for a one hot vector or 'int' for the integer index of the state.
+        :param out: an array of size |S| to write the one hot vector into instead of allocating a new one.
+        :return:
+        """
+        if representation == 'int':
+            return self.current_state_idx
+        elif representation == 'onehot':
+            if out is None:
+                return self.current_state
+            out[:] = 0
+            out[self.current_state_idx] = 1
+            return out
+        raise ValueError('Unknown representation {}.'.format(representation))
+
+    @instrumentation.timed('mdp.reset')
+    def reset_index(self):
+        """
+        Same as reset but returns the integer index of the starting state.
+        """
+        self._set_current_state_idx(np.random.choice(np.arange(self.state_space), p=self.p0))
         self.done = False
+        return self.current_state_idx
+
+    def reset(self):
+        self.reset_index()
         return self.current_state
 
     def set_current_state_to(self, state):
-        self.current_state = utils.convert_int_rep_to_onehot(state, self.state_space)
+        self._set_current_state_idx(state)
         self.done = False
         return self.current_state
 
-    def step(self, action):
+    @instrumentation.timed('mdp.step')
+    def step_index(self, action):
         """
+        Same as step but returns the integer index of the next state, without building a one hot vector.
         :param action: An integer representing the action taken.
         :return:
         """
@@ -70,18 +117,133 @@ class MDP(Env):
         # this check is done after entering terminal state
         # because we can only give the reward after leaving
         # a terminal state.
-        if self.current_state.argmax() in self.terminal_states:
+        current_state_idx = self.current_state_idx
+        if current_state_idx in self.terminal_states:
             self.done = True
 
-        # get the vector representing the next state probabilities:
-        current_state_idx = utils.convert_onehot_to_int(self.current_state)
-        next_state_probs = self.P[current_state_idx, action]
-
         # sample the next state
-        sampled_next_state = self.rng.choice(np.arange(self.state_space), p=next_state_probs)
+        sampled_next_state = self._sample_next_state(current_state_idx, action)
         # observe the reward
         reward = self.R[current_state_idx, action]
 
-        self.current_state = utils.convert_int_rep_to_onehot(sampled_next_state, self.state_space)
+        self._set_current_state_idx(sampled_next_state)
+
+        return self.current_state_idx, reward, self.done, {'gamma':self.gamma}
+
+    def step(self, action):
+        """
+        :param action: An integer representing the action taken.
+        :return:
+        """
+        _, reward, done, info = self.step_index(action)
+        return self.current_state, reward, done, info
+
+    def compact(self, seed=1337):
+        """
+        Removes all states that cannot be reached from the support of p0
+        (e.g. walls and disconnected parts of a grid world).
+        Since the set of reachable states is closed under the dynamics,
+        the reduced transition matrix is still a stochastic matrix.
+        :param seed: the random seed for simulations in the compacted MDP.
+        :return: (compact_mdp, compaction) where compaction is a graph.StateCompaction
+                 that can lift V/Q/pi from compact_mdp back to this MDP.
+        """
+        compaction = graph.StateCompaction(graph.reachable_states(self.P, self.p0), self.state_space)
+        states = compaction.states
+        P = self.P[np.ix_(states, np.arange(self.action_space), states)]
+        terminal_states = [int(compaction.index_of[s]) for s in self.terminal_states
+                           if compaction.index_of[s] >= 0]
+        compact_mdp = MDP(P, self.R[states], self.gamma, self.p0[states], terminal_states, seed=seed)
+        return compact_mdp, compaction
+
+    def save(self, path, wall_locs=None):
+        """
+        Saves this MDP to a directory of .npy files (see emdp.storage).
+        :param path: the directory to save it in.
+        :param wall_locs: Locations of the walls of a GridWorldMDP to keep for plotting.
+        :return: path
+        """
+        from . import storage
+        return storage.save_MDP(self, path, wall_locs=wall_locs)
+
+    @staticmethod
+    def load(path, mmap=True, seed=1337):
+        """
+        Loads an MDP saved with MDP.save. The returned object has the class of the saved MDP.
+        :param path: the directory it was saved in.
+        :param mmap: memory-map the transition and reward arrays (read only) so that they
+                     are shared between processes instead of being copied.
+        :param seed: the random seed for simulations.
+        :return:
+        """
+        from . import storage
+        return storage.load_MDP(path, mmap=mmap, seed=seed)
+
+    @instrumentation.timed('mdp.sample')
+    def _sample_next_state(self, state_idx, action):
+        """
+        Samples the index of the next state after taking `action` in the state with index `state_idx`.
+        Subclasses that do not store a transition matrix override this.
+        """
+        # get the vector representing the next state probabilities:
+        next_state_probs = self.P[state_idx, action]
+        return self.rng.choice(np.arange(self.state_space), p=next_state_probs)
+
+    def _sample_next_states(self, state_idxs, actions, rng):
+        """
+        Vectorized version of `_sample_next_state` used by BatchedMDP and sample_transitions.
+        :param state_idxs: an integer array of states.
+        :param actions: an integer array of actions of the same size.
+        :param rng: the np.random.RandomState to sample with.
+        :return: an integer array with the next states.
+        """
+        # only the distributions of the distinct state-action pairs are needed.
+        pairs, pair_of_sample = np.unique(np.asarray(state_idxs) * self.action_space + actions, return_inverse=True)
+        pair_states, pair_actions = np.divmod(pairs, self.action_space)
+        return utils.sample_categorical_grouped(self.P[pair_states, pair_actions], pair_of_sample.ravel(), rng)
+
+    def _sample_bytes_per_pair(self):
+        """
+        The memory that `_sample_next_states` needs per state-action pair, used to size the chunks of
+        sample_transitions. Subclasses that override `_sample_next_states` override this too.
+        """
+        # at most one distribution over next states per pair.
+        return 8 * self.state_space
+
+    @instrumentation.timed('mdp.sample_transitions')
+    def sample_transitions(self, states=None, actions=None, state_action_distribution=None, n=None,
+                           rng=None, max_chunk_bytes=2**26):
+        """
+        Samples transitions from the generative model without simulating episodes:
+        next states s' ~ p(.|s, a) and rewards r(s, a) for many state-action pairs at once.
+        Give either the arrays `states` and `actions` or a `state_action_distribution` and `n`.
+        :param states: an integer array of states.
+        :param actions: an integer array of actions of the same size.
+        :param state_action_distribution: a distribution over state-action pairs of size |S| x |A|
+                                          to sample `n` pairs from.
+        :param n: the number of pairs to sample from state_action_distribution.
+        :param rng: the np.random.RandomState to sample with (defaults to the one of this MDP).
+        :param max_chunk_bytes: pairs are processed in chunks whose intermediate arrays are at most
+                                about this many bytes. A dense MDP needs a distribution over the |S|
+                                next states per pair, ChainMDP and ImplicitGridWorldMDP only a few values.
+        :return: (states, actions, rewards, next_states) each an array with one entry per transition.
+        """
+        rng = self.rng if rng is None else rng
+        if state_action_distribution is not None:
+            if n is None:
+                raise ValueError('The number of transitions n is required with a state_action_distribution.')
+            pairs = utils.sample_categorical(np.ravel(state_action_distribution), rng, size=n)
+            states, actions = np.divmod(pairs, self.action_space)
+        elif states is None or actions is None:
+            raise ValueError('Give either states and actions or a state_action_distribution.')
+        states, actions = np.broadcast_arrays(np.asarray(states, dtype=np.int64),
+                                              np.asarray(actions, dtype=np.int64))
+        states, actions = states.ravel(), actions.ravel()
 
-        return self.current_state, reward, self.done, {'gamma':self.gamma}
+        rewards = self.R[states, actions]
+        next_states = np.empty(len(states), dtype=np.int64)
+        chunk_size = max(1, max_chunk_bytes // self._sample_bytes_per_pair())
+        for start in range(0, len(states), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            next_states[chunk] = self._sample_next_states(states[chunk], actions[chunk], rng)
+        return states, actions, rewards, next_states
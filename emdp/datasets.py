@@ -0,0 +1,165 @@
+"""
+Recording transitions to disk as sharded columns and reading them back lazily.
+
+A dataset is a directory with one .npy file per column and shard and a metadata.json file:
+    state-00000.npy, action-00000.npy, reward-00000.npy, next_state-00000.npy, done-00000.npy,
+    episode_id-00000.npy, state-00001.npy, ...
+States are stored as integers of the smallest unsigned type that fits |S| and actions likewise.
+
+Example:
+```python
+with TrajectoryRecorder(mdp, 'dataset', shard_size=10**6) as recorder:
+    for _ in range(n_episodes):
+        recorder.reset()
+        done = False
+        while not done:
+            _, _, done, _ = recorder.step(policy())
+
+dataset = TrajectoryDataset('dataset')
+for shard in dataset.iter_shards(columns=['state', 'reward']):
+    ...  # memory-mapped arrays
+```
+"""
+import json
+import os
+import numpy as np
+
+METADATA_FILE = 'metadata.json'
+COLUMNS = ('state', 'action', 'reward', 'next_state', 'done', 'episode_id')
+
+
+def _column_path(path, column, shard):
+    return os.path.join(path, '{}-{:05d}.npy'.format(column, shard))
+
+
+class TrajectoryRecorder(object):
+    def __init__(self, env, path, shard_size=100000):
+        """
+        Wraps an MDP or a GymToMDP and writes every transition to disk.
+        Transitions are buffered in preallocated arrays and written out every `shard_size` transitions.
+        (!) call close() (or use the recorder as a context manager) to write the last shard.
+        :param env: the MDP or GymToMDP to record.
+        :param path: the directory of the dataset. It is created if it does not exist.
+        :param shard_size: the number of transitions in each shard.
+        """
+        self.env = env
+        self.mdp = env.mdp if hasattr(env, 'mdp') else env
+        self.path = path
+        self.shard_size = shard_size
+        os.makedirs(path, exist_ok=True)
+        self.dtypes = {
+            'state': np.min_scalar_type(self.mdp.state_space - 1),
+            'action': np.min_scalar_type(self.mdp.action_space - 1),
+            'reward': np.asarray(self.mdp.R).dtype,
+            'next_state': np.min_scalar_type(self.mdp.state_space - 1),
+            'done': np.dtype(bool),
+            'episode_id': np.dtype(np.int64),
+        }
+        self._buffers = {column: np.empty(shard_size, dtype=dtype) for column, dtype in self.dtypes.items()}
+        self._n_buffered = 0
+        self.shard_sizes = []
+        self.episode_id = -1
+
+    def reset(self):
+        self.episode_id += 1
+        return self.env.reset()
+
+    def step(self, action):
+        """
+        Steps the wrapped environment and records the transition.
+        :return: what the wrapped environment returns.
+        """
+        state = self.mdp.current_state_idx
+        observation, reward, done, info = self.env.step(action)
+        i = self._n_buffered
+        self._buffers['state'][i] = state
+        self._buffers['action'][i] = action
+        self._buffers['reward'][i] = reward
+        self._buffers['next_state'][i] = self.mdp.current_state_idx
+        self._buffers['done'][i] = done
+        self._buffers['episode_id'][i] = self.episode_id
+        self._n_buffered += 1
+        if self._n_buffered == self.shard_size:
+            self.flush()
+        return observation, reward, done, info
+
+    def flush(self):
+        """Writes the buffered transitions as a new shard."""
+        if self._n_buffered == 0:
+            return
+        shard = len(self.shard_sizes)
+        for column, buffer in self._buffers.items():
+            np.save(_column_path(self.path, column, shard), buffer[:self._n_buffered])
+        self.shard_sizes.append(self._n_buffered)
+        self._n_buffered = 0
+        self._write_metadata()
+
+    def _write_metadata(self):
+        metadata = {
+            'columns': {column: dtype.str for column, dtype in self.dtypes.items()},
+            'shard_sizes': self.shard_sizes,
+            'state_space': int(self.mdp.state_space),
+            'action_space': int(self.mdp.action_space),
+            'gamma': float(self.mdp.gamma),
+        }
+        with open(os.path.join(self.path, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f)
+
+    def close(self):
+        self.flush()
+        self._write_metadata()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TrajectoryDataset(object):
+    def __init__(self, path, mmap=True):
+        """
+        Reads a dataset written by TrajectoryRecorder. Shards are only loaded when accessed.
+        :param path: the directory of the dataset.
+        :param mmap: memory-map the shards instead of reading them into memory.
+        """
+        self.path = path
+        self.mmap_mode = 'r' if mmap else None
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        self.shard_sizes = self.metadata['shard_sizes']
+        self.columns = list(self.metadata['columns'].keys())
+
+    def __len__(self):
+        return sum(self.shard_sizes)
+
+    @property
+    def n_shards(self):
+        return len(self.shard_sizes)
+
+    def shard(self, shard, columns=None):
+        """
+        :param shard: the index of the shard.
+        :param columns: the columns to load (defaults to all of them).
+        :return: a dictionary mapping each column to an array.
+        """
+        return {column: np.load(_column_path(self.path, column, shard), mmap_mode=self.mmap_mode)
+                for column in (self.columns if columns is None else columns)}
+
+    def iter_shards(self, columns=None):
+        """
+        Iterates over the shards in order.
+        :param columns: the columns to load (defaults to all of them).
+        """
+        for shard in range(self.n_shards):
+            yield self.shard(shard, columns=columns)
+
+    def column(self, column):
+        """
+        Reads a whole column into memory.
+        :param column: the name of the column (e.g. 'state')
+        :return: an array with one entry per transition.
+        """
+        if self.n_shards == 0:
+            return np.zeros(0, dtype=np.dtype(self.metadata['columns'][column]))
+        return np.concatenate([shard[column] for shard in self.iter_shards(columns=[column])])
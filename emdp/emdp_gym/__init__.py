@@ -1,4 +1,4 @@
-from emdp.emdp_gym.gym_wrap import gymify
+from emdp.emdp_gym.gym_wrap import gymify, gymify_vector
 from gym.envs.registration import register
 
 register(
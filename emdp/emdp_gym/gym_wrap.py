@@ -1,52 +1,184 @@
 """Allows using emdp as a gym environment."""
+import warnings
 import numpy as np
 import gym
 from gym import spaces
 
-import emdp.utils as utils
+from emdp import instrumentation
+from emdp.batched import BatchedMDP
+from emdp.gridworld.rgb_array import RGBArrayRenderer
 
 def gymify(mdp, **kwargs):
     return GymToMDP(mdp, **kwargs)
 
+def gymify_vector(mdp, num_envs, **kwargs):
+    return VectorGymToMDP(mdp, num_envs, **kwargs)
+
 class GymToMDP(gym.Env):
+    metadata = {'render.modes': ['rgb_array']}
 
-    def __init__(self, mdp, observation_one_hot=True):
+    def __init__(self, mdp, observation_one_hot=True, wall_locs=None, cell_pixels=8,
+                 observation=None, reuse_observation=False):
         """
         :param mdp: The emdp.MDP object to wrap.
         :param observation_one_hot: Boolean indicating if the observation space
             should be one hot or an integer.
+        :param wall_locs: Locations of the walls of a GridWorldMDP for rendering
+            (see emdp.gridworld.rgb_array.RGBArrayRenderer.from_mdp)
+        :param cell_pixels: the number of pixels along each side of a cell when rendering.
+        :param observation: the representation of the observations, overrides observation_one_hot:
+            - 'onehot': int32 one hot vectors of size |S|
+            - 'int': the integer index of the state
+            - 'grid': the (x,y) location of the agent in a GridWorldMDP.
+                      The absorbing state is (size, 0).
+        :param reuse_observation: Boolean indicating if one hot and grid observations are written
+            into the same array at every step instead of a new one.
+            (!) Copy the observations if they need to be kept.
         """
         self.mdp = mdp
-        if observation_one_hot:
+        self._wall_locs = wall_locs
+        self._cell_pixels = cell_pixels
+        self._renderer = None
+        if observation is None:
+            observation = 'onehot' if observation_one_hot else 'int'
+
+        if observation == 'onehot':
             self.observation_space = spaces.Box(
                 low=0, high=1, shape=(self.mdp.state_space, ), dtype=np.int32)
-        else:
+        elif observation == 'int':
             self.observation_space = spaces.Discrete(self.mdp.state_space)
+        elif observation == 'grid':
+            if not hasattr(self.mdp, 'size'):
+                raise ValueError('The grid observation is only available for GridWorldMDPs.')
+            self.observation_space = spaces.MultiDiscrete(
+                [self.mdp.size + int(self.mdp.has_absorbing_state), self.mdp.size])
+        else:
+            raise ValueError('Unknown observation {}. Use onehot, int or grid.'.format(observation))
 
         self.action_space = spaces.Discrete(self.mdp.action_space)
 
-        self._obs_one_hot = observation_one_hot
+        self._observation = observation
+        self._reuse_observation = reuse_observation
+        self._observation_buffer = self._new_observation_buffer()
+
+    def _new_observation_buffer(self):
+        if self._observation == 'int':
+            return None
+        return np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+
+    def _get_observation(self):
+        out = self._observation_buffer if self._reuse_observation else self._new_observation_buffer()
+        return self.mdp.get_observation(self._observation, out=out)
 
+    @instrumentation.timed('gym.reset')
     def reset(self):
-        return self.maybe_convert_state(self.mdp.reset())
+        self.mdp.reset_index()
+        return self._get_observation()
 
+    @instrumentation.timed('gym.step')
     def step(self, action):
-        state, reward, done, info = self.mdp.step(action)
-        
-        return (self.maybe_convert_state(state),
+        _, reward, done, info = self.mdp.step_index(action)
+
+        return (self._get_observation(),
                 reward, done, info)
 
     def seed(self, seed):
         self.mdp.set_seed(seed)
 
-    # TODO:
-    def render(self):
-        pass
+    @instrumentation.timed('gym.render')
+    def render(self, mode='rgb_array'):
+        """
+        Renders the current state of a GridWorldMDP.
+        The background is drawn once, on the first call.
+        :param mode: only 'rgb_array' is supported.
+        :return: an RGB image as a uint8 array.
+        """
+        if mode != 'rgb_array':
+            raise NotImplementedError('Only the rgb_array render mode is supported.')
+        if self._renderer is None:
+            self._renderer = RGBArrayRenderer.from_mdp(
+                self.mdp, wall_locs=self._wall_locs, cell_pixels=self._cell_pixels)
+        return self._renderer.render(self.mdp.current_state_idx)
 
     def maybe_convert_state(self, state):
+        """
+        (!) deprecated: reset and step already return observations in the representation of this wrapper.
+        :param state: the one hot current state of the MDP (as returned by MDP.reset and MDP.step).
+        :return: the observation of the current state of the MDP.
+        """
+        warnings.warn('GymToMDP.maybe_convert_state is deprecated: reset and step already return observations.',
+                      DeprecationWarning, stacklevel=2)
+        return self._get_observation()
+
+
+class VectorGymToMDP(gym.vector.VectorEnv):
+
+    def __init__(self, mdp, num_envs, observation_one_hot=True, seed=1337):
+        """
+        Runs `num_envs` copies of an MDP in lockstep (see emdp.BatchedMDP)
+        behind the gym vector environment API.
+        Episodes are reset automatically: the observation returned for a copy whose episode
+        ended is the first one of its next episode. As in gym's SyncVectorEnv, the last observation
+        of the episode is infos['final_observation'][i], an object array that is None for the copies
+        whose episode did not end, and infos['_final_observation'] is True for the copies whose episode ended.
+        (!) observations are written into the same preallocated array at every step.
+            Copy them if they need to be kept.
+        :param mdp: The emdp.MDP object to wrap.
+        :param num_envs: the number of copies of the MDP.
+        :param observation_one_hot: Boolean indicating if the observation space
+            should be one hot or an integer.
+        :param seed: the random seed for simulations.
+        """
+        self.mdp = mdp
+        self.batched_mdp = BatchedMDP(mdp, num_envs, seed=seed)
+        if observation_one_hot:
+            observation_space = spaces.Box(
+                low=0, high=1, shape=(self.mdp.state_space, ), dtype=np.int32)
+            self._observations = np.zeros((num_envs, self.mdp.state_space), dtype=np.int32)
+        else:
+            observation_space = spaces.Discrete(self.mdp.state_space)
+            self._observations = np.zeros(num_envs, dtype=np.int64)
+        super().__init__(num_envs, observation_space, spaces.Discrete(self.mdp.action_space))
+
+        self._obs_one_hot = observation_one_hot
+        self._envs = np.arange(num_envs)
+        self._observed_states = np.zeros(num_envs, dtype=np.int64)
+        self._actions = None
+
+    def _write_observations(self, states, out):
         if self._obs_one_hot:
-            return state
+            out[self._envs, self._observed_states] = 0
+            out[self._envs, states] = 1
         else:
-            return utils.convert_onehot_to_int(state)
+            out[:] = states
+        self._observed_states[:] = states
+        return out
+
+    def seed(self, seed):
+        self.batched_mdp.set_seed(seed)
+
+    @instrumentation.timed('gym.vector_reset')
+    def reset_wait(self, seed=None, options=None, **kwargs):
+        if seed is not None:
+            self.seed(seed)
+        return self._write_observations(self.batched_mdp.reset(), self._observations)
 
+    def step_async(self, actions):
+        self._actions = actions
 
+    @instrumentation.timed('gym.vector_step')
+    def step_wait(self, **kwargs):
+        next_states, rewards, dones = self.batched_mdp.step(self._actions)
+        infos = {'gamma': self.mdp.gamma}
+        if np.any(dones):
+            final_observation = np.full(self.num_envs, None, dtype=object)
+            for env in np.flatnonzero(dones):
+                if self._obs_one_hot:
+                    final_observation[env] = np.zeros(self.mdp.state_space, dtype=np.int32)
+                    final_observation[env][next_states[env]] = 1
+                else:
+                    final_observation[env] = next_states[env]
+            infos['final_observation'] = final_observation
+            infos['_final_observation'] = dones.copy()
+            next_states = self.batched_mdp.reset(mask=dones)
+        return self._write_observations(next_states, self._observations), rewards, dones, infos
@@ -0,0 +1,173 @@
+"""
+Estimating an MDP from experience.
+
+Example:
+```python
+model = EmpiricalMDP(mdp.state_space, mdp.action_space)
+model.update(*mdp.sample_transitions(state_action_distribution=d, n=10**6))
+V = analytic.calculate_V_pi(model.P_hat, model.R_hat, pi, mdp.gamma)
+```
+Accumulators of parallel workers can be combined with `merge`.
+"""
+import numpy as np
+from .common import MDP
+from . import instrumentation
+from . import memory
+
+
+class EmpiricalMDP(object):
+    def __init__(self, state_space, action_space, smoothing=0.):
+        """
+        Accumulates counts of transitions to estimate P_hat and R_hat:
+            P_hat(s, a, t) = (N(s, a, t) + smoothing) / (N(s, a) + |S| * smoothing)
+            R_hat(s, a) = (sum of the rewards observed after (s, a)) / N(s, a)
+        Transition counts are stored sparsely as sorted flat indices s*|A|*|S| + a*|S| + t and their counts.
+        (!) state-action pairs that were never visited (and smoothing=0) transition to themselves
+            with probability 1 and have a reward of 0, so that P_hat is always a valid transition matrix.
+        :param state_space: |S|
+        :param action_space: |A|
+        :param smoothing: the pseudo count added to every next state (additive smoothing).
+        """
+        self.state_space = state_space
+        self.action_space = action_space
+        self.smoothing = smoothing
+        self.state_action_counts = np.zeros((state_space, action_space), dtype=np.int64)
+        self.reward_sums = np.zeros((state_space, action_space))
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._pending = []
+        self._P_hat = None
+
+    @property
+    def n_transitions(self):
+        return int(self.state_action_counts.sum())
+
+    @instrumentation.timed('empirical.update')
+    def update(self, states, actions, rewards, next_states):
+        """
+        Adds a batch of transitions.
+        :param states: an integer array of states.
+        :param actions: an integer array of actions.
+        :param rewards: an array of rewards.
+        :param next_states: an integer array of next states.
+        :return: self
+        """
+        states = np.asarray(states, dtype=np.int64).ravel()
+        actions = np.asarray(actions, dtype=np.int64).ravel()
+        next_states = np.asarray(next_states, dtype=np.int64).ravel()
+        pairs = states * self.action_space + actions
+        n_pairs = self.state_space * self.action_space
+        self.state_action_counts += np.bincount(pairs, minlength=n_pairs).reshape(self.state_action_counts.shape)
+        self.reward_sums += np.bincount(pairs, weights=np.ravel(rewards),
+                                        minlength=n_pairs).reshape(self.reward_sums.shape)
+        keys, counts = np.unique(pairs * self.state_space + next_states, return_counts=True)
+        self._pending.append((keys, counts))
+        self._P_hat = None
+        return self
+
+    def update_from_dataset(self, dataset):
+        """
+        Adds all the transitions of an emdp.datasets.TrajectoryDataset, one shard at a time.
+        :return: self
+        """
+        for shard in dataset.iter_shards(columns=['state', 'action', 'reward', 'next_state']):
+            self.update(shard['state'], shard['action'], shard['reward'], shard['next_state'])
+        return self
+
+    def merge(self, other):
+        """
+        Adds the counts of another accumulator (e.g. from a parallel worker) to this one.
+        :param other: an EmpiricalMDP with the same state and action spaces.
+        :return: self
+        """
+        if (other.state_space, other.action_space) != (self.state_space, self.action_space):
+            raise ValueError('Cannot merge an EmpiricalMDP with {} states and {} actions into one with {} states '
+                             'and {} actions.'.format(other.state_space, other.action_space,
+                                                      self.state_space, self.action_space))
+        self.state_action_counts += other.state_action_counts
+        self.reward_sums += other.reward_sums
+        self._pending.append(other.transition_counts())
+        self._P_hat = None
+        return self
+
+    def transition_counts(self):
+        """
+        :return: (keys, counts) the sorted flat indices s*|A|*|S| + a*|S| + t of the observed transitions
+                 and how often each was observed.
+        """
+        if self._pending:
+            keys = np.concatenate([self._keys] + [keys for keys, _ in self._pending])
+            counts = np.concatenate([self._counts] + [counts for _, counts in self._pending])
+            self._keys, inverse = np.unique(keys, return_inverse=True)
+            self._counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(self._keys)).astype(np.int64)
+            self._pending = []
+        return self._keys, self._counts
+
+    def _transition_probabilities(self):
+        """
+        :return: (rows, next_states, probabilities) of the nonzero entries of the unsmoothed P_hat,
+                 where rows are the flat state-action pairs s*|A| + a.
+        """
+        keys, counts = self.transition_counts()
+        rows, next_states = np.divmod(keys, self.state_space)
+        # unvisited pairs transition to themselves.
+        unvisited = np.flatnonzero(self.state_action_counts.ravel() == 0)
+        rows = np.concatenate([rows, unvisited])
+        next_states = np.concatenate([next_states, unvisited // self.action_space])
+        probabilities = np.concatenate([counts / self.state_action_counts.ravel()[keys // self.state_space],
+                                        np.ones(len(unvisited))])
+        return rows, next_states, probabilities
+
+    @property
+    def P_hat(self):
+        """
+        The estimated transition matrix of size |S| x |A| x |S|. It is computed when first accessed after an update.
+        """
+        if self._P_hat is None or self._P_hat[0] != self.smoothing:
+            self._P_hat = (self.smoothing, self.transition_matrix())
+        return self._P_hat[1]
+
+    @property
+    def R_hat(self):
+        """
+        The estimated reward matrix of size |S| x |A|.
+        """
+        return self.reward_sums / np.maximum(self.state_action_counts, 1)
+
+    def transition_matrix(self, sparse=False):
+        """
+        :param sparse: return a scipy.sparse.csr_matrix of size (|S||A|) x |S| (requires scipy)
+                       where row s*|A| + a is P_hat(s, a, .)
+        :return: the estimated transition matrix.
+        """
+        if sparse:
+            if self.smoothing > 0:
+                raise ValueError('A smoothed transition matrix is dense, use sparse=False.')
+            import scipy.sparse
+            rows, next_states, probabilities = self._transition_probabilities()
+            return scipy.sparse.csr_matrix((probabilities, (rows, next_states)),
+                                           shape=(self.state_space * self.action_space, self.state_space))
+
+        memory.check_memory(memory.estimate_P_bytes(self.state_space, self.action_space),
+                            'EmpiricalMDP.transition_matrix with {} states'.format(self.state_space))
+        P = np.zeros((self.state_space * self.action_space, self.state_space))
+        if self.smoothing > 0:
+            keys, counts = self.transition_counts()
+            P.ravel()[keys] = counts
+            P += self.smoothing
+            P /= self.state_action_counts.reshape(-1, 1) + self.state_space * self.smoothing
+        else:
+            rows, next_states, probabilities = self._transition_probabilities()
+            P[rows, next_states] = probabilities
+        return P.reshape(self.state_space, self.action_space, self.state_space)
+
+    def to_mdp(self, gamma, p0=None, terminal_states=[], seed=1337):
+        """
+        :param gamma: the discount factor.
+        :param p0: the starting distribution (defaults to uniform over the states).
+        :param terminal_states: the terminal states of the MDP.
+        :param seed: the random seed for simulations.
+        :return: an MDP with P_hat and R_hat.
+        """
+        p0 = np.ones(self.state_space) / self.state_space if p0 is None else p0
+        return MDP(self.P_hat, self.R_hat, gamma, p0, terminal_states, seed=seed)
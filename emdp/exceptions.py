@@ -4,4 +4,10 @@ class EpisodeDoneError(TimeoutError):
     pass
 class InvalidActionError(ValueError):
     """An error for when an invalid action is taken"""
-    pass
\ No newline at end of file
+    pass
+class MemoryLimitExceededError(MemoryError):
+    """An error for when building or solving an MDP would exceed the memory limit (see emdp.memory)"""
+    pass
+class ConvergenceWarning(RuntimeWarning):
+    """A warning for when an iterative solver stops at max_iterations before reaching its tolerance"""
+    pass
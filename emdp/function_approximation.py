@@ -0,0 +1,144 @@
+"""
+Exact solutions of linear value function approximation V = Phi theta for a feature matrix Phi of size |S| x d.
+
+Every function also takes a batch of feature matrices of size n_features x |S| x d and then
+returns one solution per feature matrix, so many feature designs are compared in one call.
+The expected next features P_pi Phi are computed as sum_a pi(s,a) sum_t p(s,a,t) Phi(t),
+so no |S| x |S| matrix is formed.
+
+Example:
+```python
+theta = td_fixed_point(mdp.P, mdp.R, pi, mdp.gamma, Phi, weights)
+error = msve(V_pi, Phi, theta, weights)
+```
+"""
+import numpy as np
+from . import analytic
+from . import instrumentation
+
+
+def _batched(Phi):
+    """
+    :return: (Phi of size n_features x |S| x d, whether Phi was a single matrix)
+    """
+    Phi = np.asarray(Phi, dtype=np.float64)
+    return (Phi[None], True) if Phi.ndim == 2 else (Phi, False)
+
+
+def _state_weights(weights, n_states):
+    return np.ones(n_states) / n_states if weights is None else np.asarray(weights, dtype=np.float64)
+
+
+def _solve(A, b, ridge):
+    """
+    Solves the batch of d x d systems A theta = b.
+    """
+    if ridge:
+        A = A + ridge * np.eye(A.shape[-1])
+    return np.linalg.solve(A, b[..., None])[..., 0]
+
+
+def expected_next_features(P, pi, Phi):
+    r"""
+    :param P: Transition matrix
+    :param pi: policy matrix
+    :param Phi: features of size |S| x d or n_features x |S| x d
+    :return: (P_pi Phi)(s) = \sum_a pi(s,a) \sum_t p(s, a, t) Phi(t) of the same size as Phi.
+    """
+    Phi, single = _batched(Phi)
+    # |S| x |A| x n_features x d
+    P_Phi = np.tensordot(P, Phi, axes=([2], [1]))
+    next_features = np.einsum('sa,sabk->bsk', pi, P_Phi)
+    return next_features[0] if single else next_features
+
+
+@instrumentation.timed('function_approximation.td_fixed_point')
+def td_fixed_point(P, R, pi, gamma, Phi, weights=None, ridge=0.):
+    r"""
+    Calculates the TD fixed point: the solution of the projected Bellman equation Phi theta = Pi T_pi(Phi theta),
+    where Pi is the projection weighted by `weights`:
+    theta = (Phi^T D (Phi - gamma * P_pi Phi))^{-1} Phi^T D R_pi
+    It is also the limit of LSTD and of linear TD(0) with on-policy state weights.
+    :param P: Transition matrix
+    :param R: Reward matrix
+    :param pi: policy matrix
+    :param gamma: discount factor
+    :param Phi: features of size |S| x d or n_features x |S| x d
+    :param weights: the weighting of the states of size |S| (e.g. the stationary distribution of pi).
+                    Defaults to uniform weights.
+    :param ridge: an L2 regularization added to the diagonal of the d x d system.
+    :return: theta of size d or n_features x d
+    """
+    Phi, single = _batched(Phi)
+    weights = _state_weights(weights, Phi.shape[1])
+    next_features = expected_next_features(P, pi, Phi)
+    A = np.einsum('bsk,s,bsl->bkl', Phi, weights, Phi - gamma * next_features)
+    b = np.einsum('bsk,s,s->bk', Phi, weights, analytic.calculate_R_pi(R, pi))
+    theta = _solve(A, b, ridge)
+    return theta[0] if single else theta
+
+
+@instrumentation.timed('function_approximation.lstd')
+def lstd(states, rewards, next_states, gamma, Phi, dones=None, ridge=0.):
+    r"""
+    Least-squares TD from sampled transitions (e.g. from MDP.sample_transitions):
+    theta = (\sum_i phi(s_i) (phi(s_i) - gamma * phi(s'_i))^T)^{-1} \sum_i phi(s_i) r_i
+    :param states: an integer array of states.
+    :param rewards: an array of rewards.
+    :param next_states: an integer array of next states.
+    :param gamma: discount factor
+    :param Phi: features of size |S| x d or n_features x |S| x d
+    :param dones: a boolean array indicating transitions after which the episode ended (their next state is not used).
+    :param ridge: an L2 regularization added to the diagonal of the d x d system.
+    :return: theta of size d or n_features x d
+    """
+    Phi, single = _batched(Phi)
+    # the visits of each state and the counts of each transition are enough to build the system.
+    n_states = Phi.shape[1]
+    continuing = np.ones(len(states), dtype=bool) if dones is None else ~np.asarray(dones, dtype=bool)
+    visits = np.bincount(states, minlength=n_states).astype(np.float64)
+    reward_sums = np.bincount(states, weights=rewards, minlength=n_states)
+    transitions = np.asarray(states)[continuing] * n_states + np.asarray(next_states)[continuing]
+    pairs, counts = np.unique(transitions, return_counts=True)
+    from_states, to_states = np.divmod(pairs, n_states)
+
+    A = np.einsum('bsk,s,bsl->bkl', Phi, visits, Phi)
+    A -= gamma * np.einsum('bik,i,bil->bkl', Phi[:, from_states], counts.astype(np.float64), Phi[:, to_states])
+    b = np.einsum('bsk,s->bk', Phi, reward_sums)
+    theta = _solve(A, b, ridge)
+    return theta[0] if single else theta
+
+
+@instrumentation.timed('function_approximation.msve_solution')
+def msve_solution(V, Phi, weights=None, ridge=0.):
+    """
+    Calculates the best approximation of V in the mean squared value error (MSVE):
+    theta = (Phi^T D Phi)^{-1} Phi^T D V
+    :param V: the values to approximate of size |S| (e.g. V_pi from analytic.calculate_V_pi_matrix_free)
+    :param Phi: features of size |S| x d or n_features x |S| x d
+    :param weights: the weighting of the states of size |S|. Defaults to uniform weights.
+    :param ridge: an L2 regularization added to the diagonal of the d x d system.
+    :return: theta of size d or n_features x d
+    """
+    Phi, single = _batched(Phi)
+    weights = _state_weights(weights, Phi.shape[1])
+    A = np.einsum('bsk,s,bsl->bkl', Phi, weights, Phi)
+    b = np.einsum('bsk,s,s->bk', Phi, weights, V)
+    theta = _solve(A, b, ridge)
+    return theta[0] if single else theta
+
+
+def msve(V, Phi, theta, weights=None):
+    """
+    The mean squared value error sum_s weights(s) ((Phi theta)(s) - V(s))^2
+    :param V: the true values of size |S|
+    :param Phi: features of size |S| x d or n_features x |S| x d
+    :param theta: parameters of size d or n_features x d
+    :param weights: the weighting of the states of size |S|. Defaults to uniform weights.
+    :return: the error, or an array of size n_features.
+    """
+    Phi, single = _batched(Phi)
+    weights = _state_weights(weights, Phi.shape[1])
+    errors = np.einsum('bsk,bk->bs', Phi, np.reshape(theta, (len(Phi), -1))) - V
+    error = np.einsum('bs,s->b', errors ** 2, weights)
+    return error[0] if single else error
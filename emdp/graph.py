@@ -0,0 +1,157 @@
+"""
+Tools to analyze the graph induced by the support of a transition matrix.
+"""
+import numpy as np
+
+
+def support_graph(P):
+    """
+    The adjacency matrix of the graph where there is an edge s->t
+    if t can be reached from s in one step using any action.
+    :param P: transition matrix of size |S|x|A|x|S| or |S|x|S| (e.g. P_pi), dense or scipy.sparse.
+    :return: a boolean matrix of size |S| x |S|, a scipy.sparse.csr_matrix if P is sparse.
+    """
+    if hasattr(P, 'tocsr'):
+        return P.tocsr() > 0
+    if P.ndim == 3:
+        return (P > 0).any(axis=1)
+    return P > 0
+
+
+def reachable_states(P, p0):
+    """
+    Finds all states that can be reached from the support of p0 using a breadth-first search.
+    :param P: transition matrix of size |S|x|A|x|S| or |S|x|S| (e.g. P_pi), dense or scipy.sparse.
+    :param p0: the distribution over starting states |S|
+    :return: a sorted integer array of the reachable states.
+    """
+    adjacency = support_graph(P)
+    sparse = hasattr(adjacency, 'tocsr')
+    reached = np.asarray(p0) > 0
+    frontier = np.flatnonzero(reached)
+    while len(frontier) > 0:
+        # each state is only expanded once, when it is first reached.
+        if sparse:
+            successors = np.zeros(len(reached), dtype=bool)
+            successors[adjacency[frontier].indices] = True
+            successors &= ~reached
+        else:
+            successors = adjacency[frontier].any(axis=0) & ~reached
+        reached |= successors
+        frontier = np.flatnonzero(successors)
+    return np.flatnonzero(reached)
+
+
+class StateCompaction(object):
+    """
+    Index maps between the states of an MDP and the states kept in its compacted version.
+    """
+
+    def __init__(self, states, original_state_space):
+        """
+        :param states: integer array of the original indices of the states that were kept.
+        :param original_state_space: the number of states in the original MDP.
+        """
+        self.states = np.asarray(states)
+        self.original_state_space = original_state_space
+        # index of each original state in the compacted MDP (-1 if it was removed)
+        self.index_of = np.full(original_state_space, -1, dtype=np.int64)
+        self.index_of[self.states] = np.arange(len(self.states))
+
+    def restrict(self, values):
+        """
+        Restricts an array over the original states (e.g. V, Q, pi) to the kept states.
+        :param values: array whose first dimension is over the original states.
+        :return:
+        """
+        return np.asarray(values)[self.states]
+
+    def lift(self, values, fill_value=0.):
+        """
+        Lifts an array over the compacted states (e.g. V, Q, pi) back to the original states.
+        :param values: array whose first dimension is over the compacted states.
+        :param fill_value: the value given to the removed states.
+                           (!) use 1/|A| to lift a policy to a valid distribution.
+        :return:
+        """
+        values = np.asarray(values)
+        lifted = np.full((self.original_state_space,) + values.shape[1:], fill_value,
+                         dtype=np.result_type(values, fill_value))
+        lifted[self.states] = values
+        return lifted
+
+
+def strongly_connected_components(adjacency):
+    """
+    Computes the strongly connected components of a graph using (an iterative version of) Tarjan's algorithm.
+    :param adjacency: a boolean adjacency matrix of size |S| x |S|, dense or scipy.sparse (e.g. from support_graph)
+    :return: a list of sorted integer arrays, one per component, in reverse topological order:
+             a component is only listed after every component that can be reached from it.
+    """
+    n_states = adjacency.shape[0]
+    if hasattr(adjacency, 'tocsr'):
+        # the nonzero entries of a csr matrix are listed by row.
+        adjacency = adjacency.tocsr()
+    rows, cols = adjacency.nonzero()
+    indptr = np.searchsorted(rows, np.arange(n_states + 1)).tolist()
+    successors = cols.tolist()
+
+    index = [-1] * n_states
+    lowlink = [0] * n_states
+    on_stack = [False] * n_states
+    stack = []
+    components = []
+    counter = 0
+    for root in range(n_states):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        # each entry is a state and the position of the next successor to visit.
+        work = [(root, indptr[root])]
+        while work:
+            state, position = work[-1]
+            if position < indptr[state + 1]:
+                work[-1] = (state, position + 1)
+                successor = successors[position]
+                if index[successor] == -1:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, indptr[successor]))
+                elif on_stack[successor]:
+                    lowlink[state] = min(lowlink[state], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[state])
+                if lowlink[state] == index[state]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == state:
+                            break
+                    components.append(np.array(sorted(component)))
+    return components
+
+
+def sink_components(adjacency):
+    """
+    The strongly connected components that no edge leaves, e.g. the closed classes of a Markov chain.
+    :param adjacency: a boolean adjacency matrix of size |S| x |S|, dense or scipy.sparse (e.g. from support_graph)
+    :return: a list of sorted integer arrays, in the order of strongly_connected_components.
+    """
+    components = strongly_connected_components(adjacency)
+    labels = np.empty(adjacency.shape[0], dtype=np.int64)
+    for label, component in enumerate(components):
+        labels[component] = label
+    rows, cols = adjacency.nonzero()
+    left = np.zeros(len(components), dtype=bool)
+    left[labels[rows][labels[rows] != labels[cols]]] = True
+    return [component for label, component in enumerate(components) if not left[label]]
@@ -1,3 +1,19 @@
+import importlib
 from .env import GridWorldMDP
 from .helper_utilities import build_simple_grid
-from .plotting import GridWorldPlotter
\ No newline at end of file
+from .implicit import ImplicitGridWorldMDP
+
+# plotting and rendering tools are imported on first access.
+# (!) rendering imports matplotlib.
+_LAZY_ATTRIBUTES = {
+    'GridWorldPlotter': 'plotting',
+    'BatchRenderer': 'rendering',
+    'render_batch': 'rendering',
+    'RGBArrayRenderer': 'rgb_array',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module('.' + _LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
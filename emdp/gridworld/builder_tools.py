@@ -2,6 +2,8 @@
 Utilities to help build more complex grid worlds.
 """
 import numpy as np
+from .. import instrumentation
+from .. import memory
 
 from . import GridWorldMDP
 from .helper_utilities import (build_simple_grid,
@@ -18,10 +20,14 @@ class TransitionMatrixBuilder(object):
         self.grid_size = grid_size
         self.action_space = action_space
         self.state_space = grid_size * grid_size + int(has_terminal_state)
+        memory.check_memory(
+            memory.estimate_grid_world_bytes(grid_size, action_space, has_terminal_state)['total'],
+            'TransitionMatrixBuilder(grid_size={})'.format(grid_size))
         self._P = np.zeros((self.state_space, self.action_space, self.state_space))
         self.grid_added = False
         self.P_modified = False
 
+    @instrumentation.timed('builder.add_grid')
     def add_grid(self, terminal_states=[], p_success=1):
         """
         Adds a grid so that you cant walk off the edges of the grid
@@ -43,6 +49,7 @@ class TransitionMatrixBuilder(object):
         self.grid_added = True
         self.P_modified = True
 
+    @instrumentation.timed('builder.add_wall_at')
     def add_wall_at(self, tuple_location):
         """
         Add a blockade at this position
@@ -4,6 +4,7 @@ A simple grid world environment
 import numpy as np
 import random
 from ..common import MDP
+from .. import instrumentation
 from ..exceptions import EpisodeDoneError, InvalidActionError
 from ..actions import LEFT, RIGHT, UP, DOWN
 from .helper_utilities import flatten_state, unflatten_state
@@ -27,14 +28,35 @@ class GridWorldMDP(MDP):
         if not convert_terminal_states_to_ints:
             terminal_states = list(map(lambda tupl: int(size * tupl[0] + tupl[1]), terminal_states))
         self.size =  size
-        self.human_state = (None, None)
         self.has_absorbing_state = len(terminal_states) > 0
         super().__init__(P, R, gamma, p0, terminal_states, seed=seed, skip_check=skip_check)
 
-    def reset(self):
-        super().reset()
-        self.human_state = self.unflatten_state(self.current_state)
-        return self.current_state
+    @property
+    def human_state(self):
+        """
+        The current state as an (x,y) pair. The absorbing state is (size, 0), as in the 'grid' observation,
+        which flatten_state maps back to the absorbing state.
+        """
+        if self.current_state_idx is None:
+            return (None, None)
+        return divmod(self.current_state_idx, self.size)
+
+    @instrumentation.timed('mdp.observation')
+    def get_observation(self, representation='onehot', out=None):
+        """
+        Returns the current state in the requested representation.
+        :param representation: 'onehot', 'int' or 'grid' for the (x,y) location.
+                               (!) In the 'grid' representation the absorbing state is (size, 0).
+        :param out: an array to write the one hot vector or the (x,y) location into.
+        :return:
+        """
+        if representation != 'grid':
+            return super().get_observation(representation, out=out)
+        location = divmod(self.current_state_idx, self.size)
+        if out is None:
+            return np.array(location)
+        out[:] = location
+        return out
 
     def flatten_state(self, state):
         """Flatten state (x,y) into a one hot vector"""
@@ -44,10 +66,5 @@ class GridWorldMDP(MDP):
         """Unflatten a one hot vector into a (x,y) pair"""
         return unflatten_state(onehot, self.size, self.has_absorbing_state)
 
-    def step(self, action):
-        state, reward, done, info = super().step(action)
-        self.human_state = self.unflatten_state(self.current_state)
-        return state, reward, done, info
-
     def set_current_state_to(self, tuple_state):
         return super().set_current_state_to(self.flatten_state(tuple_state).argmax())
@@ -1,6 +1,8 @@
 import numpy as np
 from ..actions import LEFT, RIGHT, UP, DOWN
 from ..exceptions import InvalidActionError
+from .. import instrumentation
+from .. import memory
 n_actions = 4
 
 def flatten_state(state, size, state_space):
@@ -103,6 +105,7 @@ def get_possible_actions(state, grid_size):
 #     one_hot[idx] = 1
 #     return one_hot
 
+@instrumentation.timed('builder.build_simple_grid')
 def build_simple_grid(size=5, terminal_states=[], p_success=1):
     """
     Builds a simple grid where an agent can move LEFT, RIGHT, UP or DOWN
@@ -116,6 +119,9 @@ def build_simple_grid(size=5, terminal_states=[], p_success=1):
     :param p_success: the probabilty that an action will be successful.
     :return:
     """
+    memory.check_memory(
+        memory.estimate_grid_world_bytes(size, has_absorbing_state=len(terminal_states) > 0)['total'],
+        'build_simple_grid(size={})'.format(size))
     p_fail = 1 - p_success
 
     n_states = size*size
@@ -0,0 +1,204 @@
+"""
+A grid world whose dynamics are computed arithmetically instead of
+being stored in a |S|x|A|x|S| transition matrix.
+"""
+import numpy as np
+from ..common import Env
+from .. import utils
+from .. import instrumentation
+from ..actions import LEFT, RIGHT, UP, DOWN
+from .env import GridWorldMDP
+from .helper_utilities import n_actions
+
+
+class ImplicitGridWorldMDP(GridWorldMDP):
+    def __init__(self, R, gamma, p0, terminal_states, size, walls=None, p_success=1, seed=1337,
+                 skip_check=False, convert_terminal_states_to_ints=False):
+        """
+        A matrix-free GridWorldMDP. Only a wall bitmap and the slip model are stored.
+        The dynamics are the same as those obtained from `build_simple_grid` followed
+        by `TransitionMatrixBuilder.add_wall_at` for every wall:
+            - the intended action succeeds with probability p_success,
+            - otherwise the agent slips uniformly into one of the other directions
+              that do not lead off the grid,
+            - moving into a wall or off the grid leaves the agent where it is,
+            - walls are absorbing,
+            - terminal states lead to the absorbing state (which is the last state).
+
+        (!) use `apply_P` and `apply_P_pi` to compute expectations over next states.
+            Accessing `P` builds the dense transition matrix and should only be done for small grids.
+        :param R: Reward matrix |S| x |A|
+        :param gamma: discount factor
+        :param p0: initial starting distribution
+        :param terminal_states: Must be a list of (x,y) tuples. use convert_terminal_states_to_ints if giving ints
+        :param size: the size of the grid world (i.e there are size x size (+ 1)= |S| states)
+        :param walls: a boolean array of shape size x size or a list of (x,y) tuples with the wall locations.
+        :param p_success: the probability that an action will be successful.
+        :param seed: the random seed for simulations.
+        :param skip_check:
+        """
+        if not convert_terminal_states_to_ints:
+            terminal_states = list(map(lambda tupl: int(size * tupl[0] + tupl[1]), terminal_states))
+        self.size = size
+        self.has_absorbing_state = len(terminal_states) > 0
+        self.p_success = p_success
+        self.walls = self._build_wall_bitmap(walls, size)
+
+        self.state_space = size * size + int(self.has_absorbing_state)
+        self.action_space = n_actions
+        if not skip_check: assert 0 <= p_success <= 1, 'p_success must be a probability.'
+        if not skip_check: assert R.shape == (self.state_space, self.action_space), \
+            'Reward matrix is not of size |S|x|A|'
+        if not skip_check: assert self.state_space == p0.shape[0], 'Distribution over initial states is not over |S|'
+
+        self.R = R
+        self.gamma = gamma
+        self.p0 = p0
+        self.terminal_states = terminal_states
+        self._terminal_mask = np.zeros(size * size, dtype=bool)
+        self._terminal_mask[[s for s in terminal_states if s < size * size]] = True
+
+        Env.__init__(self, seed)
+        self.current_state = None
+        self.reset()
+
+    @staticmethod
+    def _build_wall_bitmap(walls, size):
+        bitmap = np.zeros((size, size), dtype=bool)
+        if walls is None:
+            return bitmap
+        walls = np.asarray(walls)
+        if walls.dtype == bool:
+            bitmap[:] = walls
+        elif walls.size > 0:
+            bitmap[walls[:, 0], walls[:, 1]] = True
+        return bitmap
+
+    @property
+    def absorbing_state(self):
+        return self.size * self.size if self.has_absorbing_state else None
+
+    def _grid_moves(self, cells):
+        """
+        Computes where each direction leads to from the grid cells `cells`.
+        :param cells: integer array of grid cells.
+        :return: (destinations, can_move) both of shape |A| x len(cells).
+                 `can_move` indicates if the direction does not lead off the grid.
+                 `destinations` is the cell reached, accounting for edges and walls.
+        """
+        row, col = np.divmod(cells, self.size)
+        can_move = np.empty((n_actions, len(cells)), dtype=bool)
+        can_move[LEFT] = col > 0
+        can_move[RIGHT] = col < self.size - 1
+        can_move[UP] = row > 0
+        can_move[DOWN] = row < self.size - 1
+
+        destinations = np.empty((n_actions, len(cells)), dtype=np.int64)
+        destinations[LEFT] = cells - 1
+        destinations[RIGHT] = cells + 1
+        destinations[UP] = cells - self.size
+        destinations[DOWN] = cells + self.size
+        destinations = np.where(can_move, destinations, cells)
+
+        walls = self.walls.ravel()
+        # cannot move into a wall and cannot move out of one.
+        destinations = np.where(walls[destinations] | walls[cells], cells, destinations)
+        return destinations, can_move
+
+    def _move_probabilities(self, can_move, action):
+        """
+        The probability of moving in each direction when executing `action`.
+        :param can_move: the boolean array returned by `_grid_moves`.
+        :param action: the intended action.
+        :return: an array of shape |A| x n_cells.
+        """
+        # slipping is only possible in directions that do not lead off the grid.
+        n_slip_directions = can_move.sum(0) - can_move[action]
+        probs = can_move * ((1 - self.p_success) / np.maximum(n_slip_directions, 1))
+        probs[action] = self.p_success
+        return probs
+
+    @instrumentation.timed('mdp.sample')
+    def _sample_next_state(self, state_idx, action):
+        if self.has_absorbing_state and (state_idx == self.absorbing_state or self._terminal_mask[state_idx]):
+            return self.absorbing_state
+        destinations, can_move = self._grid_moves(np.array([state_idx]))
+        probs = self._move_probabilities(can_move, action)
+        return destinations[self.rng.choice(n_actions, p=probs[:, 0]), 0]
+
+    def _sample_next_states(self, state_idxs, actions, rng):
+        state_idxs = np.asarray(state_idxs, dtype=np.int64)
+        next_states = np.empty_like(state_idxs)
+        in_grid = state_idxs < self.size * self.size
+        if self.has_absorbing_state:
+            in_grid[in_grid] = ~self._terminal_mask[state_idxs[in_grid]]
+            next_states[~in_grid] = self.absorbing_state
+        cells = state_idxs[in_grid]
+        actions = np.asarray(actions)[in_grid]
+        moves = np.arange(len(cells))
+        destinations, can_move = self._grid_moves(cells)
+        n_slip_directions = can_move.sum(0) - can_move[actions, moves]
+        probs = can_move * ((1 - self.p_success) / np.maximum(n_slip_directions, 1))
+        probs[actions, moves] = self.p_success
+        next_states[in_grid] = destinations[utils.sample_categorical(probs.T, rng), moves]
+        return next_states
+
+    def _sample_bytes_per_pair(self):
+        # the destinations, probabilities, cumulative sums and comparisons of each of the |A| moves.
+        return 4 * 8 * n_actions
+
+    def apply_P(self, V):
+        r"""
+        Matrix-free application of the transition matrix to a vector:
+        (PV)(s, a) = \sum_t p(s, a, t) V(t)
+        :param V: a vector of size |S|
+        :return: a matrix of size |S| x |A|
+        """
+        V = np.asarray(V)
+        n_cells = self.size * self.size
+        destinations, can_move = self._grid_moves(np.arange(n_cells))
+        n_possible = can_move.sum(0)
+        V_next = V[destinations]
+        V_possible = (can_move * V_next).sum(0)
+
+        PV = np.empty((self.state_space, self.action_space))
+        for action in range(self.action_space):
+            n_slip_directions = np.maximum(n_possible - can_move[action], 1)
+            V_slip = V_possible - can_move[action] * V_next[action]
+            PV[:n_cells, action] = (self.p_success * V_next[action]
+                                    + (1 - self.p_success) * V_slip / n_slip_directions)
+        if self.has_absorbing_state:
+            PV[:n_cells][self._terminal_mask] = V[self.absorbing_state]
+            PV[self.absorbing_state] = V[self.absorbing_state]
+        return PV
+
+    def apply_P_pi(self, V, pi):
+        r"""
+        Matrix-free application of P_pi to a vector:
+        (P_pi V)(s) = \sum_a pi(s,a) \sum_t p(s, a, t) V(t)
+        :param V: a vector of size |S|
+        :param pi: matrix of size |S| x |A| indicating the policy
+        :return: a vector of size |S|
+        """
+        return np.einsum('sa,sa->s', pi, self.apply_P(V))
+
+    @property
+    def P(self):
+        """
+        Builds the dense transition matrix |S|x|A|x|S|.
+        (!) This defeats the purpose of this class and should only be used for small grids.
+        """
+        n_cells = self.size * self.size
+        cells = np.arange(n_cells)
+        destinations, can_move = self._grid_moves(cells)
+        P = np.zeros((self.state_space, self.action_space, self.state_space))
+        for action in range(self.action_space):
+            probs = self._move_probabilities(can_move, action)
+            for direction in range(n_actions):
+                np.add.at(P, (cells, action, destinations[direction]), probs[direction])
+        if self.has_absorbing_state:
+            terminal_cells = np.flatnonzero(self._terminal_mask)
+            P[terminal_cells] = 0
+            P[terminal_cells, :, self.absorbing_state] = 1
+            P[self.absorbing_state, :, self.absorbing_state] = 1
+        return P
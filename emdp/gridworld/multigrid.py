@@ -0,0 +1,202 @@
+"""
+Multigrid value iteration for grid worlds.
+
+The grid is coarsened into blocks of block_size x block_size cells. The aggregated problems are solved
+(recursively) and their solutions are prolonged back to the finer grid to correct value iteration.
+"""
+import numpy as np
+from .. import analytic
+from .. import graph
+
+
+def _sum_blocks(grid_array, block_size):
+    """
+    Sums the last two (grid) dimensions of an array over blocks of block_size x block_size cells.
+    The last block in each dimension is smaller if block_size does not divide the size of the grid.
+    :param grid_array: an array of shape (..., size, size)
+    :param block_size:
+    :return: an array of shape (..., coarse_size, coarse_size)
+    """
+    starts = np.arange(0, grid_array.shape[-1], block_size)
+    return np.add.reduceat(np.add.reduceat(grid_array, starts, axis=-2), starts, axis=-1)
+
+
+def coarsen_grid_mdp(P, R, size, has_absorbing_state, weights, block_size=2):
+    """
+    Aggregates a grid world into a coarser one where every block_size x block_size block of cells is a state.
+    The dynamics and rewards of a block are the weighted average of those of the cells in it.
+    The absorbing state (if any) stays a separate state.
+    :param P: transition matrix of size |S|x|A|x|S|
+    :param R: reward matrix of size |S|x|A|
+    :param size: the size of the grid world.
+    :param has_absorbing_state: boolean indicating if the last state is an absorbing state.
+    :param weights: the weight of each state in its block, size |S|.
+    :param block_size: the number of cells along each side of a block.
+    :return: (P_coarse, R_coarse, weights_coarse, coarse_size)
+    """
+    n_cells = size * size
+    n_actions = P.shape[1]
+    coarse_size = -(-size // block_size)
+    n_coarse_cells = coarse_size * coarse_size
+    n_coarse_states = n_coarse_cells + int(has_absorbing_state)
+
+    # probability of landing in each block.
+    P_to_blocks = np.empty((P.shape[0], n_actions, n_coarse_states))
+    P_to_blocks[:, :, :n_coarse_cells] = _sum_blocks(
+        P[:, :, :n_cells].reshape(P.shape[0], n_actions, size, size), block_size).reshape(
+        P.shape[0], n_actions, n_coarse_cells)
+    P_to_blocks[:, :, n_coarse_cells:] = P[:, :, n_cells:]
+
+    # weighted average over the cells of each block.
+    cell_weights = weights[:n_cells].reshape(size, size)
+    weights_coarse = np.empty(n_coarse_states)
+    weights_coarse[:n_coarse_cells] = _sum_blocks(cell_weights, block_size).ravel()
+    weights_coarse[n_coarse_cells:] = weights[n_cells:]
+
+    P_coarse = np.empty((n_coarse_states, n_actions, n_coarse_states))
+    weighted_P = (P_to_blocks[:n_cells] * weights[:n_cells, None, None]).reshape(size, size, -1)
+    P_coarse[:n_coarse_cells] = np.moveaxis(
+        _sum_blocks(np.moveaxis(weighted_P, (0, 1), (-2, -1)), block_size), (-2, -1), (0, 1)).reshape(
+        n_coarse_cells, n_actions, n_coarse_states)
+    P_coarse[n_coarse_cells:] = P_to_blocks[n_cells:]
+
+    R_coarse = np.empty((n_coarse_states, n_actions))
+    weighted_R = (R[:n_cells] * weights[:n_cells, None]).reshape(size, size, n_actions)
+    R_coarse[:n_coarse_cells] = np.moveaxis(
+        _sum_blocks(np.moveaxis(weighted_R, (0, 1), (-2, -1)), block_size), (-2, -1), (0, 1)).reshape(
+        n_coarse_cells, n_actions)
+    R_coarse[n_coarse_cells:] = R[n_cells:]
+
+    # normalize by the weight of each block. Blocks without any weight become absorbing.
+    empty_blocks = np.flatnonzero(weights_coarse[:n_coarse_cells] == 0)
+    normalization = np.where(weights_coarse > 0, weights_coarse, 1)
+    normalization[n_coarse_cells:] = 1
+    P_coarse /= normalization[:, None, None]
+    R_coarse /= normalization[:, None]
+    P_coarse[empty_blocks] = 0
+    P_coarse[empty_blocks, :, empty_blocks] = 1
+    R_coarse[empty_blocks] = 0
+    return P_coarse, R_coarse, weights_coarse, coarse_size
+
+
+def prolong_values(V_coarse, size, coarse_size, has_absorbing_state, block_size=2):
+    """
+    Copies the value of each block to all the cells in it.
+    :param V_coarse: values of the coarse grid world.
+    :param size: the size of the fine grid world.
+    :param coarse_size: the size of the coarse grid world.
+    :param has_absorbing_state: boolean indicating if the last state is an absorbing state.
+    :param block_size: the number of cells along each side of a block.
+    :return: values of the fine grid world.
+    """
+    rows, cols = np.divmod(np.arange(size * size), size)
+    blocks = (rows // block_size) * coarse_size + cols // block_size
+    if has_absorbing_state:
+        blocks = np.append(blocks, coarse_size * coarse_size)
+    return V_coarse[blocks]
+
+
+def _solve_by_aggregation(P_pi, b, gamma, size, has_absorbing_state, weights,
+                          block_size, min_size, n_smoothing):
+    """
+    Approximately solves (I - gamma*P_pi) y = b with one multigrid cycle: the error left after
+    a few fixed point iterations is corrected with the solution of the aggregated system,
+    which is itself obtained recursively. The coarsest system is solved exactly.
+    """
+    if size <= min_size:
+        return np.linalg.solve(np.eye(len(b)) - gamma * P_pi, b)
+    y = b.copy()
+    for _ in range(n_smoothing - 1):
+        y = b + gamma * P_pi.dot(y)
+    residual = b - y + gamma * P_pi.dot(y)
+    P_pi_coarse, residual_coarse, weights_coarse, coarse_size = coarsen_grid_mdp(
+        P_pi[:, None, :], residual[:, None], size, has_absorbing_state, weights, block_size=block_size)
+    y_coarse = _solve_by_aggregation(P_pi_coarse[:, 0], residual_coarse[:, 0], gamma, coarse_size,
+                                     has_absorbing_state, weights_coarse, block_size, min_size, n_smoothing)
+    y += prolong_values(y_coarse, size, coarse_size, has_absorbing_state, block_size=block_size)
+    for _ in range(n_smoothing):
+        y = b + gamma * P_pi.dot(y)
+    return y
+
+
+def _multigrid_value_iteration(P, R, gamma, size, has_absorbing_state, weights,
+                               block_size, min_size, n_smoothing, warm_start, tol, max_iterations):
+    V = np.zeros(P.shape[0])
+    if warm_start and size > min_size:
+        # warm start with the solution of the aggregated grid world.
+        P_coarse, R_coarse, weights_coarse, coarse_size = coarsen_grid_mdp(
+            P, R, size, has_absorbing_state, weights, block_size=block_size)
+        V_coarse = _multigrid_value_iteration(P_coarse, R_coarse, gamma, coarse_size, has_absorbing_state,
+                                              weights_coarse, block_size, min_size, n_smoothing,
+                                              warm_start, tol, max_iterations)
+        V = prolong_values(V_coarse, size, coarse_size, has_absorbing_state, block_size=block_size)
+
+    def bellman_backup(V):
+        return R + gamma * np.einsum('sat,t->sa', P, V)
+
+    states = np.arange(P.shape[0])
+    # number of value iteration steps to take before trying the next correction.
+    backoff = skip = 0
+    Q = bellman_backup(V)
+    for _ in range(max_iterations):
+        V_new = np.max(Q, axis=1)
+        bellman_residual = V_new - V
+        residual = np.max(np.abs(bellman_residual))
+        if residual < tol:
+            return V_new
+        Q_new = bellman_backup(V_new)
+        if skip > 0:
+            skip -= 1
+            V, Q = V_new, Q_new
+            continue
+        # correct V towards the value of the greedy policy:
+        # V_pi = V + (I - gamma*P_pi)^{-1} (T V - V)
+        # the correction is only kept if it leaves a Bellman residual at most half of that of the
+        # value iteration step, otherwise corrections are tried again after exponentially more steps.
+        P_pi = P[states, Q.argmax(axis=1)]
+        V_corrected = V + _solve_by_aggregation(P_pi, bellman_residual, gamma, size, has_absorbing_state,
+                                                weights, block_size, min_size, n_smoothing)
+        Q_corrected = bellman_backup(V_corrected)
+        if (np.max(np.abs(np.max(Q_corrected, axis=1) - V_corrected))
+                < 0.5 * np.max(np.abs(np.max(Q_new, axis=1) - V_new))):
+            V, Q = V_corrected, Q_corrected
+            backoff = 0
+        else:
+            V, Q = V_new, Q_new
+            backoff = skip = 2 * backoff + 1
+    analytic._warn_not_converged('multigrid_value_iteration', max_iterations, residual, tol)
+    return np.max(Q, axis=1)
+
+
+def multigrid_value_iteration(mdp, block_size=2, min_size=4, n_smoothing=2, warm_start=False,
+                              tol=1e-8, max_iterations=10000):
+    """
+    Value iteration for a GridWorldMDP accelerated with state aggregation over a hierarchy of grids,
+    each block_size times coarser than the previous one, until the grid is at most min_size x min_size.
+    After a Bellman backup, V is corrected towards the value of the greedy policy by solving for the
+    error on the coarser grids (aggregation multigrid). This removes the smooth components of the error
+    that value iteration only shrinks by a factor of gamma per sweep, which dominate when gamma is close to 1.
+    Corrections that do not clearly beat a value iteration step are discarded.
+    This residual correction scheme is the default: each level starts from V = 0 and the coarse grids
+    are only used for corrections, not to warm start the finer grids (see warm_start).
+    Only states reachable from p0 are averaged into the blocks so that walls do not distort
+    the aggregated dynamics.
+
+    (!) warm_start additionally initializes every level with the prolonged solution of the aggregated
+        grid world. Errors of the aggregated dynamics (e.g. next to walls) then decay at a rate of gamma,
+        so this is usually slower than starting from zero and is disabled by default.
+    :param mdp: the GridWorldMDP to solve.
+    :param block_size: the number of cells along each side of a block.
+    :param min_size: the size of the coarsest grid world, where systems are solved exactly.
+    :param n_smoothing: the number of fixed point iterations before and after each coarse correction.
+    :param warm_start: boolean indicating if each level is initialized with the values of the coarser one.
+    :param tol: stop when the largest change in V from a Bellman backup is below this value.
+    :param max_iterations: the maximum number of Bellman backups (per level).
+                           A ConvergenceWarning is emitted if tol is not reached.
+    :return: V_star
+    """
+    P = mdp.P
+    weights = np.zeros(mdp.state_space)
+    weights[graph.reachable_states(P, mdp.p0)] = 1
+    return _multigrid_value_iteration(P, mdp.R, mdp.gamma, mdp.size, mdp.has_absorbing_state, weights,
+                                      block_size, min_size, n_smoothing, warm_start, tol, max_iterations)
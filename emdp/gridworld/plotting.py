@@ -1,7 +1,74 @@
 from .helper_utilities import unflatten_state
 from .env import GridWorldMDP
+from .. import utils
+from ..actions import LEFT, RIGHT, UP, DOWN
 import numpy as np
 
+# direction of the arrow drawn for each action, as (horizontal, vertical) on the screen.
+ACTION_ARROWS = np.zeros((4, 2))
+ACTION_ARROWS[LEFT] = (-1, 0)
+ACTION_ARROWS[RIGHT] = (1, 0)
+ACTION_ARROWS[UP] = (0, 1)
+ACTION_ARROWS[DOWN] = (0, -1)
+
+
+def values_to_grid(V, size):
+    """
+    Arranges a vector over states as an image: cell (x,y) is at row x and column y.
+    The absorbing state (if any) is dropped.
+    :param V: a vector of size |S|
+    :param size: the size of the grid world.
+    :return: an array of size `size` x `size`
+    """
+    return np.asarray(V)[:size * size].reshape(size, size)
+
+
+def policy_to_arrows(pi, size):
+    """
+    Converts a policy into one arrow per cell pointing in the expected direction of movement.
+    :param pi: a policy matrix of size |S| x |A| or a vector of actions of size |S|
+    :param size: the size of the grid world.
+    :return: (U, V) the horizontal and vertical components of the arrows, each of size `size` x `size`
+    """
+    pi = np.asarray(pi)[:size * size]
+    if pi.ndim == 1:
+        arrows = ACTION_ARROWS[pi]
+    else:
+        arrows = pi.dot(ACTION_ARROWS)
+    return arrows[:, 0].reshape(size, size), arrows[:, 1].reshape(size, size)
+
+
+def walls_to_image(wall_locs, size, color=(0., 0., 0.)):
+    """
+    Builds an RGBA image that is opaque at the walls and transparent everywhere else.
+    :param wall_locs: a list of (x,y) tuples with the wall locations (or None).
+    :param size: the size of the grid world.
+    :param color: the RGB color of the walls.
+    :return: an array of size `size` x `size` x 4
+    """
+    wall_img = np.zeros((size, size, 4))
+    if wall_locs is not None and len(wall_locs) > 0:
+        x, y = np.asarray(wall_locs, dtype=np.int64).reshape(-1, 2).T
+        wall_img[x, y, :3] = color
+        wall_img[x, y, 3] = 1.0
+    return wall_img
+
+
+def grid_lines(size):
+    """
+    The lines separating the cells of the grid as a single polyline broken by NaNs
+    so that all of them can be drawn with one call to `ax.plot`.
+    :param size: the size of the grid world.
+    :return: (xs, ys)
+    """
+    edges = np.arange(size + 1) - 0.5
+    ends = np.array([-0.5, size - 0.5, np.nan])
+    horizontal_x = np.tile(ends, size + 1)
+    horizontal_y = np.repeat(edges, 3)
+    horizontal_y[2::3] = np.nan
+    return np.concatenate([horizontal_x, horizontal_y]), np.concatenate([horizontal_y, horizontal_x])
+
+
 class GridWorldPlotter(object):
     def __init__(self, grid_size, has_absorbing_state=True):
         """
@@ -34,11 +101,7 @@ class GridWorldPlotter(object):
         :param ax:
         :return:
         """
-        for i in range(self.size + 1):
-            ax.plot(np.arange(self.size + 1) - 0.5, np.ones(self.size + 1) * i - 0.5, color='k')
-
-        for i in range(self.size + 1):
-            ax.plot(np.ones(self.size + 1) * i - 0.5, np.arange(self.size + 1) - 0.5, color='k')
+        ax.plot(*grid_lines(self.size), color='k')
         ax.set_xlabel('x')
         ax.set_ylabel('y')
         ax.grid(False)
@@ -99,40 +162,59 @@ class GridWorldPlotter(object):
 
         # Switch on flag if you want to plot grid
         if plot_grid:
-            for i in range(self.size + 1):
-                ax.plot(np.arange(self.size + 1) - 0.5, np.ones(self.size + 1) * i - 0.5, color='k')
-
-            for i in range(self.size + 1):
-                ax.plot(np.ones(self.size + 1) * i - 0.5, np.arange(self.size + 1) - 0.5, color='k')
+            ax.plot(*grid_lines(self.size), color='k')
             ax.set_xlabel('x')
             ax.set_ylabel('y')
 
         return ax, imshow_ax
 
-    def plot_heatmap(self, ax, trajectories, dont_unflatten=False, wall_locs=None):
+    def count_visitations(self, trajectories, dont_unflatten=False):
+        """
+        Counts the number of visits to each cell of the grid. Visits to the absorbing state are not counted.
+        :param trajectories: either
+                             - a list of trajectories. Each trajectory is a list of states (numpy arrays)
+                               obtained by using the mdp.step() operation (or (x,y) pairs, see `dont_unflatten`)
+                             - an array of integer states, e.g. obtained from utils.trajectories_to_arrays
+                             - a tuple (states, offsets) as returned by utils.trajectories_to_arrays
+        :param dont_unflatten: the trajectories are lists of (x,y) pairs.
+        :return: an array of size |S| (without the absorbing state) with the number of visits to each cell.
+        """
+        n_cells = self.size * self.size
+        if isinstance(trajectories, tuple):
+            states, _ = trajectories
+        elif isinstance(trajectories, np.ndarray):
+            states = trajectories
+        elif dont_unflatten:
+            pairs = np.asarray([state for trajectory in trajectories for state in trajectory],
+                               dtype=np.int64).reshape(-1, 2)
+            states = pairs[:, 0] * self.size + pairs[:, 1]
+        else:
+            states, _ = utils.trajectories_to_arrays(trajectories)
+        states = np.asarray(states, dtype=np.int64)
+        return np.bincount(states[states < n_cells], minlength=n_cells)
+
+    def plot_heatmap(self, ax, trajectories=None, dont_unflatten=False, wall_locs=None, state_visitations=None):
         """
         Plots a state-visitation heatmap with walls.
         :param ax: The axes to plot this on.
         :param trajectories: a list of trajectories. Each trajectory is a list of states (numpy arrays)
                              These states should be obtained by using the mdp.step() operation. To prevent
-                             this automatic conversion use `dont_unflatten`
+                             this automatic conversion use `dont_unflatten`.
+                             For large datasets, pass an array of integer states or the (states, offsets)
+                             tuple returned by utils.trajectories_to_arrays instead (see count_visitations)
         :param dont_unflatten: will not automatically unflatten the trajectories into (x,y) pairs.
                             (!) this assumes you have already unflattened them!
         :param wall_locs: Locations of the walls for plotting them in a different color..
+        :param state_visitations: precomputed visitation counts over the states (e.g. from count_visitations).
+                                  If given, `trajectories` is ignored.
         :return:
         """
-        if not dont_unflatten:
-            trajectories_unflat = list(self.unflat_trajectories(trajectories))
-        else:
-            trajectories_unflat = trajectories
-
-        state_visitations = np.zeros((self.size, self.size))
-        # plot actual state visitation heatmap
-        for trajectory in trajectories_unflat:
-            for state in trajectory:
-                x_coord =state[0]
-                y_coord = state[1]
-                state_visitations[y_coord, x_coord] += 1.
+        if state_visitations is None:
+            state_visitations = self.count_visitations(trajectories, dont_unflatten=dont_unflatten)
+        n_cells = self.size * self.size
+        # x is the first coordinate of a state and is plotted horizontally.
+        state_visitations = np.asarray(state_visitations[:n_cells], dtype=np.float64).reshape(
+            self.size, self.size).T
         # plot walls in lame way -- set them to some hand-engineered color
         wall_img = np.zeros((self.size, self.size, 4))
         if wall_locs is not None:
@@ -150,6 +232,44 @@ class GridWorldPlotter(object):
         ax.grid(False)
         return ax, imshow_ax
 
+    def plot_values(self, ax, V, wall_locs=None, **imshow_kwargs):
+        """
+        Plots a function over states (e.g. a value function) with walls.
+        (!) cell (x,y) is drawn at row x and column y, the same layout as the walls,
+            so that LEFT/RIGHT move horizontally and UP/DOWN move vertically.
+        :param ax: The axes to plot this on.
+        :param V: a vector of size |S|. The value of the absorbing state is not plotted.
+        :param wall_locs: Locations of the walls for plotting them in a different color..
+        :param imshow_kwargs: passed to ax.imshow (e.g. cmap, vmin, vmax)
+        :return:
+        """
+        imshow_ax = ax.imshow(values_to_grid(V, self.size), interpolation='nearest', **imshow_kwargs)
+        if wall_locs is not None:
+            ax.imshow(walls_to_image(wall_locs, self.size), interpolation='nearest')
+        ax.grid(False)
+        return ax, imshow_ax
+
+    def plot_policy(self, ax, pi, wall_locs=None, **quiver_kwargs):
+        """
+        Plots a policy as one arrow per cell pointing in the expected direction of movement,
+        in the same layout as plot_values.
+        :param ax: The axes to plot this on.
+        :param pi: a policy matrix of size |S| x |A| or a vector of (e.g. greedy) actions of size |S|
+        :param wall_locs: Locations of the walls, where no arrows are drawn.
+        :param quiver_kwargs: passed to ax.quiver (e.g. color)
+        :return:
+        """
+        U, V = policy_to_arrows(pi, self.size)
+        if wall_locs is not None:
+            walls = walls_to_image(wall_locs, self.size)[:, :, 3] > 0
+            U, V = np.where(walls, 0, U), np.where(walls, 0, V)
+        rows, cols = np.indices((self.size, self.size))
+        quiver_kwargs.setdefault('pivot', 'middle')
+        quiver_ax = ax.quiver(cols, rows, U, V, angles='uv', scale_units='xy', scale=1.25, **quiver_kwargs)
+        ax.set_xlim(-0.5, self.size - 0.5)
+        ax.set_ylim(self.size - 0.5, -0.5)
+        return ax, quiver_ax
+
     def unflat_trajectories(self, trajectories):
         """
         Returns a generator where the trajectories have been unflattened.
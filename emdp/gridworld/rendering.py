@@ -0,0 +1,159 @@
+"""
+Headless rendering of many grid world figures (values, policies and trajectories).
+
+The figure is drawn with the Agg backend without going through pyplot. The static layers
+(grid lines and walls) are built once per renderer and only the data of the value image,
+the policy arrows and the trajectory is updated for every frame.
+"""
+import multiprocessing
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.image import imsave
+from .. import utils
+from .plotting import GridWorldPlotter, values_to_grid, policy_to_arrows, walls_to_image, grid_lines
+
+
+class BatchRenderer(object):
+    def __init__(self, size, has_absorbing_state=True, wall_locs=None, figsize=(4, 4), dpi=100,
+                 cmap='viridis', vmin=None, vmax=None):
+        """
+        Renders frames of a grid world to RGB arrays.
+        (!) cell (x,y) is drawn at row x and column y (see GridWorldPlotter.plot_values)
+        :param size: size of the gridworld
+        :param has_absorbing_state: boolean representing if the gridworld has an absorbing state
+        :param wall_locs: Locations of the walls, drawn in every frame.
+        :param figsize: the size of the figure in inches.
+        :param dpi: the resolution of the figure.
+        :param cmap: the colormap of the values.
+        :param vmin: the value mapped to the lowest color. If None it is set from each frame.
+        :param vmax: the value mapped to the highest color. If None it is set from each frame.
+        """
+        self.size = size
+        self.has_absorbing_state = has_absorbing_state
+        self.vmin = vmin
+        self.vmax = vmax
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_axes([0, 0, 1, 1])
+        self.ax.set_axis_off()
+        self._walls = walls_to_image(wall_locs, size)[:, :, 3] > 0
+
+        # dynamic layers.
+        self._value_image = self.ax.imshow(np.zeros((size, size)), cmap=cmap, interpolation='nearest', zorder=0)
+        rows, cols = np.indices((size, size))
+        self._arrows = self.ax.quiver(cols, rows, np.zeros((size, size)), np.zeros((size, size)), angles='uv',
+                                      scale_units='xy', scale=1.25, pivot='middle', zorder=3)
+        self._trajectory, = self.ax.plot([], [], color='r', zorder=4)
+
+        # static layers.
+        self.ax.imshow(walls_to_image(wall_locs, size), interpolation='nearest', zorder=1)
+        self.ax.plot(*grid_lines(size), color='k', zorder=2)
+        self.ax.set_xlim(-0.5, size - 0.5)
+        self.ax.set_ylim(size - 0.5, -0.5)
+
+    @staticmethod
+    def from_mdp(mdp, wall_locs=None, **kwargs):
+        plotter = GridWorldPlotter.from_mdp(mdp)
+        return BatchRenderer(plotter.size, plotter.has_absorbing_state, wall_locs=wall_locs, **kwargs)
+
+    def render(self, V=None, pi=None, trajectory=None):
+        """
+        Renders one frame. Layers that are not given are hidden.
+        :param V: a vector of size |S| (e.g. a value function)
+        :param pi: a policy matrix of size |S| x |A| or a vector of actions of size |S|
+        :param trajectory: a list of states (one hot vectors or integers) or an array of integer states.
+        :return: an RGB image as a uint8 array of size height x width x 3
+        """
+        self._value_image.set_visible(V is not None)
+        if V is not None:
+            values = values_to_grid(V, self.size)
+            self._value_image.set_data(values)
+            visible_values = values[~self._walls]
+            self._value_image.set_clim(
+                np.min(visible_values) if self.vmin is None else self.vmin,
+                np.max(visible_values) if self.vmax is None else self.vmax)
+
+        self._arrows.set_visible(pi is not None)
+        if pi is not None:
+            U, V = policy_to_arrows(pi, self.size)
+            self._arrows.set_UVC(np.where(self._walls, 0, U), np.where(self._walls, 0, V))
+
+        self._trajectory.set_visible(trajectory is not None)
+        if trajectory is not None:
+            if not isinstance(trajectory, np.ndarray):
+                trajectory, _ = utils.trajectories_to_arrays([trajectory])
+            trajectory = trajectory[trajectory < self.size * self.size]
+            rows, cols = np.divmod(trajectory, self.size)
+            self._trajectory.set_data(cols, rows)
+
+        self.canvas.draw()
+        return np.asarray(self.canvas.buffer_rgba())[:, :, :3].copy()
+
+    def save(self, path, V=None, pi=None, trajectory=None):
+        """
+        Renders one frame and writes it to an image file (the format is taken from the extension).
+        :param path: the file to write.
+        :return: path
+        """
+        imsave(path, self.render(V=V, pi=pi, trajectory=trajectory))
+        return path
+
+
+# the renderer of each worker process.
+_worker_renderer = None
+
+
+def _initialize_worker(renderer_args, renderer_kwargs):
+    global _worker_renderer
+    _worker_renderer = BatchRenderer(*renderer_args, **renderer_kwargs)
+
+
+def _render_with(renderer, frame_and_path):
+    frame, path = frame_and_path
+    if path is None:
+        return renderer.render(**frame)
+    return renderer.save(path, **frame)
+
+
+def _render_frame(frame_and_path):
+    return _render_with(_worker_renderer, frame_and_path)
+
+
+def render_batch(size, frames, paths=None, processes=1, has_absorbing_state=True, wall_locs=None, **kwargs):
+    """
+    Renders many frames of the same grid world.
+    Example:
+    ```python
+    frames = [{'V': V, 'pi': pi} for (V, pi) in solutions]
+    render_batch(mdp.size, frames, paths=['{}.png'.format(i) for i in range(len(frames))],
+                 wall_locs=wall_locs, processes=4)
+    ```
+    :param size: size of the gridworld
+    :param frames: a list of dictionaries with the keyword arguments of BatchRenderer.render
+                   (any of 'V', 'pi' and 'trajectory')
+    :param paths: a list with a file to write each frame to. If None, the frames are returned.
+    :param processes: the number of worker processes. Each worker builds its own renderer.
+    :param has_absorbing_state: boolean representing if the gridworld has an absorbing state
+    :param wall_locs: Locations of the walls, drawn in every frame.
+    :param kwargs: other arguments for BatchRenderer (e.g. figsize, dpi, cmap, vmin, vmax)
+    :return: the list of paths, or an array of size |frames| x height x width x 3 if paths is None.
+    """
+    frames = list(frames)
+    if paths is not None:
+        assert len(paths) == len(frames), 'There must be one path per frame.'
+    jobs = list(zip(frames, [None] * len(frames) if paths is None else paths))
+    renderer_args = (size, has_absorbing_state, wall_locs)
+
+    if processes > 1:
+        chunksize = max(1, len(jobs) // (4 * processes))
+        with multiprocessing.Pool(processes, initializer=_initialize_worker,
+                                  initargs=(renderer_args, kwargs)) as pool:
+            results = pool.map(_render_frame, jobs, chunksize=chunksize)
+    else:
+        renderer = BatchRenderer(*renderer_args, **kwargs)
+        results = [_render_with(renderer, job) for job in jobs]
+
+    if paths is None:
+        return np.stack(results) if len(results) > 0 else np.zeros((0, 0, 0, 3), dtype=np.uint8)
+    return results
@@ -0,0 +1,85 @@
+"""
+Fast rendering of grid world states to RGB arrays without matplotlib (e.g. for recording videos).
+"""
+import numpy as np
+from .. import graph
+from .env import GridWorldMDP
+from .plotting import walls_to_image
+
+CELL_COLOR = (255, 255, 255)
+WALL_COLOR = (0, 0, 0)
+TERMINAL_COLOR = (120, 200, 120)
+GRID_COLOR = (160, 160, 160)
+AGENT_COLOR = (220, 40, 40)
+
+
+class RGBArrayRenderer(object):
+    def __init__(self, size, walls=None, terminal_cells=(), cell_pixels=8):
+        """
+        Renders the position of the agent in a grid world as a uint8 image.
+        The background (cells, walls, terminal cells and grid lines) is drawn once
+        and every frame only stamps the agent onto a copy of it.
+        :param size: size of the gridworld
+        :param walls: a boolean array of shape size x size or a list of (x,y) tuples with the wall locations.
+        :param terminal_cells: a list of integers with the terminal cells.
+        :param cell_pixels: the number of pixels along each side of a cell.
+        """
+        self.size = size
+        self.cell_pixels = cell_pixels
+        if walls is None:
+            walls = np.zeros((size, size), dtype=bool)
+        elif not (isinstance(walls, np.ndarray) and walls.dtype == bool):
+            walls = walls_to_image(walls, size)[:, :, 3] > 0
+
+        cell_colors = np.empty((size, size, 3), dtype=np.uint8)
+        cell_colors[:] = CELL_COLOR
+        terminal_cells = [s for s in terminal_cells if s < size * size]
+        cell_colors.reshape(-1, 3)[terminal_cells] = TERMINAL_COLOR
+        cell_colors[walls] = WALL_COLOR
+        # (x,y) is drawn at row x and column y.
+        background = np.repeat(np.repeat(cell_colors, cell_pixels, axis=0), cell_pixels, axis=1)
+        if cell_pixels > 2:
+            background[::cell_pixels] = GRID_COLOR
+            background[:, ::cell_pixels] = GRID_COLOR
+        self.background = background
+
+        # the agent is a square in the middle of its cell.
+        margin = cell_pixels // 4
+        self._agent_offsets = slice(margin, cell_pixels - margin) if cell_pixels > 2 else slice(0, cell_pixels)
+
+    @staticmethod
+    def from_mdp(mdp, wall_locs=None, cell_pixels=8):
+        """
+        :param mdp: a GridWorldMDP.
+        :param wall_locs: Locations of the walls. If None the walls of an ImplicitGridWorldMDP are used,
+                          otherwise all cells that cannot be reached from p0 are drawn as walls.
+        :param cell_pixels: the number of pixels along each side of a cell.
+        """
+        if not isinstance(mdp, (GridWorldMDP,)):
+            raise TypeError('Only GridWorldMDPs can be rendered.')
+        walls = wall_locs
+        if walls is None:
+            walls = getattr(mdp, 'walls', None)
+        if walls is None:
+            walls = np.ones(mdp.size * mdp.size, dtype=bool)
+            reachable = graph.reachable_states(mdp.P, mdp.p0)
+            walls[reachable[reachable < mdp.size * mdp.size]] = False
+            walls = walls.reshape(mdp.size, mdp.size)
+        return RGBArrayRenderer(mdp.size, walls=walls, terminal_cells=mdp.terminal_states, cell_pixels=cell_pixels)
+
+    def render(self, state, out=None):
+        """
+        :param state: the integer state of the agent. Nothing is drawn for the absorbing state.
+        :param out: an array of the same shape as the background to draw into (a new one is made if None).
+        :return: an RGB image as a uint8 array of size (size*cell_pixels) x (size*cell_pixels) x 3
+        """
+        if out is None:
+            out = self.background.copy()
+        else:
+            np.copyto(out, self.background)
+        if state < self.size * self.size:
+            x, y = divmod(int(state), self.size)
+            cell = out[x * self.cell_pixels:(x + 1) * self.cell_pixels,
+                       y * self.cell_pixels:(y + 1) * self.cell_pixels]
+            cell[self._agent_offsets, self._agent_offsets] = AGENT_COLOR
+        return out
@@ -4,6 +4,9 @@ from .helper_utilities import flatten_state
 from .builder_tools import (TransitionMatrixBuilder,
                             create_reward_matrix)
 from . import GridWorldMDP
+from .implicit import ImplicitGridWorldMDP
+from .. import instrumentation
+from .. import memory
 
 def get_char_matrix(raw_file):
     """
@@ -13,13 +16,16 @@ def get_char_matrix(raw_file):
     return [[c for c in line.strip('\n')] for line in raw_file]
 
 
+@instrumentation.timed('builder.build_gridworld_from_char_matrix')
 def build_gridworld_from_char_matrix(
   char_matrix,
   p_success=1,
   seed=2017,
   gamma=1,
   skip_checks=False,
-  transition_matrix_builder_cls=TransitionMatrixBuilder):
+  transition_matrix_builder_cls=TransitionMatrixBuilder,
+  backend='dense',
+  dry_run=False):
     """
     A parser to build a gridworld from a text file.
     Each grid has ONE start and goal location.
@@ -29,9 +35,23 @@ def build_gridworld_from_char_matrix(
     :param seed: The seed for the GridWorldMDP object.
     :param skip_checks: Skips assertion checks.
     :transition_matrix_builder_cls: The transition matrix builder to use.
-    :return:
+    :param backend: 'dense' builds a GridWorldMDP with a transition matrix, 'implicit' builds a
+        matrix-free ImplicitGridWorldMDP with the same dynamics and 'auto' picks 'dense' if it
+        fits within the memory limit (see emdp.memory) and 'implicit' otherwise.
+    :param dry_run: returns the memory estimate of the chosen backend (see
+        emdp.memory.estimate_grid_world_bytes) with its name under 'backend' instead of building.
+    :return: (gridworld, wall_locs)
     """
     grid_size = len(char_matrix[0])
+    if backend == 'auto':
+        dense_bytes = memory.estimate_grid_world_bytes(grid_size)['total']
+        backend = 'dense' if memory.fits_in_memory(dense_bytes) else 'implicit'
+    if backend not in ('dense', 'implicit'):
+        raise ValueError('Unknown backend {}. Use dense, implicit or auto.'.format(backend))
+    if dry_run:
+        estimate = memory.estimate_grid_world_bytes(grid_size, backend=backend)
+        estimate['backend'] = backend
+        return estimate
 
     if not skip_checks:
         assert(len(char_matrix) == grid_size), 'Mismatch in the columns.'
@@ -57,6 +77,13 @@ def build_gridworld_from_char_matrix(
     # Attempt to make the desired gridworld.
     reward_spec = {(goal_loc[0], goal_loc[1]): +1}
 
+    if backend == 'implicit':
+        state_space = grid_size * grid_size + 1
+        R = create_reward_matrix(state_space, grid_size, reward_spec, action_space=4)
+        p0 = flatten_state(start_loc, grid_size, state_space)
+        gw = ImplicitGridWorldMDP(R, gamma, p0, terminal_states=reward_spec.keys(), size=grid_size,
+                                  walls=wall_locs, p_success=p_success, seed=seed)
+        return gw, wall_locs
 
     tmb = transition_matrix_builder_cls(grid_size,  has_terminal_state=True)
     tmb.add_grid(terminal_states=reward_spec.keys(), p_success=p_success)
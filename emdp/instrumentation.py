@@ -0,0 +1,140 @@
+"""
+Opt-in counters and timers for the hot paths of emdp.
+
+Instrumented functions record how many times they were called and how long they took under a phase name:
+    - mdp.*: MDP resets, steps, sampling of next states and observations.
+    - gym.*: the gym wrappers.
+    - analytic.*: the analytic solvers (nested calls are recorded separately, e.g. calculate_V_pi
+      also records calculate_P_pi and calculate_successor_representation).
+    - builder.*: building grid worlds.
+
+Example:
+```python
+from emdp import instrumentation
+instrumentation.enable()
+# ... run some episodes ...
+for phase, phase_stats in sorted(instrumentation.stats().items()):
+    print(phase, phase_stats['count'], phase_stats['total_time'])
+```
+When disabled (the default) instrumented functions are the undecorated functions, so they cost nothing:
+enable() replaces them by their timed versions in their class or module (and in the emdp modules that
+imported them) and disable() puts the undecorated functions back.
+(!) references taken while disabled outside of emdp (e.g. `from emdp.analytic import calculate_V_pi`
+    or a bound method stored in a variable) keep calling the undecorated function.
+"""
+import functools
+import sys
+import time
+
+ENABLED = False
+
+_counts = {}
+_total_times = {}
+_callbacks = []
+# (undecorated function, timed function) of every instrumented function.
+_registry = []
+
+
+def _owner(function):
+    """
+    :return: the class or module where the function is defined.
+    """
+    owner = sys.modules[function.__module__]
+    for name in function.__qualname__.split('.')[:-1]:
+        owner = getattr(owner, name)
+    return owner
+
+
+def _replace(function, replacement):
+    """
+    Replaces `function` by `replacement` in its class or module and in the modules of its package that imported it.
+    """
+    owners = [_owner(function)]
+    package = function.__module__.split('.')[0]
+    owners += [module for name, module in list(sys.modules.items())
+               if module is not None and (name == package or name.startswith(package + '.'))]
+    for owner in owners:
+        for name, value in list(vars(owner).items()):
+            if value is function:
+                setattr(owner, name, replacement)
+
+
+def enable():
+    """Starts recording."""
+    global ENABLED
+    if not ENABLED:
+        for function, timed_function in _registry:
+            _replace(function, timed_function)
+    ENABLED = True
+
+
+def disable():
+    """Stops recording. The statistics recorded so far are kept."""
+    global ENABLED
+    if ENABLED:
+        for function, timed_function in _registry:
+            _replace(timed_function, function)
+    ENABLED = False
+
+
+def reset():
+    """Clears all the statistics."""
+    _counts.clear()
+    _total_times.clear()
+
+
+def add_callback(callback):
+    """
+    Registers a function that is called after every recorded event.
+    :param callback: a function taking (phase, elapsed) where elapsed is in seconds.
+    """
+    _callbacks.append(callback)
+
+
+def remove_callback(callback):
+    _callbacks.remove(callback)
+
+
+def record(phase, elapsed=0.0):
+    """
+    Records one event of a phase.
+    :param phase: the name of the phase (e.g. mdp.step)
+    :param elapsed: the time the event took in seconds.
+    """
+    _counts[phase] = _counts.get(phase, 0) + 1
+    _total_times[phase] = _total_times.get(phase, 0.0) + elapsed
+    for callback in _callbacks:
+        callback(phase, elapsed)
+
+
+def stats():
+    """
+    :return: a snapshot of the statistics as a dictionary mapping each phase to a dictionary
+             with the number of events ('count'), their total time ('total_time')
+             and their mean time ('mean_time') in seconds.
+    """
+    return {phase: {'count': count,
+                    'total_time': _total_times[phase],
+                    'mean_time': _total_times[phase] / count}
+            for phase, count in _counts.items()}
+
+
+def timed(phase):
+    """
+    A decorator that records every call of the decorated function under `phase` when enabled.
+    The decorated function must be defined in a module or a class (not inside another function)
+    and must not be wrapped by another decorator such as property.
+    :param phase: the name of the phase.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(phase, time.perf_counter() - start)
+        _registry.append((function, timed_function))
+        # the class or module of the function does not exist yet, it is returned as it is replaced when enabled.
+        return timed_function if ENABLED else function
+    return decorator
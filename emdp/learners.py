@@ -0,0 +1,161 @@
+"""
+Tabular learners that run many independent seeds in lockstep.
+
+Each learner keeps one table per seed (e.g. Q of size n_seeds x |S| x |A|) and simulates
+one copy of the MDP per seed with a BatchedMDP, so a step of all seeds is a few vectorized operations.
+Learning curves are logged every `log_every` steps as the root mean squared error of each
+seed's table against the analytic solution.
+
+Example:
+```python
+Q, steps, errors = q_learning(mdp, n_seeds=100, n_steps=10**5, alpha=0.1, epsilon=0.1, log_every=1000)
+plt.plot(steps, errors.mean(axis=1))
+```
+"""
+import numpy as np
+from .batched import BatchedMDP
+from . import analytic
+from . import utils
+from . import instrumentation
+
+
+class _ErrorLog(object):
+    def __init__(self, truth, n_steps, log_every):
+        """
+        Records the root mean squared error of the tables of all seeds every log_every steps.
+        :param truth: the analytic solution, a table of the size of one seed's table.
+        :param n_steps: the number of steps of the run.
+        :param log_every: the number of steps between two logs (None to not log).
+        """
+        self.truth = truth
+        self.log_every = log_every
+        self.steps = np.arange(0, n_steps + 1, log_every) if log_every else np.zeros(0, dtype=np.int64)
+        self.errors = []
+
+    def log(self, step, table):
+        if self.log_every and step % self.log_every == 0:
+            squared_errors = (table - self.truth) ** 2
+            self.errors.append(np.sqrt(squared_errors.reshape(len(table), -1).mean(axis=1)))
+
+    def result(self, n_seeds):
+        """
+        :return: (steps, errors) where errors has size len(steps) x n_seeds.
+        """
+        return self.steps, np.array(self.errors).reshape(len(self.steps), n_seeds)
+
+
+def _epsilon_greedy(Q, seeds, states, epsilon, rng):
+    """
+    :return: for every seed, a random action with probability epsilon and the greedy action of its table otherwise.
+    """
+    actions = Q[seeds, states].argmax(axis=1)
+    explore = rng.random_sample(len(seeds)) < epsilon
+    actions[explore] = rng.randint(Q.shape[2], size=np.count_nonzero(explore))
+    return actions
+
+
+def _optimal_Q(mdp):
+    V_star = analytic.value_iteration(mdp.P, mdp.R, mdp.gamma)
+    return analytic.calculate_Q_from_V(mdp.P, mdp.R, V_star, mdp.gamma)
+
+
+@instrumentation.timed('learners.td_lambda')
+def td_lambda(mdp, pi, n_seeds, n_steps, alpha=0.1, lam=0., log_every=None, V_true=None, seed=1337):
+    """
+    Evaluates a policy with TD(lambda) and accumulating traces (TD(0) when lam=0).
+    :param mdp: the MDP.
+    :param pi: the policy to evaluate, a matrix of size |S| x |A|.
+    :param n_seeds: the number of independent runs.
+    :param n_steps: the number of steps of each run.
+    :param alpha: the step size.
+    :param lam: the trace decay parameter lambda.
+    :param log_every: the number of steps between two logs of the error (None to not log).
+    :param V_true: the values to compare with (defaults to analytic.calculate_V_pi of the MDP).
+    :param seed: the random seed for simulations.
+    :return: (V, steps, errors) where V has size n_seeds x |S| and errors has size len(steps) x n_seeds.
+    """
+    if log_every and V_true is None:
+        V_true = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    env = BatchedMDP(mdp, n_seeds, seed=seed)
+    seeds = np.arange(n_seeds)
+    V = np.zeros((n_seeds, mdp.state_space))
+    traces = np.zeros_like(V) if lam > 0 else None
+    error_log = _ErrorLog(V_true, n_steps, log_every)
+    states = env.reset()
+    for step in range(n_steps):
+        error_log.log(step, V)
+        actions = utils.sample_categorical(pi[states], env.rng)
+        next_states, rewards, dones = env.step(actions)
+        td_errors = rewards + mdp.gamma * ~dones * V[seeds, next_states] - V[seeds, states]
+        if traces is None:
+            V[seeds, states] += alpha * td_errors
+        else:
+            traces *= mdp.gamma * lam
+            traces[seeds, states] += 1
+            V += alpha * td_errors[:, None] * traces
+            traces[dones] = 0
+        states = env.reset(dones)
+    error_log.log(n_steps, V)
+    return (V,) + error_log.result(n_seeds)
+
+
+@instrumentation.timed('learners.q_learning')
+def q_learning(mdp, n_seeds, n_steps, alpha=0.1, epsilon=0.1, log_every=None, Q_true=None, seed=1337):
+    """
+    Q-learning with an epsilon-greedy behaviour policy.
+    :param mdp: the MDP.
+    :param n_seeds: the number of independent runs.
+    :param n_steps: the number of steps of each run.
+    :param alpha: the step size.
+    :param epsilon: the probability of taking a random action.
+    :param log_every: the number of steps between two logs of the error (None to not log).
+    :param Q_true: the action values to compare with (defaults to Q_star of the MDP, from value iteration).
+    :param seed: the random seed for simulations.
+    :return: (Q, steps, errors) where Q has size n_seeds x |S| x |A| and errors has size len(steps) x n_seeds.
+    """
+    if log_every and Q_true is None:
+        Q_true = _optimal_Q(mdp)
+    env = BatchedMDP(mdp, n_seeds, seed=seed)
+    seeds = np.arange(n_seeds)
+    Q = np.zeros((n_seeds, mdp.state_space, mdp.action_space))
+    error_log = _ErrorLog(Q_true, n_steps, log_every)
+    states = env.reset()
+    for step in range(n_steps):
+        error_log.log(step, Q)
+        actions = _epsilon_greedy(Q, seeds, states, epsilon, env.rng)
+        next_states, rewards, dones = env.step(actions)
+        targets = rewards + mdp.gamma * ~dones * Q[seeds, next_states].max(axis=1)
+        Q[seeds, states, actions] += alpha * (targets - Q[seeds, states, actions])
+        states = env.reset(dones)
+    error_log.log(n_steps, Q)
+    return (Q,) + error_log.result(n_seeds)
+
+
+@instrumentation.timed('learners.sarsa')
+def sarsa(mdp, n_seeds, n_steps, alpha=0.1, epsilon=0.1, log_every=None, Q_true=None, seed=1337):
+    """
+    SARSA with an epsilon-greedy policy.
+    (!) the default Q_true is Q_star, which SARSA only approaches as epsilon goes to 0.
+    See q_learning for the parameters.
+    :return: (Q, steps, errors) where Q has size n_seeds x |S| x |A| and errors has size len(steps) x n_seeds.
+    """
+    if log_every and Q_true is None:
+        Q_true = _optimal_Q(mdp)
+    env = BatchedMDP(mdp, n_seeds, seed=seed)
+    seeds = np.arange(n_seeds)
+    Q = np.zeros((n_seeds, mdp.state_space, mdp.action_space))
+    error_log = _ErrorLog(Q_true, n_steps, log_every)
+    states = env.reset()
+    actions = _epsilon_greedy(Q, seeds, states, epsilon, env.rng)
+    for step in range(n_steps):
+        error_log.log(step, Q)
+        next_states, rewards, dones = env.step(actions)
+        next_actions = _epsilon_greedy(Q, seeds, next_states, epsilon, env.rng)
+        targets = rewards + mdp.gamma * ~dones * Q[seeds, next_states, next_actions]
+        Q[seeds, states, actions] += alpha * (targets - Q[seeds, states, actions])
+        states = env.reset(dones)
+        if dones.any():
+            next_actions[dones] = _epsilon_greedy(Q, seeds[dones], states[dones], epsilon, env.rng)
+        actions = next_actions
+    error_log.log(n_steps, Q)
+    return (Q,) + error_log.result(n_seeds)
@@ -0,0 +1,173 @@
+"""
+Estimates of the memory needed to build and solve MDPs, and a memory limit that is checked
+before large arrays are allocated.
+
+Example:
+```python
+from emdp import memory
+print(memory.format_bytes(memory.estimate_grid_world_bytes(400)['total']))
+memory.set_memory_limit(8 * 2**30)  # raise MemoryLimitExceededError instead of using more than 8GB.
+```
+The limit defaults to the physical memory of the machine and can also be set in bytes
+with the EMDP_MEMORY_LIMIT environment variable.
+"""
+import os
+import numpy as np
+from .exceptions import MemoryLimitExceededError
+
+MEMORY_LIMIT_ENV_VARIABLE = 'EMDP_MEMORY_LIMIT'
+FLOAT_BYTES = np.dtype(np.float64).itemsize
+INDEX_BYTES = np.dtype(np.int64).itemsize
+
+# bytes of dense |S| x |S| matrices used by each analytic routine in addition to its inputs.
+_ANALYTIC_SQUARE_MATRICES = {
+    'calculate_P_pi': 1,
+    'calculate_successor_representation': 3,  # identity, (I - gamma*P_pi) and its inverse.
+    'calculate_V_pi': 4,  # P_pi and the successor representation.
+    'calculate_V_pi_by_components': 3,
+    'value_iteration': 0,
+    'value_iteration_by_components': 1,
+    'calculate_return_variance': 3,  # P_pi, (I - gamma^2*P_pi) and its factorization.
+    'calculate_return_moments': 3,
+}
+
+_memory_limit = None
+
+
+def physical_memory_bytes():
+    """
+    :return: the physical memory of this machine in bytes or None if it cannot be determined.
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def set_memory_limit(n_bytes):
+    """
+    :param n_bytes: the largest number of bytes that a single build or solve may need.
+                    None restores the default (EMDP_MEMORY_LIMIT or the physical memory).
+    """
+    global _memory_limit
+    _memory_limit = n_bytes
+
+
+def get_memory_limit():
+    """
+    :return: the memory limit in bytes or None if there is no limit.
+    """
+    if _memory_limit is not None:
+        return _memory_limit
+    if os.environ.get(MEMORY_LIMIT_ENV_VARIABLE):
+        return int(float(os.environ[MEMORY_LIMIT_ENV_VARIABLE]))
+    return physical_memory_bytes()
+
+
+def fits_in_memory(n_bytes):
+    limit = get_memory_limit()
+    return limit is None or n_bytes <= limit
+
+
+def check_memory(n_bytes, description):
+    """
+    Raises MemoryLimitExceededError if n_bytes exceeds the memory limit.
+    :param n_bytes: the number of bytes that are about to be needed.
+    :param description: what needs them, used in the error message.
+    """
+    if not fits_in_memory(n_bytes):
+        raise MemoryLimitExceededError(
+            '{} needs about {} but the memory limit is {}. Use a matrix-free MDP '
+            '(e.g. ImplicitGridWorldMDP) or raise the limit with emdp.memory.set_memory_limit '
+            'or the {} environment variable.'.format(
+                description, format_bytes(n_bytes), format_bytes(get_memory_limit()), MEMORY_LIMIT_ENV_VARIABLE))
+
+
+def format_bytes(n_bytes):
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if abs(n_bytes) < 1024 or unit == 'TB':
+            return '{:.1f}{}'.format(n_bytes, unit)
+        n_bytes /= 1024.
+
+
+def estimate_P_bytes(n_states, n_actions, backend='dense', nonzeros_per_row=None):
+    """
+    Estimates the size of a transition matrix.
+    :param n_states: |S|
+    :param n_actions: |A|
+    :param backend: 'dense' for a |S|x|A|x|S| array, 'sparse' for a CSR matrix of size (|S||A|) x |S|,
+                    'banded' for a 3 x |S| x |A| array (see ChainMDP) or 'implicit' if no matrix is stored.
+    :param nonzeros_per_row: for 'sparse', the number of next states of each state and action (defaults to |A|).
+    :return: the number of bytes.
+    """
+    if backend == 'dense':
+        return n_states * n_actions * n_states * FLOAT_BYTES
+    elif backend == 'sparse':
+        nonzeros = n_states * n_actions * (n_actions if nonzeros_per_row is None else nonzeros_per_row)
+        return nonzeros * (FLOAT_BYTES + INDEX_BYTES) + (n_states * n_actions + 1) * INDEX_BYTES
+    elif backend == 'banded':
+        return 3 * n_states * n_actions * FLOAT_BYTES
+    elif backend == 'implicit':
+        return 0
+    raise ValueError('Unknown backend {}.'.format(backend))
+
+
+def estimate_MDP_bytes(n_states, n_actions, backend='dense', nonzeros_per_row=None):
+    """
+    Estimates the memory of an MDP: P, R and p0.
+    :return: a dictionary with the bytes of 'P', 'R', 'p0' and their 'total'.
+    """
+    estimate = {
+        'P': estimate_P_bytes(n_states, n_actions, backend=backend, nonzeros_per_row=nonzeros_per_row),
+        'R': n_states * n_actions * FLOAT_BYTES,
+        'p0': n_states * FLOAT_BYTES,
+    }
+    estimate['total'] = sum(estimate.values())
+    return estimate
+
+
+def estimate_grid_world_bytes(size, n_actions=4, has_absorbing_state=True, backend='dense'):
+    """
+    Estimates the peak memory of building a size x size grid world
+    (e.g. with build_simple_grid or TransitionMatrixBuilder).
+    :param size: the size of the grid world.
+    :param n_actions: |A|
+    :param has_absorbing_state: boolean indicating if there is an absorbing state.
+    :param backend: 'dense', 'sparse' or 'implicit' (ImplicitGridWorldMDP, which stores a wall bitmap)
+    :return: a dictionary with the bytes of 'P', 'R', 'p0', 'intermediates' and their 'total'.
+    """
+    n_states = size * size + int(has_absorbing_state)
+    estimate = estimate_MDP_bytes(n_states, n_actions, backend=backend)
+    if backend == 'dense':
+        # the builders keep a second copy of P (e.g. TransitionMatrixBuilder.P returns a copy).
+        estimate['intermediates'] = estimate['P']
+    elif backend == 'implicit':
+        # the wall bitmap and the terminal mask.
+        estimate['intermediates'] = 2 * size * size
+    else:
+        estimate['intermediates'] = 0
+    estimate['total'] = estimate['P'] + estimate['R'] + estimate['p0'] + estimate['intermediates']
+    return estimate
+
+
+def estimate_analytic_bytes(function_name, n_states, n_actions, backend='dense'):
+    """
+    Estimates the memory needed by a routine of emdp.analytic, including its inputs.
+    :param function_name: e.g. 'calculate_V_pi' or 'value_iteration'
+    :param n_states: |S|
+    :param n_actions: |A|
+    :param backend: the backend of the transition matrix (see estimate_P_bytes)
+    :return: a dictionary with the bytes of 'P', 'R', 'intermediates' and their 'total'.
+    """
+    if function_name not in _ANALYTIC_SQUARE_MATRICES:
+        raise ValueError('No estimate for {}. Choose one of {}.'.format(
+            function_name, sorted(_ANALYTIC_SQUARE_MATRICES.keys())))
+    estimate = {
+        'P': estimate_P_bytes(n_states, n_actions, backend=backend),
+        'R': n_states * n_actions * FLOAT_BYTES,
+        # the square matrices and a few vectors and |S| x |A| matrices.
+        'intermediates': (_ANALYTIC_SQUARE_MATRICES[function_name] * n_states * n_states * FLOAT_BYTES
+                          + 4 * n_states * n_actions * FLOAT_BYTES),
+    }
+    estimate['total'] = sum(estimate.values())
+    return estimate
@@ -0,0 +1,104 @@
+"""
+Discounted returns and Monte Carlo estimates of V and Q from batches of episodes.
+
+Episodes are given as flat arrays with the steps of all episodes and offsets:
+the steps of episode i are [offsets[i], offsets[i+1]) (see utils.trajectories_to_arrays).
+
+Example:
+```python
+V, counts = monte_carlo_V(states, rewards, offsets, mdp.gamma, mdp.state_space, first_visit=True)
+visited = counts > 0
+error = np.abs(V - analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma))[visited].max()
+```
+"""
+import numpy as np
+from . import instrumentation
+
+
+def episode_ids(offsets):
+    """
+    :param offsets: the steps of episode i are [offsets[i], offsets[i+1])
+    :return: an integer array with the episode of each step.
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+@instrumentation.timed('monte_carlo.discounted_returns')
+def discounted_returns(rewards, offsets, gamma):
+    """
+    Calculates the discounted returns-to-go G_t = r_t + gamma * G_{t+1} of every step,
+    where G_t = r_t at the last step of each episode.
+    This is a segmented reverse scan: after the pass with distance d, G_t holds the discounted
+    sum of the 2d rewards starting at t (within the episode), so log2(longest episode) passes
+    over the flat arrays are needed. Only multiplications by gamma^d <= 1 are used, so it is
+    numerically stable for long episodes.
+    :param rewards: an array with the rewards of all steps.
+    :param offsets: the steps of episode i are [offsets[i], offsets[i+1])
+    :param gamma: the discount factor.
+    :return: an array with the return of each step.
+    """
+    returns = np.array(rewards, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    # the number of steps left in the episode after each step.
+    steps_left = np.repeat(offsets[1:], np.diff(offsets)) - np.arange(len(returns)) - 1
+    longest = steps_left.max(initial=0)
+    distance, discount = 1, gamma
+    while distance <= longest:
+        steps = np.flatnonzero(steps_left >= distance)
+        # the right hand side is evaluated before the update, so it uses the returns of the previous pass.
+        returns[steps] += discount * returns[steps + distance]
+        distance, discount = 2 * distance, discount * discount
+    return returns
+
+
+def _first_visits(keys, offsets, n_keys):
+    """
+    :return: the indices of the steps that are the first visit of their key in their episode.
+    """
+    _, first_steps = np.unique(episode_ids(offsets) * n_keys + keys, return_index=True)
+    return np.sort(first_steps)
+
+
+def _average(keys, values, n_keys):
+    counts = np.bincount(keys, minlength=n_keys)
+    sums = np.bincount(keys, weights=values, minlength=n_keys)
+    return sums / np.maximum(counts, 1), counts
+
+
+@instrumentation.timed('monte_carlo.monte_carlo_V')
+def monte_carlo_V(states, rewards, offsets, gamma, n_states, first_visit=False):
+    """
+    Estimates V as the average return after visiting each state.
+    :param states: an integer array with the states of all steps.
+    :param rewards: an array with the rewards of all steps.
+    :param offsets: the steps of episode i are [offsets[i], offsets[i+1])
+    :param gamma: the discount factor.
+    :param n_states: |S|
+    :param first_visit: only use the first visit of each state in each episode.
+    :return: (V, counts) arrays of size |S| with the estimates and the number of returns they average.
+             (!) the estimate of states that were never visited is 0.
+    """
+    states = np.asarray(states, dtype=np.int64)
+    returns = discounted_returns(rewards, offsets, gamma)
+    if first_visit:
+        steps = _first_visits(states, offsets, n_states)
+        states, returns = states[steps], returns[steps]
+    return _average(states, returns, n_states)
+
+
+@instrumentation.timed('monte_carlo.monte_carlo_Q')
+def monte_carlo_Q(states, actions, rewards, offsets, gamma, n_states, n_actions, first_visit=False):
+    """
+    Estimates Q as the average return after taking each action in each state.
+    :param actions: an integer array with the actions of all steps.
+    :param n_actions: |A|
+    See monte_carlo_V for the other parameters.
+    :return: (Q, counts) arrays of size |S| x |A|.
+    """
+    pairs = np.asarray(states, dtype=np.int64) * n_actions + np.asarray(actions, dtype=np.int64)
+    returns = discounted_returns(rewards, offsets, gamma)
+    if first_visit:
+        steps = _first_visits(pairs, offsets, n_states * n_actions)
+        pairs, returns = pairs[steps], returns[steps]
+    Q, counts = _average(pairs, returns, n_states * n_actions)
+    return Q.reshape(n_states, n_actions), counts.reshape(n_states, n_actions)
@@ -0,0 +1,132 @@
+"""
+Off-policy evaluation: estimating the value of a target policy pi from episodes of a behaviour policy mu.
+
+Episodes are given as padded arrays of size n_episodes x horizon: states, actions, rewards and a boolean
+mask that is False after the end of each episode (see sample_episodes and pad_episodes).
+Each estimator returns an estimate of the expected discounted return of pi from p0, which
+can be compared with the exact value p0 @ analytic.calculate_V_pi(P, R, pi, gamma).
+
+Example:
+```python
+states, actions, rewards, mask = sample_episodes(mdp, mu, n_episodes=10000, horizon=50)
+estimate = weighted_importance_sampling(states, actions, rewards, mask, pi, mu, mdp.gamma)
+```
+"""
+import numpy as np
+from .batched import BatchedMDP
+from . import utils
+from . import instrumentation
+
+
+def sample_episodes(mdp, policy, n_episodes, horizon, seed=1337):
+    """
+    Simulates episodes of a policy, all of them in lockstep.
+    :param mdp: the MDP to simulate.
+    :param policy: a matrix of size |S| x |A| with the action probabilities of the policy.
+    :param n_episodes: the number of episodes.
+    :param horizon: the maximum length of the episodes.
+    :param seed: the random seed for simulations.
+    :return: (states, actions, rewards, mask) each an array of size n_episodes x horizon.
+    """
+    env = BatchedMDP(mdp, n_episodes, seed=seed)
+    states = np.zeros((n_episodes, horizon), dtype=np.int64)
+    actions = np.zeros((n_episodes, horizon), dtype=np.int64)
+    rewards = np.zeros((n_episodes, horizon))
+    mask = np.zeros((n_episodes, horizon), dtype=bool)
+    running = np.ones(n_episodes, dtype=bool)
+    for t in range(horizon):
+        states[:, t] = env.states
+        actions[:, t] = utils.sample_categorical(policy[env.states], env.rng)
+        _, rewards[:, t], done = env.step(actions[:, t])
+        mask[:, t] = running
+        running &= ~done
+    rewards *= mask
+    return states, actions, rewards, mask
+
+
+def pad_episodes(values, offsets, horizon=None, fill=0):
+    """
+    Converts a flat array of per-step values into a padded array (see utils.trajectories_to_arrays).
+    :param values: an array with the values of all steps of all episodes.
+    :param offsets: the values of episode i are values[offsets[i]:offsets[i+1]]
+    :param horizon: the number of columns (defaults to the length of the longest episode).
+    :param fill: the value after the end of each episode.
+    :return: (padded, mask) each an array of size n_episodes x horizon.
+    """
+    values, offsets = np.asarray(values), np.asarray(offsets)
+    lengths = np.diff(offsets)
+    horizon = int(lengths.max(initial=0)) if horizon is None else horizon
+    mask = np.arange(horizon) < lengths[:, None]
+    padded = np.full(mask.shape, fill, dtype=values.dtype)
+    padded[mask] = values[(offsets[:-1, None] + np.arange(horizon))[mask]]
+    return padded, mask
+
+
+def cumulative_importance_ratios(states, actions, mask, pi, mu):
+    """
+    :return: an array w of size n_episodes x horizon where w[i, t] is the product of
+             pi(a_k|s_k) / mu(a_k|s_k) for k <= t. It stays constant after the end of the episode.
+    """
+    ratios = np.where(mask, pi[states, actions] / mu[states, actions], 1.)
+    return np.cumprod(ratios, axis=1)
+
+
+def _discounts(horizon, gamma):
+    return gamma ** np.arange(horizon)
+
+
+@instrumentation.timed('off_policy.importance_sampling')
+def importance_sampling(states, actions, rewards, mask, pi, mu, gamma):
+    """
+    Ordinary importance sampling: the mean of w_T * sum_t gamma^t r_t over episodes.
+    :param states: an integer array of size n_episodes x horizon.
+    :param actions: an integer array of size n_episodes x horizon.
+    :param rewards: an array of size n_episodes x horizon.
+    :param mask: a boolean array of size n_episodes x horizon, False after the end of each episode.
+    :param pi: the target policy, a matrix of size |S| x |A|.
+    :param mu: the behaviour policy, a matrix of size |S| x |A|.
+    :param gamma: the discount factor.
+    :return: the estimate of the value of pi.
+    """
+    weights = cumulative_importance_ratios(states, actions, mask, pi, mu)[:, -1]
+    returns = np.einsum('it,t->i', rewards * mask, _discounts(states.shape[1], gamma))
+    return np.mean(weights * returns)
+
+
+@instrumentation.timed('off_policy.per_decision_importance_sampling')
+def per_decision_importance_sampling(states, actions, rewards, mask, pi, mu, gamma):
+    """
+    Per-decision importance sampling: the mean of sum_t gamma^t w_t r_t over episodes.
+    See importance_sampling for the parameters.
+    """
+    weights = cumulative_importance_ratios(states, actions, mask, pi, mu)
+    return np.einsum('it,t->', weights * rewards * mask, _discounts(states.shape[1], gamma)) / states.shape[0]
+
+
+@instrumentation.timed('off_policy.weighted_importance_sampling')
+def weighted_importance_sampling(states, actions, rewards, mask, pi, mu, gamma):
+    """
+    Weighted importance sampling: sum_i w_T^i G^i / sum_i w_T^i where G^i is the return of episode i.
+    It is biased but usually has a much lower variance than importance_sampling.
+    See importance_sampling for the parameters.
+    """
+    weights = cumulative_importance_ratios(states, actions, mask, pi, mu)[:, -1]
+    returns = np.einsum('it,t->i', rewards * mask, _discounts(states.shape[1], gamma))
+    return np.sum(weights * returns) / np.sum(weights)
+
+
+@instrumentation.timed('off_policy.doubly_robust')
+def doubly_robust(states, actions, rewards, mask, pi, mu, gamma, Q):
+    """
+    The doubly robust estimator of Jiang and Li (2016):
+        mean over episodes of sum_t gamma^t (w_t r_t - w_t Q(s_t, a_t) + w_{t-1} V(s_t))
+    where V(s) = sum_a pi(s, a) Q(s, a) and w_{-1} = 1.
+    It is unbiased and has a low variance when Q is close to Q_pi.
+    :param Q: an estimate of the action values of pi of size |S| x |A| (e.g. from an EmpiricalMDP).
+    See importance_sampling for the other parameters.
+    """
+    weights = cumulative_importance_ratios(states, actions, mask, pi, mu)
+    previous_weights = np.concatenate([np.ones((states.shape[0], 1)), weights[:, :-1]], axis=1)
+    V = np.einsum('sa,sa->s', pi, Q)
+    corrected = weights * (rewards - Q[states, actions]) + previous_weights * V[states]
+    return np.einsum('it,t->', corrected * mask, _discounts(states.shape[1], gamma)) / states.shape[0]
@@ -0,0 +1,165 @@
+"""
+Eigenvectors of the successor representation (SR) and proto-value functions (PVFs) computed with
+sparse eigensolvers, so they scale to MDPs with many thousands of states. Requires scipy.
+
+The SR (I - gamma * P_pi)^{-1} is never formed: Arnoldi iterations only need to apply it to vectors,
+which is done by solving with a sparse LU factorization of I - gamma * P_pi.
+PVFs are the eigenvectors with the smallest eigenvalues of the graph Laplacian of the
+symmetrized P_pi, computed with Lanczos iterations in shift-invert mode.
+
+Results are cached per (MDP, pi, gamma, k, ...) until the MDP is garbage collected.
+(!) the cache assumes that the dynamics of an MDP are not modified after it is built.
+
+Example:
+```python
+states = graph.reachable_states(mdp.P, mdp.p0)
+eigenvalues, eigenvectors = proto_value_functions(mdp, pi, k=8, states=states)
+```
+"""
+import hashlib
+import weakref
+import numpy as np
+from . import instrumentation
+
+_cache = weakref.WeakKeyDictionary()
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _cached(mdp, key, compute):
+    """
+    :return: the cached result of compute() for the key (a hashable tuple) and the MDP.
+    """
+    results = _cache.setdefault(mdp, {})
+    if key not in results:
+        eigenvalues, eigenvectors = compute()
+        # the cached arrays are shared between callers.
+        eigenvalues.flags.writeable = False
+        eigenvectors.flags.writeable = False
+        results[key] = (eigenvalues, eigenvectors)
+    return results[key]
+
+
+def _array_key(array):
+    if array is None:
+        return None
+    array = np.ascontiguousarray(array)
+    return array.shape, hashlib.sha1(array.tobytes()).hexdigest()
+
+
+@instrumentation.timed('representations.sparse_P_pi')
+def sparse_P_pi(mdp, pi):
+    r"""
+    Builds P_pi(s,t) = \sum_a pi(s,a) p(s, a, t) as a scipy.sparse.csr_matrix without
+    forming a dense |S| x |S| matrix. ChainMDP and ImplicitGridWorldMDP use their compact dynamics.
+    :param mdp: the MDP.
+    :param pi: matrix of size |S| x |A| indicating the policy
+    :return: a sparse matrix of size |S| x |S|
+    """
+    import scipy.sparse
+    from .chainworld import ChainMDP
+    from .chainworld.env import BAND_OFFSETS
+    from .gridworld import ImplicitGridWorldMDP
+
+    n_states = mdp.state_space
+    if isinstance(mdp, ChainMDP):
+        bands = np.einsum('ksa,sa->ks', mdp.P_bands, pi)
+        # the diagonal with offset -1 holds P_pi[s, s-1] for s >= 1 and the one with offset +1 holds P_pi[s, s+1].
+        diagonals = [bands[0, 1:], bands[1], bands[2, :-1]]
+        return scipy.sparse.diags(diagonals, BAND_OFFSETS, shape=(n_states, n_states), format='csr')
+    elif isinstance(mdp, ImplicitGridWorldMDP):
+        cells = np.arange(mdp.size * mdp.size)
+        destinations, can_move = mdp._grid_moves(cells)
+        # the probability of moving in each direction under pi, |A| x n_cells.
+        move_probabilities = sum(pi[cells, action] * mdp._move_probabilities(can_move, action)
+                                 for action in range(mdp.action_space))
+        rows = [np.tile(cells, len(destinations))]
+        columns = [destinations.ravel()]
+        values = [move_probabilities.ravel()]
+        if mdp.has_absorbing_state:
+            terminal_cells = np.flatnonzero(mdp._terminal_mask)
+            values[0][np.isin(rows[0], terminal_cells)] = 0
+            leaving = np.append(terminal_cells, mdp.absorbing_state)
+            rows.append(leaving)
+            columns.append(np.full(len(leaving), mdp.absorbing_state))
+            values.append(np.ones(len(leaving)))
+        P_pi = scipy.sparse.coo_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                                       shape=(n_states, n_states)).tocsr()
+        P_pi.eliminate_zeros()
+        return P_pi
+
+    states, actions, next_states = np.nonzero(mdp.P)
+    values = pi[states, actions] * mdp.P[states, actions, next_states]
+    # duplicate entries (from different actions) are summed.
+    return scipy.sparse.coo_matrix((values, (states, next_states)), shape=(n_states, n_states)).tocsr()
+
+
+def _restrict(P_pi, states):
+    if states is None:
+        return P_pi
+    states = np.asarray(states)
+    return P_pi[states][:, states]
+
+
+@instrumentation.timed('representations.successor_representation_eigenvectors')
+def successor_representation_eigenvectors(mdp, pi, k, gamma=None, states=None):
+    """
+    Computes the eigenvectors of the successor representation (I - gamma * P_pi)^{-1}
+    with the largest eigenvalues (e.g. to build eigenoptions).
+    :param mdp: the MDP.
+    :param pi: matrix of size |S| x |A| indicating the policy
+    :param k: the number of eigenvectors. It must be smaller than the number of states - 1.
+    :param gamma: the discount factor of the SR (defaults to the discount factor of the MDP).
+    :param states: restrict the SR to these states (e.g. graph.reachable_states), which must be closed
+                   under P_pi. The eigenvectors are then over these states only.
+    :return: (eigenvalues, eigenvectors) of size k and n_states x k, by decreasing magnitude of the eigenvalues.
+             They are real unless P_pi has complex eigenvalues among the top k.
+             (!) the arrays are cached and read only.
+    """
+    gamma = mdp.gamma if gamma is None else gamma
+
+    def compute():
+        import scipy.sparse
+        import scipy.sparse.linalg
+        P_pi = _restrict(sparse_P_pi(mdp, pi), states)
+        n_states = P_pi.shape[0]
+        lu = scipy.sparse.linalg.splu((scipy.sparse.identity(n_states) - gamma * P_pi).tocsc())
+        SR = scipy.sparse.linalg.LinearOperator((n_states, n_states), matvec=lu.solve, dtype=np.float64)
+        eigenvalues, eigenvectors = scipy.sparse.linalg.eigs(SR, k=k, which='LM', v0=np.ones(n_states))
+        order = np.argsort(-np.abs(eigenvalues), kind='stable')
+        return np.real_if_close(eigenvalues[order]), np.real_if_close(eigenvectors[:, order])
+
+    return _cached(mdp, ('sr', _array_key(pi), gamma, k, _array_key(states)), compute)
+
+
+@instrumentation.timed('representations.proto_value_functions')
+def proto_value_functions(mdp, pi, k, normalized=True, states=None):
+    """
+    Computes proto-value functions: the eigenvectors of the graph Laplacian of the
+    symmetrized transition graph W = (P_pi + P_pi^T) / 2 (without self loops) with the smallest eigenvalues.
+    :param mdp: the MDP.
+    :param pi: matrix of size |S| x |A| indicating the policy (e.g. uniformly random)
+    :param k: the number of eigenvectors. It must be smaller than the number of states.
+    :param normalized: use the normalized Laplacian I - D^{-1/2} W D^{-1/2} instead of D - W.
+    :param states: restrict the graph to these states (e.g. graph.reachable_states). Otherwise
+                   every isolated state (e.g. inside a wall) adds an eigenvector with eigenvalue 0.
+    :return: (eigenvalues, eigenvectors) of size k and n_states x k, by increasing eigenvalue.
+             (!) the arrays are cached and read only.
+    """
+    def compute():
+        import scipy.sparse.csgraph
+        import scipy.sparse.linalg
+        P_pi = _restrict(sparse_P_pi(mdp, pi), states)
+        W = ((P_pi + P_pi.T) / 2).tolil()
+        W.setdiag(0)
+        laplacian = scipy.sparse.csgraph.laplacian(W.tocsr(), normed=normalized)
+        # shift-invert around a negative value: the Laplacian is positive semi-definite
+        # so the shifted matrix can always be factorized.
+        eigenvalues, eigenvectors = scipy.sparse.linalg.eigsh(laplacian.tocsc(), k=k, sigma=-1e-3, which='LM',
+                                                              v0=np.ones(laplacian.shape[0]))
+        order = np.argsort(eigenvalues, kind='stable')
+        return eigenvalues[order], eigenvectors[:, order]
+
+    return _cached(mdp, ('pvf', _array_key(pi), k, normalized, _array_key(states)), compute)
@@ -0,0 +1,107 @@
+"""
+Saving MDPs to disk and loading them back with memory-mapped arrays.
+
+An MDP is saved as a directory with one .npy file per array and a metadata.json file:
+    - MDP and GridWorldMDP: P.npy, R.npy and p0.npy
+    - ChainMDP: P_bands.npy instead of P.npy
+    - ImplicitGridWorldMDP: walls.npy instead of P.npy
+Loading with mmap=True memory-maps the transition and reward arrays (read only), so processes
+on the same host that load the same MDP share its pages instead of each holding a copy.
+"""
+import json
+import os
+import numpy as np
+
+FORMAT_VERSION = 1
+METADATA_FILE = 'metadata.json'
+
+
+def _array_path(path, name):
+    return os.path.join(path, name + '.npy')
+
+
+def save_MDP(mdp, path, wall_locs=None):
+    """
+    :param mdp: the MDP to save.
+    :param path: the directory to save it in. It is created if it does not exist.
+    :param wall_locs: Locations of the walls of a GridWorldMDP to keep for plotting (see load_metadata)
+    :return: path
+    """
+    from .chainworld import ChainMDP
+    from .gridworld import GridWorldMDP, ImplicitGridWorldMDP
+
+    os.makedirs(path, exist_ok=True)
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'gamma': float(mdp.gamma),
+        'terminal_states': [int(state) for state in mdp.terminal_states],
+    }
+    arrays = {'R': mdp.R, 'p0': mdp.p0}
+    if isinstance(mdp, ImplicitGridWorldMDP):
+        metadata['class'] = 'ImplicitGridWorldMDP'
+        metadata['p_success'] = float(mdp.p_success)
+        arrays['walls'] = mdp.walls
+    elif isinstance(mdp, ChainMDP):
+        metadata['class'] = 'ChainMDP'
+        arrays['P_bands'] = mdp.P_bands
+    else:
+        metadata['class'] = 'GridWorldMDP' if isinstance(mdp, GridWorldMDP) else 'MDP'
+        arrays['P'] = mdp.P
+    if isinstance(mdp, GridWorldMDP):
+        metadata['size'] = int(mdp.size)
+    if wall_locs is not None:
+        metadata['wall_locs'] = [[int(x), int(y)] for (x, y) in wall_locs]
+
+    for name, array in arrays.items():
+        np.save(_array_path(path, name), np.asarray(array))
+    with open(os.path.join(path, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f)
+    return path
+
+
+def load_metadata(path):
+    """
+    :param path: a directory written by save_MDP.
+    :return: the metadata dictionary. 'wall_locs' (if saved) is a list of (x,y) tuples.
+    """
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    if metadata.get('format_version', 0) > FORMAT_VERSION:
+        raise ValueError('{} was saved with a newer format (version {}).'.format(path, metadata['format_version']))
+    if 'wall_locs' in metadata:
+        metadata['wall_locs'] = [tuple(wall_loc) for wall_loc in metadata['wall_locs']]
+    return metadata
+
+
+def load_MDP(path, mmap=True, seed=1337):
+    """
+    :param path: a directory written by save_MDP.
+    :param mmap: memory-map the transition and reward arrays (read only) instead of reading them.
+    :param seed: the random seed for simulations.
+    :return: an object of the same class as the saved MDP.
+    """
+    from .common import MDP
+    from .chainworld import ChainMDP
+    from .gridworld import GridWorldMDP, ImplicitGridWorldMDP
+
+    metadata = load_metadata(path)
+    mmap_mode = 'r' if mmap else None
+
+    def load(name, mmap_mode=mmap_mode):
+        return np.load(_array_path(path, name), mmap_mode=mmap_mode)
+
+    # the arrays were checked when the MDP was first built.
+    R, p0 = load('R'), load('p0', mmap_mode=None)
+    gamma, terminal_states = metadata['gamma'], metadata['terminal_states']
+    if metadata['class'] == 'ImplicitGridWorldMDP':
+        return ImplicitGridWorldMDP(R, gamma, p0, terminal_states, metadata['size'], walls=load('walls', None),
+                                    p_success=metadata['p_success'], seed=seed, skip_check=True,
+                                    convert_terminal_states_to_ints=True)
+    elif metadata['class'] == 'ChainMDP':
+        return ChainMDP(load('P_bands'), R, gamma, p0, terminal_states, seed=seed, skip_check=True)
+    elif metadata['class'] == 'GridWorldMDP':
+        return GridWorldMDP(load('P'), R, gamma, p0, terminal_states, metadata['size'], seed=seed,
+                            skip_check=True, convert_terminal_states_to_ints=True)
+    elif metadata['class'] == 'MDP':
+        return MDP(load('P'), R, gamma, p0, terminal_states, seed=seed, skip_check=True)
+    raise ValueError('Unknown MDP class {}.'.format(metadata['class']))
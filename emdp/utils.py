@@ -10,6 +10,60 @@ def convert_onehot_to_int(state):
     if type(state) is not np.ndarray:
         state = np.array(state)
     return state.argmax().item()
+
+def sample_categorical(probs, rng, size=None):
+    """
+    Samples from many categorical distributions at once.
+    The samples are the same as those from calling rng.choice(K, p=p) for each distribution p in turn.
+    :param probs: an array of size ... x K where the last axis are the probabilities of each distribution.
+    :param rng: a np.random.RandomState
+    :param size: if given, probs must be a single distribution and `size` samples are taken from it.
+    :return: an integer array of size ... (or `size`)
+    """
+    cdf = np.cumsum(probs, axis=-1, dtype=np.float64)
+    cdf /= cdf[..., -1:]
+    if size is not None:
+        return cdf.searchsorted(rng.random_sample(size), side='right')
+    uniform_samples = rng.random_sample(cdf.shape[:-1])
+    return (cdf <= uniform_samples[..., None]).sum(axis=-1)
+
+def sample_categorical_grouped(probs, groups, rng):
+    """
+    Samples one category from the distribution probs[group] for every group in `groups`.
+    This is equivalent to sample_categorical(probs[groups], rng) but never builds the
+    len(groups) x K array: samples are located with a binary search over the offset cumulative
+    distributions, so many samples from a few distributions are cheap.
+    :param probs: an array of size n_groups x K.
+    :param groups: an integer array of indices into the first dimension of probs.
+    :param rng: a np.random.RandomState
+    :return: an integer array of the same size as groups.
+    """
+    n_groups, n_categories = probs.shape
+    cdf = np.cumsum(probs, axis=1, dtype=np.float64)
+    cdf /= cdf[:, -1:]
+    # shift the distribution of group g to [g, g+1] so that all of them can be searched at once.
+    cdf += np.arange(n_groups)[:, None]
+    uniform_samples = rng.random_sample(len(groups)) + groups
+    categories = cdf.ravel().searchsorted(uniform_samples, side='right') - groups * n_categories
+    return np.minimum(categories, n_categories - 1)
+
+# Trajectory utilities.
+def trajectories_to_arrays(trajectories):
+    """
+    Converts a list of trajectories into a flat array of integer states and episode offsets.
+    :param trajectories: a list of trajectories. Each trajectory is a list of states,
+                         either one hot vectors (e.g. from mdp.step()) or integers.
+    :return: (states, offsets) where the states of episode i are states[offsets[i]:offsets[i+1]]
+    """
+    lengths = [len(trajectory) for trajectory in trajectories]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] == 0:
+        return np.zeros(0, dtype=np.int64), offsets
+    states = np.asarray([state for trajectory in trajectories for state in trajectory])
+    if states.ndim == 2:
+        states = states.argmax(axis=1)
+    return states.astype(np.int64), offsets
 #
 # def xy_to_flatten_state(state, size):
 #     """Flatten state (x,y) into a one hot vector of size"""
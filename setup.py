@@ -3,8 +3,10 @@ from emdp import __version__
 
 base_requirements = ['numpy>=1.9.1']
 extras = {
-    'tests': ['gym', 'matplotlib'],
-    'gym': ['gym']
+    'tests': ['gym', 'matplotlib', 'scipy'],
+    'gym': ['gym'],
+    'sparse': ['scipy'],
+    'benchmark': ['pytest', 'pytest-benchmark']
 }
 
 setup(
@@ -23,9 +25,9 @@ setup(
         'Intended Audience :: Education',
         'Intended Audience :: Science/Research',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.7',
     ],
-    python_requires='>=3.5',
+    python_requires='>=3.7',
     extras_require=extras,
     install_requires=base_requirements,
 )
@@ -1,6 +1,8 @@
 from emdp.analytic import calculate_V_pi
 from emdp.examples import build_SB_example35
+from emdp.exceptions import ConvergenceWarning
 import numpy as np
+import pytest
 
 def test_V_pi():
     mdp = build_SB_example35()
@@ -17,3 +19,140 @@ def test_V_pi():
                                        -1.0, -0.4, -0.4, -0.6, -1.2,
                                        -1.9, -1.3, -1.2, -1.4, -2.0]))
 
+
+def test_discounted_and_stationary_distributions():
+    from emdp import analytic
+    rng = np.random.RandomState(0)
+    P_pi = rng.rand(6, 6)
+    P_pi /= P_pi.sum(axis=1, keepdims=True)
+    pi = np.ones((6, 2)) / 2
+    p0s = rng.dirichlet(np.ones(6), size=3)
+
+    d_pi = analytic.calculate_discounted_state_distribution(P_pi, 0.9, p0s)
+    SR = analytic.calculate_successor_representation(P_pi, 0.9)
+    assert np.allclose(d_pi, 0.1 * p0s.dot(SR))
+    assert np.allclose(analytic.calculate_discounted_state_distribution(P_pi, 0.9, p0s[0]), d_pi[0])
+    d_sa = analytic.calculate_discounted_state_action_distribution(P_pi, pi, 0.9, p0s)
+    assert d_sa.shape == (3, 6, 2) and np.allclose(d_sa.sum(axis=(1, 2)), 1)
+
+    d = analytic.calculate_stationary_distribution(P_pi)
+    assert np.isclose(d.sum(), 1) and np.allclose(d.dot(P_pi), d)
+    assert np.allclose(analytic.calculate_stationary_distribution(P_pi, p0=p0s, method='power'), d)
+
+    # a periodic chain.
+    cycle = np.roll(np.eye(4), 1, axis=1)
+    assert np.allclose(analytic.calculate_stationary_distribution(cycle, p0=np.eye(4)[0], method='power'), 0.25)
+
+    # a transient state that leads to an absorbing state.
+    transient = np.array([[0.5, 0.5], [0., 1.]])
+    assert np.allclose(analytic.calculate_stationary_distribution(transient), [0, 1])
+    with pytest.raises(ValueError):
+        analytic.calculate_stationary_distribution(P_pi, p0=p0s[0])
+    # two closed classes {0} and {2}.
+    two_absorbing_states = np.eye(3)
+    two_absorbing_states[1] = [0.5, 0, 0.5]
+    with pytest.raises(ValueError, match='power'):
+        analytic.calculate_stationary_distribution(two_absorbing_states)
+    with pytest.warns(ConvergenceWarning):
+        analytic.calculate_stationary_distribution(P_pi, method='power', max_iterations=2)
+
+
+def test_stationary_distribution_of_reducible_chain():
+    from emdp import analytic
+    # a random walk between the absorbing states 0 and 4.
+    P_pi = np.zeros((5, 5))
+    P_pi[0, 0] = P_pi[4, 4] = 1
+    for state in range(1, 4):
+        P_pi[state, state - 1] = P_pi[state, state + 1] = 0.5
+    p0s = np.eye(5)[[1, 2, 3]]
+    d = analytic.calculate_stationary_distribution(P_pi, p0=p0s, method='power')
+    # the probability of being absorbed at 4 from state s is s / 4.
+    absorbed_right = np.array([1, 2, 3]) / 4
+    assert np.allclose(d, np.stack([1 - absorbed_right, 0 * absorbed_right, 0 * absorbed_right,
+                                    0 * absorbed_right, absorbed_right], axis=1), atol=1e-8)
+
+
+def test_distributions_with_sparse_matrices():
+    import pytest
+    scipy_sparse = pytest.importorskip('scipy.sparse')
+    from emdp import analytic
+    rng = np.random.RandomState(1)
+    P_pi = rng.rand(5, 5) * (rng.rand(5, 5) < 0.5) + np.eye(5)
+    P_pi /= P_pi.sum(axis=1, keepdims=True)
+    p0 = np.ones(5) / 5
+    sparse = scipy_sparse.csr_matrix(P_pi)
+    assert np.allclose(analytic.calculate_discounted_state_distribution(sparse, 0.8, p0),
+                       analytic.calculate_discounted_state_distribution(P_pi, 0.8, p0))
+    assert np.allclose(analytic.calculate_stationary_distribution(sparse),
+                       analytic.calculate_stationary_distribution(P_pi, method='power'))
+
+
+def test_stationary_distribution_of_long_sparse_chain():
+    scipy_sparse = pytest.importorskip('scipy.sparse')
+    import scipy.sparse.linalg
+    from emdp import analytic
+    # a random walk that drifts to the right, reflected at both ends: d(s+1) / d(s) = 0.6 / 0.4
+    n_states = 10000
+    right, left = np.full(n_states - 1, 0.6), np.full(n_states - 1, 0.4)
+    stay = np.full(n_states, 0.)
+    stay[0], stay[-1] = 0.4, 0.6
+    P_pi = scipy_sparse.diags([left, stay, right], [-1, 0, 1], format='csr')
+    d = analytic.calculate_stationary_distribution(P_pi)
+    assert np.isclose(d.sum(), 1) and np.allclose(P_pi.T.dot(d), d)
+    assert np.allclose(d[-3:], 1 / 3 * (2 / 3) ** np.arange(3)[::-1])
+
+    # the pinned system is as sparse as I - P_pi and so is its factorization (a dense equation fills it in).
+    M, _ = analytic._pinned_stationary_system(P_pi, n_states - 1)
+    assert M.nnz <= 3 * n_states
+    lu = scipy.sparse.linalg.splu(M.T.tocsc())
+    assert lu.L.nnz + lu.U.nnz <= 10 * n_states
+
+
+def test_return_variance_and_moments():
+    from emdp import analytic
+    from emdp.examples import build_cake_world_mdp
+    mdp = build_cake_world_mdp(0.1, 0.9)
+    pi = np.array([[1., 0.], [1., 0.]])
+    V = calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    variance = analytic.calculate_return_variance(mdp.P, mdp.R, pi, mdp.gamma)
+    # from x1 the return is 1 + gamma * (the return from x1 or x2 with equal probability).
+    expected = 0.25 * mdp.gamma ** 2 * (V[0] - V[1]) ** 2 / (1 - 0.5 * mdp.gamma ** 2)
+    assert np.allclose(variance, [expected, 0])
+    assert np.allclose(analytic.calculate_return_variance(mdp.P, mdp.R, pi, mdp.gamma, V=V), variance)
+
+    moments = analytic.calculate_return_moments(mdp.P, mdp.R, pi, mdp.gamma, n_moments=3)
+    assert np.allclose(moments[0], V)
+    assert np.allclose(moments[1] - moments[0] ** 2, variance)
+    # the return from x2 is deterministic.
+    assert np.isclose(moments[2, 1], V[1] ** 3)
+
+
+def test_return_variance_against_monte_carlo():
+    from emdp import analytic
+    from emdp.actions import LEFT, RIGHT
+    from emdp.chainworld import build_chain_MDP
+    from emdp.monte_carlo import discounted_returns
+    from emdp.off_policy_evaluation import sample_episodes
+    mdp = build_chain_MDP(n_states=5, p_success=0.8, reward_spec=[(3, RIGHT, 1), (1, LEFT, -1)],
+                          starting_distribution=np.array([0, 0, 1, 0, 0]), terminal_states=[0, 4], gamma=0.9)
+    pi = np.ones((5, 2)) / 2
+    states, actions, rewards, mask = sample_episodes(mdp, pi, n_episodes=20000, horizon=200)
+    offsets = np.arange(0, 200 * 20001, 200)
+    returns = discounted_returns(rewards.ravel(), offsets, mdp.gamma)[offsets[:-1]]
+    variance = analytic.calculate_return_variance(mdp.P, mdp.R, pi, mdp.gamma)
+    assert np.isclose(returns.var(), variance[2], rtol=0.05)
+
+
+def test_return_variance_with_sparse_P_pi():
+    pytest.importorskip('scipy.sparse')
+    from emdp import analytic
+    from emdp import representations
+    from emdp.chainworld import build_chain_MDP
+    mdp = build_chain_MDP(n_states=30, p_success=0.8, reward_spec=[(28, 1, 1), (1, 0, -1)],
+                          starting_distribution=np.ones(30) / 30, terminal_states=[0, 29], gamma=0.95)
+    pi = np.random.RandomState(0).dirichlet(np.ones(mdp.action_space), size=mdp.state_space)
+    P_pi = representations.sparse_P_pi(mdp, pi)
+    assert np.allclose(analytic.calculate_return_variance(mdp.P, mdp.R, pi, mdp.gamma, P_pi=P_pi),
+                       analytic.calculate_return_variance(mdp.P, mdp.R, pi, mdp.gamma))
+    assert np.allclose(analytic.calculate_return_moments(mdp.P, mdp.R, pi, mdp.gamma, n_moments=3, P_pi=P_pi),
+                       analytic.calculate_return_moments(mdp.P, mdp.R, pi, mdp.gamma, n_moments=3))
@@ -0,0 +1,46 @@
+import numpy as np
+from emdp import BatchedMDP, build_chain_MDP, actions, utils
+from emdp.examples import build_four_rooms_example
+from emdp.gridworld import ImplicitGridWorldMDP
+
+
+def test_sample_categorical_matches_choice():
+    probs = np.random.RandomState(0).dirichlet(np.ones(5), size=100)
+    rng = np.random.RandomState(1)
+    expected = [rng.choice(5, p=p) for p in probs]
+    assert list(utils.sample_categorical(probs, np.random.RandomState(1))) == expected
+
+    rng = np.random.RandomState(1)
+    expected = [rng.choice(5, p=probs[0]) for _ in range(100)]
+    assert list(utils.sample_categorical(probs[0], np.random.RandomState(1), size=100)) == expected
+
+
+def test_batched_chain_MDP():
+    kwargs = dict(n_states=7, p_success=0.8, reward_spec=[(5, actions.RIGHT, +1)],
+                  starting_distribution=np.array([0, 0, 0, 1, 0, 0, 0]), terminal_states=[0, 6], gamma=0.9)
+    dense = BatchedMDP(build_chain_MDP(**kwargs), num_envs=64, seed=0)
+    banded = BatchedMDP(build_chain_MDP(banded=True, **kwargs), num_envs=64, seed=0)
+    action_rng = np.random.RandomState(2)
+    for _ in range(20):
+        batch_actions = action_rng.randint(2, size=64)
+        states, rewards, dones = dense.step(batch_actions)
+        banded_states, banded_rewards, banded_dones = banded.step(batch_actions)
+        assert np.all(states == banded_states) and np.all(rewards == banded_rewards)
+        dense.reset(mask=dones)
+        banded.reset(mask=banded_dones)
+    assert np.all(dense.states == banded.states)
+
+
+def test_batched_implicit_gridworld():
+    mdp, wall_locs = build_four_rooms_example()
+    implicit = ImplicitGridWorldMDP(mdp.R, mdp.gamma, mdp.p0, mdp.terminal_states, mdp.size, walls=wall_locs,
+                                    p_success=0.7, convert_terminal_states_to_ints=True)
+    n_samples = 20000
+    state = implicit.size + 1
+    next_states = implicit._sample_next_states(np.full(n_samples, state), np.full(n_samples, actions.RIGHT),
+                                               np.random.RandomState(0))
+    frequencies = np.bincount(next_states, minlength=implicit.state_space) / n_samples
+    assert np.allclose(frequencies, implicit.P[state, actions.RIGHT], atol=0.02)
+    terminal = implicit.terminal_states[0]
+    assert np.all(implicit._sample_next_states(np.array([terminal]), np.array([0]), np.random.RandomState(0))
+                  == implicit.absorbing_state)
@@ -1,4 +1,5 @@
 from emdp import build_chain_MDP
+from emdp import analytic
 import numpy as np
 
 def test_build_chain_MDP():
@@ -21,3 +22,30 @@ def test_build_chain_MDP():
     assert mdp.R[1][0] == +5, 'taking LEFT from state 1 should give +5 reward'
     assert mdp.R[1][1] == 0, 'taking RIGHT from state 1 should give 0 reward'
     assert np.allclose(mdp.R[2][:], 0), 'No reward from other states'
+
+
+def test_banded_chain_MDP():
+    kwargs = dict(n_states=7, p_success=0.9, reward_spec=[(5, 1, +1), (1, 0, -1)],
+                  starting_distribution=np.array([0, 0, 0, 1, 0, 0, 0]), terminal_states=[0, 6])
+    mdp = build_chain_MDP(**kwargs)
+    banded_mdp = build_chain_MDP(banded=True, **kwargs)
+    assert np.allclose(banded_mdp.P, mdp.P)
+
+    pi = np.random.RandomState(0).dirichlet(np.ones(2), size=7)
+    V_pi = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    assert np.allclose(analytic.calculate_V_pi_banded(banded_mdp.P_bands, banded_mdp.R, pi, banded_mdp.gamma), V_pi)
+    assert np.allclose(banded_mdp.apply_P(V_pi), np.einsum('sat,t->sa', mdp.P, V_pi))
+
+    banded_mdp.set_current_state_to(3)
+    state, reward, done, _ = banded_mdp.step(0)
+    assert state.argmax() in (2, 3)
+
+
+def test_solve_tridiagonal():
+    rng = np.random.RandomState(0)
+    lower, upper = -0.4 * rng.rand(50), -0.4 * rng.rand(50)
+    diagonal, b = np.ones(50), rng.rand(50)
+    lower[0] = upper[-1] = 0
+    A = np.diag(diagonal) + np.diag(lower[1:], -1) + np.diag(upper[:-1], 1)
+    assert np.allclose(analytic._solve_tridiagonal(lower, diagonal, upper, b), np.linalg.solve(A, b))
+    assert np.allclose(analytic._solve_tridiagonal_thomas(lower, diagonal, upper, b), np.linalg.solve(A, b))
@@ -0,0 +1,42 @@
+import numpy as np
+from emdp.datasets import TrajectoryRecorder, TrajectoryDataset
+from emdp import build_chain_MDP, actions
+from emdp.examples import build_SB_example35
+
+
+def test_record_and_read(tmpdir):
+    mdp = build_SB_example35()
+    path = str(tmpdir.join('dataset'))
+    rng = np.random.RandomState(0)
+    states, rewards = [], []
+    with TrajectoryRecorder(mdp, path, shard_size=7) as recorder:
+        for _ in range(3):
+            recorder.reset()
+            for _ in range(5):
+                states.append(mdp.current_state_idx)
+                _, reward, _, _ = recorder.step(int(rng.randint(4)))
+                rewards.append(reward)
+
+    dataset = TrajectoryDataset(path)
+    assert len(dataset) == 15 and dataset.n_shards == 3
+    assert dataset.shard(0)['state'].dtype == np.uint8
+    assert isinstance(dataset.shard(0)['state'], np.memmap)
+    assert list(dataset.column('state')) == states
+    assert np.allclose(dataset.column('reward'), rewards)
+    assert list(dataset.column('episode_id')) == [0] * 5 + [1] * 5 + [2] * 5
+    # next states follow states within an episode.
+    next_states = dataset.column('next_state')
+    assert np.all(next_states[:4] == dataset.column('state')[1:5])
+
+
+def test_record_episode_ends(tmpdir):
+    mdp = build_chain_MDP()
+    path = str(tmpdir.join('dataset'))
+    with TrajectoryRecorder(mdp, path) as recorder:
+        recorder.reset()
+        done = False
+        while not done:
+            _, _, done, _ = recorder.step(actions.LEFT)
+    dataset = TrajectoryDataset(path, mmap=False)
+    dones = dataset.column('done')
+    assert dones[-1] and not np.any(dones[:-1])
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from emdp import analytic
+from emdp.chainworld import build_chain_MDP
+from emdp.empirical import EmpiricalMDP
+
+
+def _chain():
+    return build_chain_MDP(n_states=5, p_success=0.8, reward_spec=[(4, 1, 1)], starting_distribution=np.ones(5) / 5)
+
+
+def test_empirical_mdp_estimates_the_model():
+    mdp = _chain()
+    distribution = np.ones((mdp.state_space, mdp.action_space)) / (mdp.state_space * mdp.action_space)
+    model = EmpiricalMDP(mdp.state_space, mdp.action_space)
+    for _ in range(4):
+        model.update(*mdp.sample_transitions(state_action_distribution=distribution, n=20000))
+    assert model.n_transitions == 80000
+    assert np.allclose(model.P_hat, mdp.P, atol=0.03)
+    assert np.allclose(model.R_hat, mdp.R)
+
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    V = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    V_hat = analytic.calculate_V_pi(model.P_hat, model.R_hat, pi, mdp.gamma)
+    assert np.allclose(V, V_hat, atol=0.1)
+    assert model.to_mdp(mdp.gamma).P.shape == mdp.P.shape
+
+
+def test_empirical_mdp_merge_and_smoothing():
+    states, actions, rewards, next_states = np.array([0, 0, 1]), np.array([1, 1, 0]), np.array([1., 3., 0.]), np.array([1, 2, 0])
+    model = EmpiricalMDP(3, 2).update(states[:2], actions[:2], rewards[:2], next_states[:2])
+    model.merge(EmpiricalMDP(3, 2).update(states[2:], actions[2:], rewards[2:], next_states[2:]))
+    assert np.allclose(model.P_hat[0, 1], [0, 0.5, 0.5])
+    assert model.R_hat[0, 1] == 2
+    # unvisited pairs transition to themselves.
+    assert model.P_hat[2, 0, 2] == 1 and model.R_hat[2, 0] == 0
+    assert np.allclose(model.P_hat.sum(axis=2), 1)
+
+    model.smoothing = 1.
+    assert np.allclose(model.transition_matrix()[0, 1], [1 / 5, 2 / 5, 2 / 5])
+    assert np.allclose(model.P_hat[2, 0], 1 / 3)
+
+
+def test_empirical_mdp_sparse_transition_matrix():
+    pytest.importorskip('scipy')
+    mdp = _chain()
+    model = EmpiricalMDP(mdp.state_space, mdp.action_space)
+    model.update(*mdp.sample_transitions(states=np.repeat(np.arange(4), 100), actions=np.tile([0, 1], 200)))
+    P_sparse = model.transition_matrix(sparse=True)
+    assert np.allclose(P_sparse.toarray().reshape(mdp.P.shape), model.P_hat)
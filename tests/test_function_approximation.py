@@ -0,0 +1,53 @@
+import numpy as np
+from emdp import analytic
+from emdp.examples.counter import build_imani_counterexample
+from emdp import function_approximation as fa
+
+
+def _setup():
+    mdp = build_imani_counterexample()
+    pi = np.array([[0.25, 0.75], [0.5, 0.5], [0.5, 0.5], [0.5, 0.5]])
+    V_pi = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    # state 1 and 2 share a feature.
+    Phi = np.array([[1., 0., 0.], [0., 1., 0.], [0., 1., 0.], [0., 0., 1.]])
+    return mdp, pi, V_pi, Phi
+
+
+def test_td_fixed_point_and_msve_solution():
+    mdp, pi, V_pi, Phi = _setup()
+    weights = np.array([0.4, 0.1, 0.3, 0.2])
+    Phis = np.stack([Phi, np.eye(4)[:, :3], np.random.RandomState(0).rand(4, 3)])
+
+    theta = fa.td_fixed_point(mdp.P, mdp.R, pi, mdp.gamma, Phis, weights)
+    P_pi = analytic.calculate_P_pi(mdp.P, pi)
+    D = np.diag(weights)
+    for Phi_i, theta_i in zip(Phis, theta):
+        A = Phi_i.T.dot(D).dot(Phi_i - mdp.gamma * P_pi.dot(Phi_i))
+        b = Phi_i.T.dot(D).dot(analytic.calculate_R_pi(mdp.R, pi))
+        assert np.allclose(theta_i, np.linalg.solve(A, b))
+    assert np.allclose(fa.td_fixed_point(mdp.P, mdp.R, pi, mdp.gamma, Phi, weights), theta[0])
+    # tabular features recover V_pi.
+    assert np.allclose(fa.td_fixed_point(mdp.P, mdp.R, pi, mdp.gamma, np.eye(4), weights), V_pi)
+
+    theta = fa.msve_solution(V_pi, Phis, weights)
+    for Phi_i, theta_i in zip(Phis, theta):
+        expected = np.linalg.lstsq(np.sqrt(D).dot(Phi_i), np.sqrt(weights) * V_pi, rcond=None)[0]
+        assert np.allclose(theta_i, expected)
+    errors = fa.msve(V_pi, Phis, theta, weights)
+    assert errors.shape == (3,)
+    assert np.isclose(fa.msve(V_pi, np.eye(4), fa.msve_solution(V_pi, np.eye(4), weights), weights), 0)
+    # the MSVE solution has the lowest MSVE.
+    theta_td = fa.td_fixed_point(mdp.P, mdp.R, pi, mdp.gamma, Phi, weights)
+    assert fa.msve(V_pi, Phi, theta_td, weights) >= errors[0]
+
+
+def test_lstd_converges_to_the_td_fixed_point():
+    mdp, pi, V_pi, Phi = _setup()
+    weights = np.array([0.4, 0.1, 0.3, 0.2])
+    rng = np.random.RandomState(0)
+    states = rng.choice(4, size=200000, p=weights)
+    actions = (rng.random_sample(len(states)) < pi[states, 1]).astype(np.int64)
+    states, actions, rewards, next_states = mdp.sample_transitions(states=states, actions=actions)
+    theta = fa.lstd(states, rewards, next_states, mdp.gamma, Phi)
+    expected = fa.td_fixed_point(mdp.P, mdp.R, pi, mdp.gamma, Phi, weights)
+    assert np.allclose(theta, expected, atol=0.05)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from emdp import actions
+from emdp import analytic
+from emdp import graph
+from emdp import build_chain_MDP
+from emdp.examples import build_four_rooms_example, build_two_circle_MDP
+from emdp.exceptions import ConvergenceWarning
+
+
+def test_reachable_states():
+    P = np.zeros((4, 1, 4))
+    P[0, 0, 1] = 1  # 0 -> 1 -> 1
+    P[1, 0, 1] = 1
+    P[2, 0, 3] = 1  # 2 -> 3 -> 3 is never reached from 0.
+    P[3, 0, 3] = 1
+    assert list(graph.reachable_states(P, np.array([1, 0, 0, 0]))) == [0, 1]
+
+
+def test_support_graph_of_sparse_matrix():
+    scipy_sparse = pytest.importorskip('scipy.sparse')
+    P_pi = scipy_sparse.csr_matrix(np.array([[0., 1, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 0, 1]]))
+    adjacency = graph.support_graph(P_pi)
+    assert scipy_sparse.issparse(adjacency) and adjacency.nnz == 4
+    assert list(graph.reachable_states(P_pi, np.array([1, 0, 0, 0]))) == [0, 1]
+    assert list(graph.reachable_states(P_pi, np.array([0, 0, 1, 0]))) == [2, 3]
+
+
+def test_compact_four_rooms():
+    mdp, wall_locs = build_four_rooms_example()
+    compact_mdp, compaction = mdp.compact()
+    assert compact_mdp.state_space == mdp.state_space - len(wall_locs), 'All walls should be removed.'
+    assert len(compact_mdp.terminal_states) == len(mdp.terminal_states)
+
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    V_pi = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    compact_V_pi = analytic.calculate_V_pi(compact_mdp.P, compact_mdp.R, compaction.restrict(pi), mdp.gamma)
+    assert np.allclose(compaction.lift(compact_V_pi)[compaction.states], V_pi[compaction.states])
+    assert np.allclose(compaction.lift(compaction.restrict(pi), fill_value=0.25), pi)
+
+
+def test_strongly_connected_components_order():
+    # 0 <-> 1 -> 2 -> 2
+    adjacency = np.array([[0, 1, 0],
+                          [1, 0, 1],
+                          [0, 0, 1]], dtype=bool)
+    components = graph.strongly_connected_components(adjacency)
+    assert [list(c) for c in components] == [[2], [0, 1]], 'Sinks must come first.'
+    assert [list(c) for c in graph.sink_components(adjacency)] == [[2]]
+    # 0 <- 1 -> 2 -> 2
+    adjacency[0, 1] = False
+    assert sorted(list(c) for c in graph.sink_components(adjacency)) == [[0], [2]]
+
+
+def test_V_pi_by_components():
+    mdp = build_chain_MDP(n_states=7, p_success=0.9, reward_spec=[(5, actions.RIGHT, +1), (1, actions.LEFT, -1)],
+                          starting_distribution=np.array([0, 0, 0, 1, 0, 0, 0]),
+                          terminal_states=[0, 6], gamma=0.9)
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    assert np.allclose(analytic.calculate_V_pi_by_components(mdp.P, mdp.R, pi, mdp.gamma),
+                       analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma))
+
+    mdp = build_two_circle_MDP()
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    assert np.allclose(analytic.calculate_V_pi_by_components(mdp.P, mdp.R, pi, mdp.gamma),
+                       analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma))
+
+
+def test_value_iteration_by_components():
+    mdp, _ = build_four_rooms_example(gamma=0.9)
+    assert np.allclose(analytic.value_iteration_by_components(mdp.P, mdp.R, mdp.gamma, tol=1e-10),
+                       analytic.value_iteration(mdp.P, mdp.R, mdp.gamma, tol=1e-10))
+
+
+def test_value_iteration_warns_when_not_converged():
+    mdp, _ = build_four_rooms_example(gamma=0.9)
+    with pytest.warns(ConvergenceWarning):
+        analytic.value_iteration(mdp.P, mdp.R, mdp.gamma, max_iterations=3)
+    with pytest.warns(ConvergenceWarning):
+        analytic.value_iteration_by_components(mdp.P, mdp.R, mdp.gamma, max_iterations=3)
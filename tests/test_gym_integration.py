@@ -1,7 +1,8 @@
 import numpy as np
 import gym
+import pytest
 import emdp.emdp_gym
-from emdp import examples
+from emdp import examples, build_chain_MDP
 
 def test_gym_registered():
     gym.make('sb-example3-v0')
@@ -41,3 +42,70 @@ def test_gym_int_observation():
         observation_one_hot=False)
     state = env.reset()
     assert type(state) == int
+
+def test_gym_render_rgb_array():
+    mdp, wall_locs = examples.build_four_rooms_example()
+    env = emdp.emdp_gym.gymify(mdp)
+    env.reset()
+    mdp.set_current_state_to((1, 1))
+    frame = env.render(mode='rgb_array')
+    assert frame.dtype == np.uint8 and frame.shape == (mdp.size * 8, mdp.size * 8, 3)
+    # the agent is in cell (1, 1) and the corner of the grid is a wall.
+    assert tuple(frame[12, 12]) != tuple(frame[4, 4]) and tuple(frame[4, 4]) == (0, 0, 0)
+    mdp.set_current_state_to((1, 2))
+    assert np.any(env.render(mode='rgb_array') != frame)
+
+def test_gym_vector_env():
+    mdp = examples.build_SB_example35()
+    env = emdp.emdp_gym.gymify_vector(mdp, 8)
+    observations = env.reset()
+    assert observations.shape == (8, mdp.state_space) and observations.dtype == np.int32
+    assert np.all(observations.sum(axis=1) == 1)
+    observations, rewards, dones, infos = env.step(np.zeros(8, dtype=np.int64))
+    assert rewards.shape == dones.shape == (8, )
+    assert np.all(observations.sum(axis=1) == 1)
+
+    chain = build_chain_MDP(n_states=3, starting_distribution=np.array([0, 1, 0]), terminal_states=[0])
+    env = emdp.emdp_gym.gymify_vector(chain, 4, observation_one_hot=False)
+    assert np.all(env.reset() == 1)
+    observations, rewards, dones, infos = env.step(np.zeros(4, dtype=np.int64))  # LEFT into the terminal state
+    assert np.all(observations == 0) and not np.any(dones)
+    observations, rewards, dones, infos = env.step(np.zeros(4, dtype=np.int64))
+    assert np.all(dones) and np.all(observations == 1), 'Episodes must be reset automatically.'
+    # the keys used by gym's own vector environments.
+    assert list(infos['final_observation']) == [0, 0, 0, 0] and np.all(infos['_final_observation'])
+
+    env = emdp.emdp_gym.gymify_vector(chain, 2)
+    env.reset()
+    env.batched_mdp.states[1] = 2
+    env.step(np.zeros(2, dtype=np.int64))
+    observations, rewards, dones, infos = env.step(np.zeros(2, dtype=np.int64))
+    assert list(dones) == [True, False] and list(infos['_final_observation']) == [True, False]
+    assert np.all(infos['final_observation'][0] == [1, 0, 0]) and infos['final_observation'][1] is None
+
+def test_gym_observation_modes():
+    mdp = examples.build_SB_example35()
+    env = emdp.emdp_gym.gymify(mdp, reuse_observation=True)
+    state = env.reset()
+    assert state.dtype == env.observation_space.dtype == np.int32
+    next_state, _, _, _ = env.step(0)
+    assert next_state is state, 'The one hot buffer should be reused.'
+    assert next_state.argmax() == mdp.current_state_idx
+
+    env = emdp.emdp_gym.gymify(mdp, observation='grid')
+    state = env.reset()
+    assert tuple(state) == mdp.human_state
+    assert env.observation_space.contains(state)
+
+    # the absorbing state has the same (x,y) location in both representations.
+    from emdp.gridworld.builder_tools import build_simple_grid_world_with_terminal_states
+    grid_mdp = build_simple_grid_world_with_terminal_states({(0, 1): 1}, size=3)
+    grid_mdp.reset()
+    grid_mdp.set_current_state_to((3, 0))
+    assert grid_mdp.current_state_idx == grid_mdp.state_space - 1
+    assert tuple(grid_mdp.get_observation('grid')) == grid_mdp.human_state == (3, 0)
+
+    env = emdp.emdp_gym.gymify(mdp, observation_one_hot=False)
+    state = env.reset()
+    with pytest.warns(DeprecationWarning):
+        assert env.maybe_convert_state(mdp.current_state) == state
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from emdp import actions
+from emdp import analytic
+from emdp.exceptions import ConvergenceWarning
+from emdp.gridworld import ImplicitGridWorldMDP
+from emdp.gridworld.builder_tools import TransitionMatrixBuilder, create_reward_matrix
+
+SIZE = 4
+WALLS = [(1, 1), (1, 2), (3, 0)]
+REWARD_SPEC = {(0, 3): +1}
+
+
+def _build_implicit(p_success=0.8):
+    R = create_reward_matrix(SIZE * SIZE + 1, SIZE, REWARD_SPEC)
+    p0 = np.zeros(SIZE * SIZE + 1)
+    p0[0] = 1
+    return ImplicitGridWorldMDP(R, 0.9, p0, REWARD_SPEC.keys(), SIZE,
+                                walls=WALLS, p_success=p_success)
+
+
+def test_matches_transition_matrix_builder():
+    tmb = TransitionMatrixBuilder(SIZE, has_terminal_state=True)
+    tmb.add_grid(terminal_states=REWARD_SPEC.keys(), p_success=0.8)
+    for wall in WALLS:
+        tmb.add_wall_at(wall)
+
+    mdp = _build_implicit(p_success=0.8)
+    assert np.allclose(mdp.P, tmb.P)
+
+
+def test_apply_P():
+    mdp = _build_implicit()
+    V = np.random.RandomState(0).randn(mdp.state_space)
+    assert np.allclose(mdp.apply_P(V), np.einsum('sat,t->sa', mdp.P, V))
+
+
+def test_V_pi_matrix_free():
+    mdp = _build_implicit()
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    V_pi = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    V_pi_matrix_free = analytic.calculate_V_pi_matrix_free(mdp.apply_P, mdp.R, pi, mdp.gamma, tol=1e-12)
+    assert np.allclose(V_pi, V_pi_matrix_free)
+
+    with pytest.warns(ConvergenceWarning):
+        analytic.calculate_V_pi_matrix_free(mdp.apply_P, mdp.R, pi, mdp.gamma, max_iterations=3)
+
+
+def test_step_does_not_enter_walls():
+    mdp = _build_implicit(p_success=1)
+    mdp.set_current_state_to((0, 1))
+    state, reward, done, _ = mdp.step(actions.DOWN)
+    assert mdp.unflatten_state(state) == (0, 1), 'Moving into a wall should leave the agent in place.'
+    state, reward, done, _ = mdp.step(actions.RIGHT)
+    assert mdp.unflatten_state(state) == (0, 2)
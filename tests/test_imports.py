@@ -0,0 +1,36 @@
+"""Checks that importing emdp does not load optional dependencies (see benchmarks/test_imports.py for its speed)."""
+import json
+import subprocess
+import sys
+
+IMPORT_SCRIPT = '''
+import json, sys
+import emdp
+import emdp.analytic
+import emdp.gridworld
+import emdp.examples
+import emdp.torch_analytic
+heavy_modules = [name for name in ('matplotlib', 'gym', 'torch') if name in sys.modules]
+print(json.dumps({'heavy_modules': heavy_modules}))
+'''
+
+
+def _run(script):
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    result = _run(IMPORT_SCRIPT)
+    assert result['heavy_modules'] == [], 'Optional dependencies should only be imported when used.'
+
+
+def test_lazy_attributes():
+    result = _run('''
+import json, sys
+import emdp
+plotter = emdp.gridworld.GridWorldPlotter(5)
+print(json.dumps({'examples': hasattr(emdp.examples, 'build_SB_example35'),
+                  'plotting': 'emdp.gridworld.plotting' in sys.modules}))
+''')
+    assert result == {'examples': True, 'plotting': True}
@@ -0,0 +1,49 @@
+from emdp import analytic, instrumentation
+from emdp.examples import build_SB_example35
+import numpy as np
+
+
+def test_instrumentation():
+    mdp = build_SB_example35()
+    instrumentation.reset()
+    mdp.reset()
+    mdp.step(0)
+    assert instrumentation.stats() == {}, 'Nothing should be recorded when disabled.'
+
+    events = []
+    callback = lambda phase, elapsed: events.append(phase)
+    instrumentation.add_callback(callback)
+    instrumentation.enable()
+    try:
+        mdp.reset_index()
+        for _ in range(3):
+            mdp.step_index(0)
+        pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+        analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    finally:
+        instrumentation.disable()
+        instrumentation.remove_callback(callback)
+
+    stats = instrumentation.stats()
+    assert stats['mdp.reset']['count'] == 1
+    assert stats['mdp.step']['count'] == stats['mdp.sample']['count'] == 3
+    assert stats['analytic.calculate_V_pi']['count'] == 1
+    assert stats['analytic.calculate_P_pi']['count'] == 1
+    assert stats['analytic.calculate_V_pi']['total_time'] >= stats['analytic.calculate_P_pi']['total_time']
+    assert len(events) == sum(phase_stats['count'] for phase_stats in stats.values())
+    instrumentation.reset()
+    assert instrumentation.stats() == {}
+
+
+def test_disabled_instrumentation_uses_undecorated_functions():
+    from emdp.common import MDP
+    assert not hasattr(MDP.step_index, '__wrapped__') and not hasattr(analytic.calculate_V_pi, '__wrapped__')
+    undecorated_step_index = MDP.step_index
+    instrumentation.enable()
+    try:
+        assert MDP.step_index.__wrapped__ is undecorated_step_index
+        assert analytic.calculate_V_pi.__wrapped__ is not None
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    assert MDP.step_index is undecorated_step_index and not hasattr(analytic.calculate_V_pi, '__wrapped__')
@@ -0,0 +1,36 @@
+import numpy as np
+from emdp import analytic
+from emdp.actions import LEFT, RIGHT
+from emdp.chainworld import build_chain_MDP
+from emdp.learners import td_lambda, q_learning, sarsa
+
+
+def _chain():
+    return build_chain_MDP(n_states=5, p_success=0.9, reward_spec=[(3, RIGHT, 1), (1, LEFT, -1)],
+                           starting_distribution=np.array([0, 0, 1, 0, 0]), terminal_states=[0, 4], gamma=0.9)
+
+
+def test_td_lambda():
+    mdp = _chain()
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    V_pi = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    for lam in [0., 0.8]:
+        V, steps, errors = td_lambda(mdp, pi, n_seeds=50, n_steps=3000, alpha=0.05, lam=lam, log_every=500)
+        assert V.shape == (50, mdp.state_space)
+        assert np.all(steps == np.arange(0, 3001, 500)) and errors.shape == (len(steps), 50)
+        assert errors[-1].mean() < errors[0].mean() / 2
+        assert np.allclose(V.mean(axis=0)[1:4], V_pi[1:4], atol=0.05)
+
+
+def test_control():
+    mdp = _chain()
+    V_star = analytic.value_iteration(mdp.P, mdp.R, mdp.gamma)
+    Q_star = analytic.calculate_Q_from_V(mdp.P, mdp.R, V_star, mdp.gamma)
+    for learner in [q_learning, sarsa]:
+        Q, steps, errors = learner(mdp, n_seeds=50, n_steps=5000, alpha=0.1, epsilon=0.2, log_every=1000)
+        assert errors[-1].mean() < errors[0].mean() / 2
+        # every seed learns the optimal policy in the states between the terminal states.
+        assert np.all(Q[:, 1:4].argmax(axis=2) == Q_star[1:4].argmax(axis=1))
+
+    Q, steps, errors = q_learning(mdp, n_seeds=3, n_steps=10)
+    assert len(steps) == 0 and errors.shape == (0, 3)
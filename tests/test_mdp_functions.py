@@ -37,3 +37,59 @@ def test_simple_reset_MDP():
         assert False, 'This should throw an EpisodeDoneError'
     except EpisodeDoneError:
         assert True
+
+
+def test_step_index_and_observations():
+    P = np.array([[[1, 0], [0, 1]],
+                  [[0, 1], [0, 1]]])
+    p0 = np.array([1, 0])
+    R = np.array([[0, 5],
+                  [0, 0]])
+    mdp = MDP(P, R, 0.9, p0, [1])
+    assert mdp.reset_index() == 0 and mdp.get_observation('int') == 0
+    state, reward, done, _ = mdp.step_index(1)
+    assert state == 1 and type(state) == int and reward == 5 and not done
+    assert np.all(mdp.current_state == np.array([0, 1]))
+    out = np.ones(2, dtype=np.int32)
+    assert mdp.get_observation('onehot', out=out) is out
+    assert np.all(out == np.array([0, 1]))
+
+
+def test_sample_transitions():
+    from emdp.chainworld import build_chain_MDP
+    mdp = build_chain_MDP(n_states=5, p_success=0.7, reward_spec=[(4, 1, 1)], starting_distribution=np.ones(5) / 5)
+    states, actions, rewards, next_states = mdp.sample_transitions(states=np.full(20000, 2), actions=1)
+    assert np.all(actions == 1) and np.all(rewards == mdp.R[2, 1])
+    frequencies = np.bincount(next_states, minlength=mdp.state_space) / len(next_states)
+    assert np.allclose(frequencies, mdp.P[2, 1], atol=0.02)
+
+    # the dense implementation, in small chunks, samples from the same distributions.
+    dense = MDP(mdp.P, mdp.R, mdp.gamma, mdp.p0, mdp.terminal_states)
+    distribution = np.ones((mdp.state_space, mdp.action_space)) / (mdp.state_space * mdp.action_space)
+    states, actions, rewards, next_states = dense.sample_transitions(
+        state_action_distribution=distribution, n=20000, max_chunk_bytes=1000)
+    assert np.all(rewards == mdp.R[states, actions])
+    for s, a in [(1, 0), (3, 1)]:
+        chosen = (states == s) & (actions == a)
+        frequencies = np.bincount(next_states[chosen], minlength=mdp.state_space) / chosen.sum()
+        assert np.allclose(frequencies, mdp.P[s, a], atol=0.05)
+
+
+def test_sample_transitions_chunks_of_compact_dynamics():
+    from emdp.chainworld import build_chain_MDP
+    mdp = build_chain_MDP(n_states=100000, p_success=0.7, reward_spec=[],
+                          starting_distribution=np.ones(100000) / 100000, banded=True)
+    sample_next_states = mdp._sample_next_states
+    chunk_sizes = []
+
+    def counting_sample_next_states(state_idxs, actions, rng):
+        chunk_sizes.append(len(state_idxs))
+        return sample_next_states(state_idxs, actions, rng)
+
+    mdp._sample_next_states = counting_sample_next_states
+    # a distribution over all the next states would not fit even one pair in the chunk.
+    states, actions, rewards, next_states = mdp.sample_transitions(
+        states=np.arange(1, 20001), actions=1, max_chunk_bytes=2**16)
+    assert max(chunk_sizes) == 2**16 // mdp._sample_bytes_per_pair()
+    assert len(chunk_sizes) < 100
+    assert np.all(np.abs(next_states - states) <= 1)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from emdp import memory
+from emdp.exceptions import MemoryLimitExceededError
+from emdp.gridworld import ImplicitGridWorldMDP
+from emdp.gridworld.builder_tools import TransitionMatrixBuilder
+from emdp.gridworld.helper_utilities import build_simple_grid
+from emdp.gridworld.txt_utilities import get_char_matrix, build_gridworld_from_char_matrix
+from emdp.examples.simple import _EXAMPLE_FOUR_ROOMS_TXT
+
+
+def test_estimates():
+    dense = memory.estimate_grid_world_bytes(400)
+    assert dense['P'] == (400 * 400 + 1) ** 2 * 4 * 8
+    assert dense['total'] > 2 * dense['P']
+    implicit = memory.estimate_grid_world_bytes(400, backend='implicit')
+    assert implicit['P'] == 0 and implicit['total'] < dense['total'] / 1000
+    assert memory.estimate_P_bytes(100, 4, backend='sparse') < memory.estimate_P_bytes(100, 4)
+    assert memory.estimate_analytic_bytes('calculate_V_pi', 100, 4)['intermediates'] > 4 * 100 * 100 * 8
+
+
+def test_memory_limit(monkeypatch):
+    monkeypatch.setenv(memory.MEMORY_LIMIT_ENV_VARIABLE, '1e6')
+    assert memory.get_memory_limit() == 10 ** 6
+    with pytest.raises(MemoryLimitExceededError):
+        build_simple_grid(size=30)
+    with pytest.raises(MemoryLimitExceededError):
+        TransitionMatrixBuilder(30)
+    build_simple_grid(size=5)
+
+    memory.set_memory_limit(10 ** 12)
+    try:
+        assert memory.get_memory_limit() == 10 ** 12
+        build_simple_grid(size=30)
+    finally:
+        memory.set_memory_limit(None)
+
+
+def test_automatic_backend(monkeypatch):
+    char_matrix = get_char_matrix(_EXAMPLE_FOUR_ROOMS_TXT)
+    dense, wall_locs = build_gridworld_from_char_matrix(char_matrix, backend='auto')
+    assert not isinstance(dense, ImplicitGridWorldMDP)
+
+    monkeypatch.setenv(memory.MEMORY_LIMIT_ENV_VARIABLE, '10000')
+    estimate = build_gridworld_from_char_matrix(char_matrix, backend='auto', dry_run=True)
+    assert estimate['backend'] == 'implicit'
+    implicit, _ = build_gridworld_from_char_matrix(char_matrix, backend='auto')
+    assert isinstance(implicit, ImplicitGridWorldMDP)
+    assert implicit.walls.sum() == len(wall_locs)
+    assert np.all(implicit.R == dense.R) and np.all(implicit.p0 == dense.p0)
+    assert np.allclose(implicit.P, dense.P)
@@ -0,0 +1,40 @@
+import numpy as np
+from emdp import analytic
+from emdp.chainworld import build_chain_MDP
+from emdp.actions import LEFT, RIGHT
+from emdp.monte_carlo import discounted_returns, monte_carlo_V, monte_carlo_Q
+from emdp.off_policy_evaluation import sample_episodes
+
+
+def test_discounted_returns():
+    rewards = np.array([1., 2., 3., 4., 5., 6.])
+    offsets = np.array([0, 3, 3, 4, 6])
+    expected = [1 + 0.5 * 2 + 0.25 * 3, 2 + 0.5 * 3, 3, 4, 5 + 0.5 * 6, 6]
+    assert np.allclose(discounted_returns(rewards, offsets, 0.5), expected)
+
+    # a long episode against the recursion.
+    rewards = np.random.RandomState(0).randn(1000)
+    expected = np.zeros(1001)
+    for t in reversed(range(1000)):
+        expected[t] = rewards[t] + 0.99 * expected[t + 1]
+    assert np.allclose(discounted_returns(rewards, np.array([0, 1000]), 0.99), expected[:-1])
+
+
+def test_monte_carlo_estimates():
+    mdp = build_chain_MDP(n_states=5, p_success=0.9, reward_spec=[(3, RIGHT, 1), (1, LEFT, -1)],
+                          starting_distribution=np.array([0, 0, 1, 0, 0]), terminal_states=[0, 4], gamma=0.9)
+    pi = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    V_pi = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    states, actions, rewards, mask = sample_episodes(mdp, pi, n_episodes=5000, horizon=200)
+    assert not mask[:, -1].any()
+    offsets = np.concatenate([[0], np.cumsum(mask.sum(axis=1))])
+    states, actions, rewards = states[mask], actions[mask], rewards[mask]
+
+    for first_visit in [False, True]:
+        V, counts = monte_carlo_V(states, rewards, offsets, mdp.gamma, mdp.state_space, first_visit=first_visit)
+        assert np.allclose(V[1:4], V_pi[1:4], atol=0.05)
+    assert counts[2] == 5000
+
+    Q, counts = monte_carlo_Q(states, actions, rewards, offsets, mdp.gamma, mdp.state_space, mdp.action_space)
+    Q_pi = mdp.R + mdp.gamma * np.einsum('sat,t->sa', mdp.P, V_pi)
+    assert np.allclose(Q[1:4], Q_pi[1:4], atol=0.05)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from emdp import analytic
+from emdp.examples import build_four_rooms_example
+from emdp.gridworld import multigrid
+from emdp.gridworld.builder_tools import build_simple_grid_world_without_terminal_states
+from emdp.exceptions import ConvergenceWarning
+
+
+def test_coarsen_grid_mdp_is_stochastic():
+    mdp, _ = build_four_rooms_example()
+    weights = np.ones(mdp.state_space)
+    P_coarse, R_coarse, _, coarse_size = multigrid.coarsen_grid_mdp(
+        mdp.P, mdp.R, mdp.size, mdp.has_absorbing_state, weights)
+    assert coarse_size == 7
+    assert P_coarse.shape == (7 * 7 + 1, 4, 7 * 7 + 1)
+    assert np.allclose(P_coarse.sum(2), 1)
+
+
+def test_multigrid_value_iteration():
+    mdp = build_simple_grid_world_without_terminal_states({(9, 9): 1, (0, 9): 0.5}, size=10,
+                                                          gamma=0.99, p_success=0.9)
+    V_star = analytic.value_iteration(mdp.P, mdp.R, mdp.gamma, tol=1e-10)
+    assert np.allclose(multigrid.multigrid_value_iteration(mdp, tol=1e-10), V_star, atol=1e-6)
+    assert np.allclose(multigrid.multigrid_value_iteration(mdp, tol=1e-10, warm_start=True), V_star, atol=1e-6)
+
+    mdp, _ = build_four_rooms_example(gamma=0.9)
+    V_star = analytic.value_iteration(mdp.P, mdp.R, mdp.gamma, tol=1e-10)
+    assert np.allclose(multigrid.multigrid_value_iteration(mdp, tol=1e-10), V_star, atol=1e-6)
+
+
+def test_multigrid_value_iteration_warns_when_not_converged():
+    mdp, _ = build_four_rooms_example(gamma=0.9)
+    with pytest.warns(ConvergenceWarning):
+        multigrid.multigrid_value_iteration(mdp, max_iterations=2)
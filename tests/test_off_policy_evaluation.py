@@ -0,0 +1,37 @@
+import numpy as np
+from emdp import analytic
+from emdp.examples.off_policy import build_two_circle_MDP
+from emdp import off_policy_evaluation as ope
+
+
+def test_estimators_match_the_exact_value():
+    mdp = build_two_circle_MDP()
+    mu = np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+    # the policies only differ in the starting state, where the action matters.
+    pi = mu.copy()
+    pi[0] = [0.9, 0.1]
+    V = analytic.calculate_V_pi(mdp.P, mdp.R, pi, mdp.gamma)
+    value = mdp.p0.dot(V)
+
+    states, actions, rewards, mask = ope.sample_episodes(mdp, mu, n_episodes=20000, horizon=12)
+    Q = mdp.R + mdp.gamma * np.einsum('sat,t->sa', mdp.P, V)
+    estimates = [
+        ope.importance_sampling(states, actions, rewards, mask, pi, mu, mdp.gamma),
+        ope.per_decision_importance_sampling(states, actions, rewards, mask, pi, mu, mdp.gamma),
+        ope.weighted_importance_sampling(states, actions, rewards, mask, pi, mu, mdp.gamma),
+        ope.doubly_robust(states, actions, rewards, mask, pi, mu, mdp.gamma, Q),
+    ]
+    assert np.allclose(estimates, value, rtol=0.05)
+    # with the exact Q, the doubly robust estimate only has the variance of the truncation.
+    assert np.isclose(estimates[-1], value, rtol=0.01)
+
+    # on-policy, weighted importance sampling is the Monte Carlo estimate.
+    states, actions, rewards, mask = ope.sample_episodes(mdp, pi, n_episodes=20000, horizon=12)
+    assert np.isclose(ope.weighted_importance_sampling(states, actions, rewards, mask, pi, pi, mdp.gamma),
+                      value, rtol=0.05)
+
+
+def test_pad_episodes():
+    padded, mask = ope.pad_episodes(np.array([1, 2, 3, 4, 5]), np.array([0, 3, 3, 5]))
+    assert np.all(padded == [[1, 2, 3], [0, 0, 0], [4, 5, 0]])
+    assert np.all(mask == [[True, True, True], [False, False, False], [True, True, False]])
@@ -34,3 +34,34 @@ def test_plotting_integration():
     gwp.plot_heatmap(ax, trajectories)
     gwp.plot_grid(ax)
 
+
+
+def test_heatmap_from_arrays():
+    from emdp import utils
+    import numpy as np
+    mdp = examples.build_SB_example35()
+    trajectories = []
+    for _ in range(5):
+        trajectory = [mdp.reset()]
+        for _ in range(10):
+            state, reward, done, info = mdp.step(random.sample([actions.LEFT, actions.RIGHT,
+                                                                actions.UP, actions.DOWN], 1)[0])
+            trajectory.append(state)
+        trajectories.append(trajectory)
+
+    gwp = GridWorldPlotter.from_mdp(mdp)
+    states, offsets = utils.trajectories_to_arrays(trajectories)
+    assert len(offsets) == len(trajectories) + 1 and offsets[-1] == len(states)
+
+    # reference: the loop over unflattened states.
+    expected = np.zeros((mdp.size, mdp.size))
+    for trajectory in gwp.unflat_trajectories(trajectories):
+        for x, y in trajectory:
+            expected[y, x] += 1
+    counts = gwp.count_visitations((states, offsets))
+    assert np.all(counts == gwp.count_visitations(trajectories))
+    assert np.all(counts.reshape(mdp.size, mdp.size).T == expected)
+
+    fig = plt.figure()
+    gwp.plot_heatmap(fig.add_subplot(111), state_visitations=counts)
+    plt.close(fig)
@@ -0,0 +1,51 @@
+"""Tests for the headless batch renderer."""
+import os
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from emdp import analytic
+from emdp.examples import build_four_rooms_example
+from emdp.gridworld import GridWorldPlotter
+from emdp.gridworld.plotting import policy_to_arrows
+from emdp.gridworld.rendering import BatchRenderer, render_batch
+from emdp import actions
+
+
+def test_policy_to_arrows():
+    pi = np.zeros((4, 4))
+    pi[np.arange(4), [actions.LEFT, actions.RIGHT, actions.UP, actions.DOWN]] = 1
+    U, V = policy_to_arrows(pi, 2)
+    assert np.all(U == [[-1, 1], [0, 0]])
+    assert np.all(V == [[0, 0], [1, -1]])
+    assert np.all(policy_to_arrows(pi.argmax(axis=1), 2)[0] == U)
+
+
+def test_render_batch(tmpdir):
+    mdp, wall_locs = build_four_rooms_example()
+    V = analytic.value_iteration(mdp.P, mdp.R, mdp.gamma)
+    pi = np.argmax(mdp.R + mdp.gamma * np.einsum('sat,t->sa', mdp.P, V), axis=1)
+    frames = [{'V': V}, {'pi': pi}, {'V': V, 'pi': pi, 'trajectory': [mdp.reset()]}]
+
+    renderer = BatchRenderer.from_mdp(mdp, wall_locs=wall_locs, figsize=(2, 2), dpi=50)
+    images = render_batch(mdp.size, frames, wall_locs=wall_locs, figsize=(2, 2), dpi=50)
+    assert images.shape == (3, 100, 100, 3) and images.dtype == np.uint8
+    assert np.all(images[0] == renderer.render(V=V))
+    assert not np.all(images[0] == images[2])
+
+    paths = [os.path.join(str(tmpdir), '{}.png'.format(i)) for i in range(len(frames))]
+    assert render_batch(mdp.size, frames, paths=paths, processes=2, wall_locs=wall_locs,
+                        figsize=(2, 2), dpi=50) == paths
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_plot_values_and_policy():
+    mdp, wall_locs = build_four_rooms_example()
+    V = analytic.value_iteration(mdp.P, mdp.R, mdp.gamma)
+    gwp = GridWorldPlotter.from_mdp(mdp)
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    gwp.plot_values(ax, V, wall_locs=wall_locs)
+    gwp.plot_policy(ax, np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space, wall_locs=wall_locs)
+    gwp.plot_grid(ax)
+    plt.close(fig)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from emdp import analytic
+from emdp import graph
+from emdp.chainworld import build_chain_MDP
+from emdp.gridworld.txt_utilities import build_gridworld_from_char_matrix
+
+pytest.importorskip('scipy')
+from emdp import representations
+
+ROOMS = ['#######',
+         '#s #  #',
+         '#     #',
+         '#  # g#',
+         '#######',
+         '#######',
+         '#######']
+
+
+def _uniform(mdp):
+    return np.ones((mdp.state_space, mdp.action_space)) / mdp.action_space
+
+
+def test_sparse_P_pi():
+    chain = build_chain_MDP(n_states=6, p_success=0.7, starting_distribution=np.ones(6) / 6, banded=True)
+    mdps = [chain]
+    for backend in ['dense', 'implicit']:
+        mdp, _ = build_gridworld_from_char_matrix([list(row) for row in ROOMS], p_success=0.8, gamma=0.9,
+                                                  backend=backend)
+        mdps.append(mdp)
+    for mdp in mdps:
+        pi = np.random.RandomState(0).dirichlet(np.ones(mdp.action_space), size=mdp.state_space)
+        assert np.allclose(representations.sparse_P_pi(mdp, pi).toarray(), analytic.calculate_P_pi(mdp.P, pi))
+
+
+def test_successor_representation_eigenvectors():
+    mdp, _ = build_gridworld_from_char_matrix([list(row) for row in ROOMS], p_success=0.8, gamma=0.9)
+    pi = _uniform(mdp)
+    eigenvalues, eigenvectors = representations.successor_representation_eigenvectors(mdp, pi, k=4)
+    SR = analytic.calculate_successor_representation(analytic.calculate_P_pi(mdp.P, pi), mdp.gamma)
+    dense_eigenvalues = np.linalg.eigvals(SR)
+    assert np.allclose(np.abs(eigenvalues), np.sort(np.abs(dense_eigenvalues))[::-1][:4])
+    assert np.allclose(SR.dot(eigenvectors), eigenvectors * eigenvalues)
+    # results are cached.
+    assert representations.successor_representation_eigenvectors(mdp, pi, k=4)[1] is eigenvectors
+    assert not eigenvectors.flags.writeable
+
+
+def test_proto_value_functions():
+    mdp, _ = build_gridworld_from_char_matrix([list(row) for row in ROOMS], gamma=0.9, backend='implicit')
+    pi = _uniform(mdp)
+    states = graph.reachable_states(mdp.P, mdp.p0)
+    eigenvalues, eigenvectors = representations.proto_value_functions(mdp, pi, k=3, states=states)
+    assert eigenvectors.shape == (len(states), 3)
+    # the graph of the reachable states is connected so only the first eigenvalue is 0.
+    assert np.isclose(eigenvalues[0], 0, atol=1e-8) and eigenvalues[1] > 1e-3
+
+    P_pi = analytic.calculate_P_pi(mdp.P, pi)[np.ix_(states, states)]
+    W = (P_pi + P_pi.T) / 2
+    np.fill_diagonal(W, 0)
+    d = W.sum(axis=1)
+    laplacian = np.eye(len(states)) - W / np.sqrt(np.outer(d, d))
+    assert np.allclose(eigenvalues, np.linalg.eigvalsh(laplacian)[:3])
@@ -0,0 +1,41 @@
+import numpy as np
+from emdp import MDP, build_chain_MDP
+from emdp import storage
+from emdp.examples import build_four_rooms_example, build_two_circle_MDP
+from emdp.gridworld import ImplicitGridWorldMDP
+
+
+def _check_same_MDP(mdp, loaded):
+    assert type(loaded) is type(mdp)
+    assert np.allclose(loaded.P, mdp.P) and np.allclose(loaded.R, mdp.R) and np.allclose(loaded.p0, mdp.p0)
+    assert loaded.gamma == mdp.gamma and list(loaded.terminal_states) == list(mdp.terminal_states)
+
+
+def test_save_load(tmpdir):
+    mdp, wall_locs = build_four_rooms_example()
+    path = mdp.save(str(tmpdir.join('four_rooms')), wall_locs=wall_locs)
+    loaded = MDP.load(path)
+    _check_same_MDP(mdp, loaded)
+    assert isinstance(loaded.P, np.memmap), 'P should be memory-mapped.'
+    assert loaded.size == mdp.size
+    assert storage.load_metadata(path)['wall_locs'] == wall_locs
+    loaded.reset()
+    loaded.step(0)
+
+    mdp = build_two_circle_MDP()
+    loaded = MDP.load(mdp.save(str(tmpdir.join('two_circle'))), mmap=False)
+    _check_same_MDP(mdp, loaded)
+    assert not isinstance(loaded.P, np.memmap)
+
+
+def test_save_load_structured_MDPs(tmpdir):
+    chain = build_chain_MDP(n_states=5, starting_distribution=np.array([0, 0, 1, 0, 0]), banded=True)
+    loaded = MDP.load(chain.save(str(tmpdir.join('chain'))))
+    _check_same_MDP(chain, loaded)
+
+    mdp, wall_locs = build_four_rooms_example()
+    implicit = ImplicitGridWorldMDP(mdp.R, mdp.gamma, mdp.p0, mdp.terminal_states, mdp.size, walls=wall_locs,
+                                    p_success=0.9, convert_terminal_states_to_ints=True)
+    loaded = MDP.load(implicit.save(str(tmpdir.join('implicit'))))
+    _check_same_MDP(implicit, loaded)
+    assert loaded.p_success == 0.9 and np.all(loaded.walls == implicit.walls)